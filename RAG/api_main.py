@@ -1,15 +1,39 @@
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
+import time
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from langgraph_chatbot import app as chatbot_app
+from langgraph_chatbot import answer_cache, app as chatbot_app, stream_answer
 from typing import Dict
 import uvicorn
 
+from als_core.inference_executor import add_exception_handlers
+from als_core.metrics import CONTENT_TYPE, metrics
+from als_core.model_registry import registry
+from als_core.streaming import StreamSlot, sse_events
+from als_core.tracing import TracingMiddleware
+
+# --- Load models once per worker, release them on shutdown ---
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    registry.warm_up()
+    yield
+    registry.teardown()
+
 # --- Define FastAPI instance ---
 api = FastAPI(
     title="ALS Support Chatbot API",
     description="An empathetic chatbot that provides information and emotional support about ALS using RAG + LangGraph.",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan,
 )
+api.add_middleware(TracingMiddleware)
+add_exception_handlers(api)   # 503 + Retry-After when all streaming slots are taken
 
 # --- Define request body model ---
 class UserQuery(BaseModel):
@@ -20,16 +44,46 @@ class UserQuery(BaseModel):
 def home():
     return {"message": "Welcome to ALS Support Chatbot API. Use /ask to send a query."}
 
+# --- Prometheus metrics ---
+@api.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
 # --- Chat Endpoint ---
 @api.post("/ask")
 def ask_question(query: UserQuery) -> Dict[str, str]:
     """
     Takes user input and returns chatbot response.
     """
-    state = {"user_input": query.question, "context": "", "bot_output": ""}
+    cached = answer_cache.lookup(query.question) if answer_cache else None
+    if cached is not None and cached.value is not None:
+        return {"answer": cached.value["answer"]}
+
+    state = {"user_input": query.question, "context": None, "bot_output": ""}
     result = chatbot_app.invoke(state)
+    if cached is not None:
+        answer_cache.store(query.question, {"answer": result["bot_output"]}, vector=cached.vector)
     return {"answer": result["bot_output"]}
 
+# --- Streaming Chat Endpoint (Server-Sent Events) ---
+@api.post("/ask/stream")
+def ask_question_stream(query: UserQuery):
+    """
+    Streams the chatbot response token by token: `token` events while the
+    model generates, then one `done` event with the full answer (503 with
+    Retry-After when too many streams are already open).
+    """
+    started = time.perf_counter()
+    slot = StreamSlot()
+    docs = registry.retriever(k=3).search(query.question)
+    state = {
+        "user_input": query.question,
+        "contexts": [doc.page_content for doc in docs],
+        "bot_output": ""
+    }
+    return StreamingResponse(sse_events(slot.guard(stream_answer(state)), started),
+                             media_type="text/event-stream")
+
 # --- Run server ---
 if __name__ == "__main__":
     import uvicorn
@@ -1,15 +1,13 @@
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_huggingface import HuggingFaceEmbeddings, HuggingFacePipeline
-from langchain_chroma import Chroma
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
 from langchain.prompts import PromptTemplate
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
-import torch
 
-# --- Embeddings + Vector store ---
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 2})  # keep context tight
+from als_core.model_registry import registry
+
+# Importing this module does no model work: Flan-T5, the vector store and the
+# conversational chain are built on first use and then shared.
 
 t5_prompt = PromptTemplate(
     input_variables=["context", "question"],
@@ -23,44 +21,65 @@ t5_prompt = PromptTemplate(
 
 # --- Flan-T5 (instruction-tuned) ---
 model_name = "google/flan-t5-base"  # use flan-t5-small if RAM-limited
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-
-pipe = pipeline(
-    "text2text-generation",
-    model=model,
-    tokenizer=tokenizer,
-    truncation=True,             # ensure encoder input <= 512 tokens
-    max_new_tokens=128,          # decoder budget (output length)
-    # do_sample=True,            # uncomment to enable sampling
-    # temperature=0.3, top_p=0.95,
-    device=0 if torch.cuda.is_available() else -1,
-)
-llm = HuggingFacePipeline(pipeline=pipe)
-
-# --- Shorter memory window ---
-memory = ConversationBufferWindowMemory(
-    k=2,                         # small history to avoid overstuffing
-    memory_key="chat_history",
-    return_messages=True,
-    output_key="answer",
-)
 
-# --- RAG chain with token cap on stuffed docs ---
-rag_chain = ConversationalRetrievalChain.from_llm(
-    llm=llm,
-    retriever=retriever,
-    memory=memory,
-    return_source_documents=True,
-    verbose=True,
-    combine_docs_chain_kwargs={"prompt": t5_prompt},
-)
 
-# --- Test query ---
-query = "What are the first symptoms of ALS?"
-response = rag_chain.invoke({"question": query})
-print("Query:", query)
-print("Response:", response["answer"])
-if "source_documents" in response:
-    print("Sources:", [doc.page_content[:150] + "..." for doc in response["source_documents"]])
+def get_llm():
+    return registry.hf_llm(
+        model_name,
+        task="text2text-generation",
+        truncation=True,             # ensure encoder input <= 512 tokens
+        max_new_tokens=128,          # decoder budget (output length)
+        # do_sample=True,            # uncomment to enable sampling
+        # temperature=0.3, top_p=0.95,
+    )
+
+
+# --- Embeddings + Vector store (shared, loaded once per process) ---
+def get_retriever():
+    return registry.vectorstore().as_retriever(search_kwargs={"k": 2})  # keep context tight
+
 
+def get_rag_chain():
+    def factory():
+        from langchain.chains import ConversationalRetrievalChain
+        from langchain.memory import ConversationBufferWindowMemory
+
+        # --- Shorter memory window ---
+        memory = ConversationBufferWindowMemory(
+            k=2,                         # small history to avoid overstuffing
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="answer",
+        )
+
+        # --- RAG chain with token cap on stuffed docs ---
+        return ConversationalRetrievalChain.from_llm(
+            llm=get_llm(),
+            retriever=get_retriever(),
+            memory=memory,
+            return_source_documents=True,
+            verbose=True,
+            combine_docs_chain_kwargs={"prompt": t5_prompt},
+        )
+    return registry.get_or_create("chatbot_with_memory_chain", factory)
+
+
+# Backwards compatible lazy attributes (`from chatbot_with_memory import rag_chain`)
+_LAZY = {"vectorstore": registry.vectorstore, "llm": get_llm, "retriever": get_retriever,
+         "rag_chain": get_rag_chain}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# --- Test query ---
+if __name__ == "__main__":
+    query = "What are the first symptoms of ALS?"
+    response = get_rag_chain().invoke({"question": query})
+    print("Query:", query)
+    print("Response:", response["answer"])
+    if "source_documents" in response:
+        print("Sources:", [doc.page_content[:150] + "..." for doc in response["source_documents"]])
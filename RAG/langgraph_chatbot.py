@@ -1,58 +1,124 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
 from langgraph.graph import StateGraph, END
-from langchain_community.llms import HuggingFacePipeline
-import torch
-from langchain.llms import HuggingFaceHub
-from rag_chain import rag_chain
-from typing import TypedDict
+import re
+from typing import List, Optional, TypedDict
 import os
 from dotenv import load_dotenv
-from transformers import AutoTokenizer
+
+from als_core import config
+from als_core.context_packer import ContextPacker, PackedContext, token_counter
+from als_core.extractive import ExtractiveSummarizer
+from als_core.intent_router import EMPATHY_INTENTS, EMPATHY_KEYWORDS, IntentRouter
+from als_core.model_registry import registry
+from als_core.output_limits import OutputLimits
+from als_core.prefix_cache import register_prefix
+from als_core.semantic_cache import SemanticCache
+from als_core.streaming import stream_generate
+from als_core.tracing import GENERATION, POST_PROCESSING, PROMPT_BUILD, RETRIEVAL, span, traced
 
 load_dotenv()
 
 # --- Define the state schema ---
-class ChatState(TypedDict):
+class ChatState(TypedDict, total=False):
     user_input: str
-    context: str
+    contexts: Optional[List[str]]   # retrieved chunks, most relevant first
+    context: Optional[str]          # or one pre-joined context string
     bot_output: str
 
-# --- Initialize tokenizer & model (TinyLlama Chat) ---
-tokenizer = AutoTokenizer.from_pretrained("TinyLlama/TinyLlama-1.1B-Chat-v1.0")
-
-# --- Initialize model ---
-llm = HuggingFacePipeline.from_model_id(
-    model_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
-    task="text-generation",
-    device=0 if torch.cuda.is_available() else -1,
-    pipeline_kwargs={
-        "max_new_tokens": 280,
-        "temperature": 0.4,
-        "top_p": 0.9,
-        "repetition_penalty": 1.22,
-        "no_repeat_ngram_size": 3,
-        "eos_token_id": tokenizer.eos_token_id,
-        "pad_token_id": tokenizer.eos_token_id,   # avoids padding warnings
-        "return_full_text": False                  # don’t echo the prompt if supported
-    }
-)
+# Chunks retrieved when the caller did not supply a context
+RETRIEVE_K = 3
+
+# --- Tokenizer & model (TinyLlama Chat), loaded lazily ---
+# Both come from the shared registry, so the weights are loaded once per
+# process (and the tokenizer is the pipeline's own, not a second copy).
+# Importing this module does no model work; the API loads them through
+# registry.warm_up() at startup, anything else on first use.
+def get_tokenizer():
+    return registry.tokenizer()
+
+
+GENERATION_KWARGS = {
+    "max_new_tokens": 280,
+    "temperature": 0.4,
+    "top_p": 0.9,
+    "repetition_penalty": 1.22,
+    "no_repeat_ngram_size": 3,
+    "return_full_text": False                  # don’t echo the prompt if supported
+}
+
+
+def generation_kwargs() -> dict:
+    eos_token_id = get_tokenizer().eos_token_id
+    # pad_token_id avoids padding warnings
+    return {**GENERATION_KWARGS, "eos_token_id": eos_token_id, "pad_token_id": eos_token_id}
+
+
+def get_llm():
+    return registry.hf_llm(**generation_kwargs())
+
+# TinyLlama usually stops at EOS, but role tags as stops help
+ROLE_TAGS = ["<|system|>", "<|user|>", "<|assistant|>"]
+
+# Checked while decoding: the answer is done at a role tag or after the five
+# sentences the system prompt asks for
+ANSWER_LIMITS = OutputLimits(stop=ROLE_TAGS, max_sentences=5)
+EMPATHY_LIMITS = OutputLimits(stop=ROLE_TAGS)
 
 # --- Create LangGraph with schema ---
 graph = StateGraph(ChatState)
 
-# --- Node: Retrieve context using RAG ---
+
+# --- Instrumented generation (span + prompt/generated token counts) ---
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer().encode(text, add_special_tokens=False))
+
+
+def generate(prompt: str, step: str, limits: Optional[OutputLimits] = None) -> str:
+    with span(GENERATION, step=step) as attrs:
+        text = get_llm().invoke(prompt, output_limits=limits)
+        if limits is not None:
+            text = limits.apply(text)   # when the LLM can't stop on them itself
+        attrs["prompt_tokens"] = count_tokens(prompt)
+        attrs["generated_tokens"] = count_tokens(text)
+    return text
+
+
+# --- Node: Retrieve context (dense + BM25 search, no generation) ---
+@traced("retrieve")
 def retrieve_state(state: ChatState):
     question = state["user_input"]
-    retrieved = rag_chain.invoke({"query": question})
-    state["context"] = retrieved["result"]
+    with span(RETRIEVAL) as attrs:
+        docs = registry.retriever(k=RETRIEVE_K).search(question)
+        attrs["docs"] = len(docs)
+    state["contexts"] = [doc.page_content for doc in docs]
     return state
 
-# content summarization
-def summarize_context(context: str) -> str:
-    if len(context.split()) > 250:
-        prompt = f"Summarize the following medical context briefly:\n\n{context}\n\nSummary:"
-        summary = llm.invoke(prompt)
-        return summary.strip()
-    return context
+
+# --- Entry router: callers like RAG/main.py pass precomputed contexts ---
+def route_start(state: ChatState) -> str:
+    if state.get("contexts") is None and state.get("context") is None:
+        return "retrieve"
+    return "answer"
+
+# --- Context compression: top question-relevant sentences, no LLM pass ---
+def get_summarizer() -> ExtractiveSummarizer:
+    def factory():
+        embedder = registry.embedder()
+        return ExtractiveSummarizer(embedder.embed_documents, embedder.embed_query)
+    return registry.get_or_create("extractive_summarizer", factory)
+
+
+def summarize_context(context: str, question: str) -> str:
+    # Short contexts pass through without touching the embedder
+    if len(context.split()) <= config.SUMMARY_MAX_WORDS:
+        return context
+    with span("summarize") as attrs:
+        summary = get_summarizer().summarize(context, question)
+        attrs.update(words_in=len(context.split()), words_out=len(summary.split()))
+    return summary
 
 def _clean_context(text: str) -> str:
     # Remove prompt-style leftovers that confuse the model
@@ -73,16 +139,34 @@ def _dedupe_lines(text: str) -> str:
     return "\n".join(out)
 
 
-# --- Node: Generate context-based answer with empathy ---
-# --- Node: Generate context-based answer with empathy ---
-def answer_state(state: ChatState):
-    context = summarize_context(
-    _clean_context(
-        _dedupe_lines(state["context"])
-        )
+# --- Context packing: relevance order, near-duplicates dropped, token budget ---
+def get_packer() -> ContextPacker:
+    return registry.get_or_create(
+        "context_packer:answer", lambda: ContextPacker(token_counter(get_tokenizer()))
     )
-    question = state["user_input"]
 
+
+def pack_context(state: ChatState) -> PackedContext:
+    chunks = state.get("contexts")
+    if chunks is None:
+        chunks = re.split(r"\n\s*\n", state.get("context") or "")
+    chunks = [_clean_context(_dedupe_lines(chunk)) for chunk in chunks]
+    # Room for the template, the question and the answer itself
+    reserved = count_tokens(_chat_prompt("", state["user_input"])) + GENERATION_KWARGS["max_new_tokens"]
+    with span("context_packing") as attrs:
+        packed = get_packer().pack(chunks, reserved=reserved)
+        attrs.update(context_tokens=packed.tokens, chunks=len(packed.chunks),
+                     dropped_duplicates=packed.dropped_duplicates, dropped_budget=packed.dropped_budget)
+    return packed
+
+
+# --- Prompt builder shared by the graph node and the streaming endpoint ---
+def build_answer_prompt(state: ChatState) -> str:
+    context = summarize_context(pack_context(state).text, state["user_input"])
+    return _chat_prompt(context, state["user_input"])
+
+
+def _chat_prompt(context: str, question: str) -> str:
     # Build a proper chat prompt using the model's chat template
     messages = [
         {"role": "system",
@@ -93,26 +177,64 @@ def answer_state(state: ChatState):
          "content": f"Context:\n{context}\n\nQuestion: {question}"}
     ]
 
-    chat_prompt = tokenizer.apply_chat_template(
+    return get_tokenizer().apply_chat_template(
         messages, tokenize=False, add_generation_prompt=True
     )
 
-    # You can also pass stop sequences; TinyLlama usually stops at EOS,
-    # but adding role tags as stops can help:
-    response = llm.invoke(chat_prompt, stop=["<|system|>", "<|user|>", "<|assistant|>"])
-    state["bot_output"] = response.strip()
+
+# System message + "Context:" head, prefilled once and reused (KV cache)
+register_prefix("rag_answer", lambda slot: _chat_prompt(slot, ""))
+
+
+# --- Node: Generate context-based answer with empathy ---
+@traced("answer")
+def answer_state(state: ChatState):
+    with span(PROMPT_BUILD):
+        chat_prompt = build_answer_prompt(state)
+    response = generate(chat_prompt, step="answer", limits=ANSWER_LIMITS)
+    with span(POST_PROCESSING):
+        state["bot_output"] = response.strip()
     return state
 
-# --- Node: Handle additional empathy ---
-def empathy_state(state: ChatState):
-    user_input = state["user_input"].lower()
-    if any(word in user_input for word in ["sad", "worried", "scared", "afraid"]):
-        empathy_prompt = """
+EMPATHY_PROMPT = """
 You are a kind and supportive assistant. Write a short, comforting message to someone feeling anxious about ALS.
 """
-        state["bot_output"] += "\n\n" + llm.invoke(empathy_prompt)
+register_prefix("rag_empathy", EMPATHY_PROMPT)
+
+# Distress detection: keyword pre-filter, then nearest centroid over MiniLM
+# embeddings (no LLM call)
+def get_empathy_router() -> IntentRouter:
+    def factory():
+        embedder = registry.embedder()
+        return IntentRouter(
+            EMPATHY_INTENTS,
+            embed_documents=embedder.embed_documents,
+            embed_query=embedder.embed_query,
+            keywords=EMPATHY_KEYWORDS,
+            name="empathy",
+        )
+    return registry.get_or_create("intent_router:empathy", factory)
+
+
+def needs_empathy(user_input: str) -> bool:
+    return get_empathy_router().classify(user_input).label == "distress"
+
+# --- Node: Handle additional empathy ---
+@traced("empathy")
+def empathy_state(state: ChatState):
+    if needs_empathy(state["user_input"]):
+        state["bot_output"] += "\n\n" + generate(EMPATHY_PROMPT, step="empathy", limits=EMPATHY_LIMITS)
     return state
 
+
+# --- Streaming variant of answer + empathy (tokens as they are decoded) ---
+def stream_answer(state: ChatState):
+    yield from stream_generate(build_answer_prompt(state), output_limits=ANSWER_LIMITS, **generation_kwargs())
+    if needs_empathy(state["user_input"]):
+        yield "\n\n"
+        yield from stream_generate(EMPATHY_PROMPT, output_limits=EMPATHY_LIMITS, **generation_kwargs())
+
+
 # --- Build Graph ---
 graph.add_node("retrieve", retrieve_state)
 graph.add_node("answer", answer_state)
@@ -121,14 +243,23 @@ graph.add_node("empathy", empathy_state)
 graph.add_edge("retrieve", "answer")
 graph.add_edge("answer", "empathy")
 graph.add_edge("empathy", END)
-graph.add_edge("__start__", "retrieve")
+graph.add_conditional_edges("__start__", route_start, {"retrieve": "retrieve", "answer": "answer"})
 
 app = graph.compile()
 
+# --- Semantic answer cache in front of app.invoke ---
+# Near-duplicate questions ("early symptoms of ALS?" / "first signs of ALS")
+# reuse the stored answer instead of running retrieval + generation again.
+# Entries are dropped when the Chroma store changes on disk.
+answer_cache = SemanticCache(
+    embed_fn=lambda question: registry.embedder().embed_query(question),
+    version_fn=registry.index_version,
+) if config.CACHE_ENABLED else None
+
 # --- Test run ---
 if __name__ == "__main__":
     user_input = input("You: ")
-    state = {"user_input": user_input, "context": "", "bot_output": ""}
+    state = {"user_input": user_input, "context": None, "bot_output": ""}
     result = app.invoke(state)
     print("\nBot:", result["bot_output"])
 
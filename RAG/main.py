@@ -4,14 +4,37 @@ Provides Swagger documentation, connects to Chroma vector DB,
 retrieves context for user queries, and uses LangGraph chatbot for responses.
 """
 
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
+import time
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-from langgraph_chatbot import app as langgraph_app
-from rag_setup import load_vectorstore   # Your DB loader
+from als_core.chunking import build_filter
+from als_core.inference_executor import add_exception_handlers
+from als_core.metrics import CONTENT_TYPE, metrics
+from als_core.model_registry import registry
+from als_core.streaming import StreamSlot, sse_events
+from als_core.tracing import RETRIEVAL, TracingMiddleware, span
+from langgraph_chatbot import answer_cache, app as langgraph_app, stream_answer
 # from rag_chain import clean_text         # Optional if needed
 
+
+# -------------------------
+# Model lifecycle (warm-up / teardown)
+# -------------------------
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    registry.warm_up()
+    yield
+    registry.teardown()
+
 # -------------------------
 # Initialize API
 # -------------------------
@@ -24,33 +47,86 @@ This API powers the ALS Support Chatbot using:
 - **LangGraph for conversation flow**  
 - **LLM for empathetic answer generation**
 
-You can use `/ask` to ask any ALS-related question.
+You can use `/ask` to ask any ALS-related question, or `/ask/stream` to
+receive the answer token by token as Server-Sent Events.
 """,
     version="1.2.0",
     contact={
         "name": "ALS Buddy",
         "url": "https://github.com/Mizbain-Fathima/ALS_Buddy",
-    }
+    },
+    lifespan=lifespan,
 )
-
-# -------------------------
-# Load Vector DB
-# -------------------------
-vectorstore = load_vectorstore()
+# Request IDs (X-Request-ID), stage traces and per-request structured logs
+api.add_middleware(TracingMiddleware)
+add_exception_handlers(api)   # 503 + Retry-After when all streaming slots are taken
 
 
 # -------------------------
 # Swagger Request + Response Models
 # -------------------------
 
+class SourceFilter(BaseModel):
+    """Restrict retrieval to matching sources (each field: any of the values)."""
+    domain: Optional[List[str]] = None      # e.g. ["ninds.nih.gov"]
+    publisher: Optional[List[str]] = None   # e.g. ["nih.gov"]
+    topic: Optional[List[str]] = None       # e.g. ["caregiving", "genetics"]
+    doc_type: Optional[List[str]] = None    # "guide" or "article"
+
+
 class UserQuery(BaseModel):
     question: str = "What are the early symptoms of ALS?"
     top_k: int = 3
+    filters: Optional[SourceFilter] = None
+
+
+class Citation(BaseModel):
+    url: str
+    domain: str
+    topic: str
+    chunk: int
 
 
 class AnswerResponse(BaseModel):
     answer: str
     retrieved_contexts: List[str]
+    citations: List[Citation] = []
+
+
+# -------------------------
+# Retrieval helpers
+# -------------------------
+def _source_filters(query: UserQuery) -> Optional[Dict[str, List[str]]]:
+    return query.filters.model_dump(exclude_none=True) if query.filters else None
+
+
+def _filters(query: UserQuery) -> Optional[Dict]:
+    return build_filter(_source_filters(query))
+
+
+def _cache_namespace(query: UserQuery) -> str:
+    return f"top_k={query.top_k};filters={_filters(query)}"
+
+
+def retrieve(query: UserQuery) -> Tuple[List[str], List[Citation]]:
+    """
+    Top-k chunks for the question: dense and BM25 results fused with RRF.
+    Filters are pushed down into Chroma and applied to the BM25 hits.
+    """
+    with span(RETRIEVAL) as attrs:
+        docs = registry.retriever(k=query.top_k).search(query.question, filters=_source_filters(query))
+        attrs["docs"] = len(docs)
+    contexts = [doc.page_content for doc in docs]
+    citations = [
+        Citation(
+            url=doc.metadata.get("url", ""),
+            domain=doc.metadata.get("domain", ""),
+            topic=doc.metadata.get("topic", ""),
+            chunk=doc.metadata.get("chunk", -1),
+        )
+        for doc in docs
+    ]
+    return contexts, citations
 
 
 # -------------------------
@@ -64,6 +140,23 @@ def home():
     return {"message": "ALS Support Chatbot API is running!"}
 
 
+@api.get("/cache/stats", tags=["Health Check"])
+def cache_stats():
+    """
+    Hit/miss counters of the semantic answer cache.
+    """
+    return answer_cache.stats() if answer_cache else {"enabled": False}
+
+
+@api.get("/metrics", tags=["Health Check"])
+def prometheus_metrics():
+    """
+    Prometheus metrics: stage / graph node durations, token and retrieved-doc
+    counts, cache and batching counters.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
 # -------------------------
 # Main Chat Route
 # -------------------------
@@ -74,30 +167,94 @@ def ask_question(query: UserQuery):
 
     **How it works:**
     1. Your query is embedded  
-    2. Top `k` similar documents are retrieved from ChromaDB  
+    2. Top `k` documents are retrieved from ChromaDB and the BM25 keyword
+       index (merged with reciprocal rank fusion)
+       (optionally restricted by `filters` on domain, publisher, topic, doc_type)  
     3. RAG context is fed into LangGraph  
     4. LLM produces an empathetic response  
+
+    Near-duplicates of recently answered questions are served from the
+    semantic answer cache without retrieval or generation.
     """
 
+    # 0. Serve near-duplicate questions from the semantic cache
+    namespace = _cache_namespace(query)
+    cached = answer_cache.lookup(query.question, namespace) if answer_cache else None
+    if cached is not None and cached.value is not None:
+        return AnswerResponse(**cached.value)
+
     # 1. Retrieve context from vector DB
-    docs = vectorstore.similarity_search(query.question, k=query.top_k)
-    contexts = [doc.page_content for doc in docs]
-    joined_context = "\n\n".join(contexts)
+    contexts, citations = retrieve(query)
 
-    # 2. Prepare state for LangGraph
+    # 2. Prepare state for LangGraph (chunks in relevance order; the graph
+    #    packs them into the prompt's token budget)
     state = {
         "user_input": query.question,
-        "context": joined_context,
+        "contexts": contexts,
         "bot_output": ""
     }
 
-    # 3. Invoke LangGraph chatbot
+    # 3. Invoke LangGraph chatbot (the context is precomputed, so the graph
+    #    goes straight to the answer node without retrieving again)
     result = langgraph_app.invoke(state)
 
-    return AnswerResponse(
+    response = AnswerResponse(
         answer=result["bot_output"],
-        retrieved_contexts=contexts
+        retrieved_contexts=contexts,
+        citations=citations,
     )
+    if cached is not None:
+        answer_cache.store(query.question, response.model_dump(), namespace, vector=cached.vector)
+    return response
+
+
+# -------------------------
+# Streaming Chat Route
+# -------------------------
+@api.post("/ask/stream", tags=["Chatbot"])
+def ask_question_stream(query: UserQuery):
+    """
+    Same pipeline as `/ask`, but the answer is streamed as Server-Sent Events:
+
+    - `token` events carry `{"text": ...}` pieces as soon as they are generated
+    - a final `done` event carries the full `answer`, `retrieved_contexts`
+      and `citations`
+
+    Answers 503 with `Retry-After` when too many streams are already open.
+    """
+    started = time.perf_counter()
+
+    namespace = _cache_namespace(query)
+    cached = answer_cache.lookup(query.question, namespace) if answer_cache else None
+    if cached is not None and cached.value is not None:
+        hit = cached.value
+        events = sse_events(
+            iter([hit["answer"]]), started,
+            done=lambda answer: {k: v for k, v in hit.items() if k != "answer"},
+        )
+        return StreamingResponse(events, media_type="text/event-stream")
+
+    slot = StreamSlot()     # before retrieval: a refused request does no work
+    contexts, citations = retrieve(query)
+
+    state = {
+        "user_input": query.question,
+        "contexts": contexts,
+        "bot_output": ""
+    }
+
+    def done(answer: str) -> Dict:
+        extra = {
+            "retrieved_contexts": contexts,
+            "citations": [c.model_dump() for c in citations],
+        }
+        if cached is not None:
+            answer_cache.store(query.question, {"answer": answer.strip(), **extra},
+                               namespace, vector=cached.vector)
+        return extra
+
+    events = sse_events(slot.guard(stream_answer(state)), started, done=done)
+    return StreamingResponse(events, media_type="text/event-stream")
 
 
 # -------------------------
@@ -1,40 +1,61 @@
-from langchain.chains import RetrievalQA
-from langchain_community.llms import HuggingFacePipeline  # Free, local LLM
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import transformers
-import torch
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
+from als_core.model_registry import registry
+
+# Importing this module does no model work: the vector store, distilgpt2 and
+# the chain are built on first use (or by registry.warm_up) and then shared.
+
+
+# Load the persisted vectorstore (from your rag_setup.py) through the shared
+# registry, so the embedder and Chroma client are reused by every module
+def get_vectorstore():
+    return registry.vectorstore()
 
-# Load the persisted vectorstore (from your rag_setup.py)
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
 
 # Initialize a free, local LLM (HuggingFace model)
 # Using DistilGPT-2 for speed/efficiency; change to "gpt2" for full GPT-2 if needed
-llm = HuggingFacePipeline.from_model_id(
-    model_id="distilgpt2",  # Lightweight model; runs locally
-    task="text-generation",
-    device=0 if torch.cuda.is_available() else -1,  # Use GPU if available, else CPU
-    model_kwargs={"temperature": 0.4, "max_length": 512}  # Adjust for creativity/response length
-)
+def get_llm():
+    return registry.hf_llm(
+        "distilgpt2",  # Lightweight model; runs locally
+        temperature=0.4, max_length=512  # Adjust for creativity/response length
+    )
+
 
 # Set up retriever and RAG chain
-retriever = vectorstore.as_retriever(search_kwargs={"k": 3})  # Retrieve top 3 relevant chunks
+def get_retriever():
+    return get_vectorstore().as_retriever(search_kwargs={"k": 3})  # Retrieve top 3 relevant chunks
 
-rag_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    retriever=vectorstore.as_retriever(),
-    chain_type="stuff",
-    return_source_documents=True  # Optional: Returns source chunks for transparency
-)
 
-# Example query
-query = "What are early symptoms of ALS?"
-response = rag_chain.invoke({"query": query})  # Updated method for newer LangChain
+def get_rag_chain():
+    def factory():
+        from langchain.chains import RetrievalQA
+        return RetrievalQA.from_chain_type(
+            llm=get_llm(),
+            retriever=get_vectorstore().as_retriever(),
+            chain_type="stuff",
+            return_source_documents=True  # Optional: Returns source chunks for transparency
+        )
+    return registry.get_or_create("rag_chain", factory)
+
+
+# Backwards compatible lazy attributes (`from rag_chain import rag_chain`)
+_LAZY = {"vectorstore": get_vectorstore, "llm": get_llm, "retriever": get_retriever, "rag_chain": get_rag_chain}
 
-print("Query:", query)
-print("Response:", response["result"])
-if "source_documents" in response:
-    print("Sources:", [doc.page_content[:200] + "..." for doc in response["source_documents"]])  # Preview sources
 
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+
+# Example query
+if __name__ == "__main__":
+    query = "What are early symptoms of ALS?"
+    response = get_rag_chain().invoke({"query": query})  # Updated method for newer LangChain
+
+    print("Query:", query)
+    print("Response:", response["result"])
+    if "source_documents" in response:
+        print("Sources:", [doc.page_content[:200] + "..." for doc in response["source_documents"]])  # Preview sources
@@ -1,53 +1,145 @@
-#from langchain.embeddings import OpenAIEmbeddings # install langchain-openai
-#from langchain_openai import OpenAIEmbeddings # install langchain-openai
-
-#Because openai credits are finished, we will use HuggingFace embeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-
-# Deprecated warning is an harmless warning so in future if needed then use
-# pip install -U langchain-huggingface
-from langchain_huggingface import HuggingFaceEmbeddings
-
-#from langchain.vectorstores import Chroma # install langchain-chroma and for chromdb install chromadb 
-from langchain_community.vectorstores import Chroma # install langchain-community and for chromdb install chromadb
-
-#from langchain.docstore.document import Document # install langchain-community
-from langchain_core.documents import Document # install langchain-core
-import json
+"""
+Incremental, idempotent ingestion of the scraped ALS articles into Chroma.
+
+Articles are split one by one and every chunk gets a stable content-hash ID
+(see als_core.chunking). Each run compares those IDs with what is already in
+the collection and only:
+
+- embeds and upserts chunks that are new or whose text changed,
+- deletes chunks whose text changed or whose source article disappeared,
+- refreshes the metadata (url, domain, topic, ordinal, ...) of unchanged
+  chunks when it differs, without re-embedding them.
+
+The BM25 keyword index persisted next to the store (see
+als_core.hybrid_search) receives the same changes, and the memory-mapped
+snapshot served with ALS_VECTOR_BACKEND=snapshot (see
+als_core.vector_snapshot) is re-exported when anything changed.
+
+Re-running on an unchanged als_articles_expanded.json does no embedding work.
+
+Usage:
+    python RAG/rag_setup.py
+    python RAG/rag_setup.py --batch-size 128 --dry-run
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
+from chromadb.errors import NotFoundError
 from dotenv import load_dotenv
-import os
-
-# for HuggingFace embeddings install sentence-transformers 
-# and use from langchain_community.embeddings import HuggingFaceEmbeddings
-
-# Load chunks from preprocessing (assuming you saved them or have them in memory)
-# If not, load from your JSON or rerun preprocessing
-with open('../webscrapped-data/als_articles_expanded.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
 
-all_text = " ".join([d["content"] for d in data])
+from als_core import config
+from als_core.chunking import Chunk, load_articles, split_articles
+from als_core.model_registry import registry
+from als_core.vector_snapshot import MANIFEST, export_snapshot, snapshot_dir
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50)
-chunks = text_splitter.split_text(all_text)
-
-# Create Document objects
-docs = [Document(page_content=text) for text in chunks]
-
-# Initialize embeddings (replace with your OpenAI API key)
 load_dotenv()
-# embeddings = OpenAIEmbeddings(api_key=os.getenv("openai_api_key"))
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-
-# Most powerful embeddings
-# embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-
-# Create and persist Chroma vectorstore
-vectorstore = Chroma.from_documents(docs, embedding=embeddings, persist_directory="./chroma_db")
-# vectorstore.persist()
-# commented because data is auto-persisted on creation in latest versions
 
-print("Vectorstore created and persisted in ./chroma_db")
 
+def _batches(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_vectorstore():
+    """LangChain view of the persisted store (shared, loaded once per process)."""
+    return registry.vectorstore()
+
+
+def ingest(
+    data_path: Path = config.DATA_PATH,
+    persist_dir: Path = config.CHROMA_DIR,
+    collection_name: str = config.COLLECTION_NAME,
+    batch_size: int = 64,
+    chunk_size: int = 400,
+    chunk_overlap: int = 50,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    started = time.perf_counter()
+
+    # Split per article with stable IDs
+    chunks = split_articles(load_articles(data_path), chunk_size, chunk_overlap)
+    wanted: Dict[str, Chunk] = {chunk.id: chunk for chunk in chunks}
+
+    # Diff against what is already stored (a dry run never creates the collection)
+    try:
+        collection = registry.collection(collection_name, persist_dir, create=not dry_run)
+        stored = collection.get(include=["metadatas"])
+        existing = dict(zip(stored["ids"], stored["metadatas"]))
+    except NotFoundError:
+        existing = {}
+    to_add = [chunk for chunk_id, chunk in wanted.items() if chunk_id not in existing]
+    to_delete = sorted(existing.keys() - wanted.keys())
+    to_relabel = [
+        chunk for chunk_id, chunk in wanted.items()
+        if chunk_id in existing and existing[chunk_id] != chunk.metadata
+    ]
+
+    stats = {
+        "chunks": len(wanted),
+        "unchanged": len(wanted) - len(to_add),
+        "added": len(to_add),
+        "deleted": len(to_delete),
+        "relabelled": len(to_relabel),
+    }
+    if dry_run:
+        return stats
+
+    # Keyword index, loaded (or built from the collection) before it changes
+    bm25 = registry.bm25_index(collection_name, persist_dir)
+
+    for ids in _batches(to_delete, batch_size):
+        collection.delete(ids=ids)
+    bm25.delete(to_delete)
+
+    # Metadata-only changes (e.g. chunk ordinals shifted) need no embedding
+    for batch in _batches(to_relabel, batch_size):
+        collection.update(ids=[chunk.id for chunk in batch], metadatas=[chunk.metadata for chunk in batch])
+    bm25.update_metadata([chunk.id for chunk in to_relabel], [chunk.metadata for chunk in to_relabel])
+
+    # Embed only the new / changed chunks, in batches
+    embedder = registry.embedder()
+    for batch in _batches(to_add, batch_size):
+        texts = [chunk.text for chunk in batch]
+        collection.upsert(
+            ids=[chunk.id for chunk in batch],
+            embeddings=embedder.embed_documents(texts),
+            documents=texts,
+            metadatas=[chunk.metadata for chunk in batch],
+        )
+        bm25.add([chunk.id for chunk in batch], texts, [chunk.metadata for chunk in batch])
+    bm25.save()
+
+    # Contiguous float32 export that the API workers memory-map
+    snapshot = snapshot_dir(collection_name, persist_dir)
+    if to_add or to_delete or to_relabel or not (snapshot / MANIFEST).exists():
+        stats["snapshot"] = export_snapshot(collection, snapshot)["version"]
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync the ALS articles into Chroma.")
+    parser.add_argument("--data", type=Path, default=config.DATA_PATH)
+    parser.add_argument("--persist-dir", type=Path, default=config.CHROMA_DIR)
+    parser.add_argument("--collection", default=config.COLLECTION_NAME)
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks embedded per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=400)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    result = ingest(
+        data_path=args.data,
+        persist_dir=args.persist_dir,
+        collection_name=args.collection,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        dry_run=args.dry_run,
+    )
+    print(f"Vectorstore in sync at {args.persist_dir}: {result}")
@@ -1,12 +1,37 @@
 """
 Simple FastAPI server that exposes POST /ask and uses the LCEL workflow above.
+Inference runs on a bounded worker pool so the event loop (and /health) stays
+responsive while TinyLlama is generating.
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 from langgraph_chatbot_lcel import handle_message
+from rag_chain_lcel import get_retriever
+from als_core.inference_executor import InferenceExecutor, add_exception_handlers
+from als_core.metrics import CONTENT_TYPE, metrics
+from als_core.model_registry import registry
+from als_core.tracing import TracingMiddleware
+
+executor = InferenceExecutor()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Load the embedder, the als_chunks store and TinyLlama once per worker
+    registry.warm_up(["embedder", "llm"])
+    get_retriever()
+    yield
+    executor.shutdown()
+    registry.teardown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+add_exception_handlers(app)
+app.add_middleware(TracingMiddleware)
 
 class AskRequest(BaseModel):
     question: str
@@ -15,11 +40,21 @@ class AskRequest(BaseModel):
 class AskResponse(BaseModel):
     answer: str
     intent: str
+    intent_confidence: float = 0.0
+
+@app.get('/health')
+async def health():
+    return {"status": "ok", "inference": executor.stats()}
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
 
 @app.post('/ask', response_model=AskResponse)
-async def ask(req: AskRequest):
-    out = handle_message(req.session_id, req.question)
-    return AskResponse(answer=out['answer'], intent=out.get('intent','unknown'))
+async def ask(req: AskRequest, request: Request):
+    out = await executor.run(handle_message, req.session_id, req.question, request=request)
+    return AskResponse(answer=out['answer'], intent=out.get('intent','unknown'),
+                       intent_confidence=out.get('intent_confidence', 0.0))
 
 if __name__ == '__main__':
     uvicorn.run('api_main_lcel:app', host='0.0.0.0', port=8080, reload=True)
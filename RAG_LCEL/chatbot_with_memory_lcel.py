@@ -1,36 +1,44 @@
 """
 Provides a simple memory layer wrapper around run_rag.
-Memory is persisted locally as JSON per session_id.
+Memory is persisted in a SQLite session store (als_core.session_store): each
+turn is appended in O(1), and only the most recent turns that fit the token
+budget are injected into the prompt. Legacy per-session JSON files found in
+MEM_DIR are imported on first use.
 """
-import json
 from pathlib import Path
-from typing import Optional
 from rag_chain_lcel import run_rag
 
+from als_core.model_registry import registry
+from als_core.session_store import SessionStore, format_history
+from als_core.tracing import span
+
 MEM_DIR = Path(__file__).resolve().parent / 'memory'
-MEM_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def get_store() -> SessionStore:
+    return registry.get_or_create("session_store", SessionStore)
 
 
 def load_memory(session_id: str) -> str:
-    path = MEM_DIR / f"{session_id}.json"
-    if not path.exists():
-        return ""
-    data = json.loads(path.read_text(encoding='utf-8'))
-    # assume data is list of {"user":..., "bot":...}
-    return "\n".join([f"User: {d['user']}\nBot: {d['bot']}" for d in data])
+    store = get_store()
+    legacy = MEM_DIR / f"{session_id}.json"
+    if legacy.exists() and store.turn_count(session_id) == 0:
+        store.import_json(session_id, legacy)
+    return format_history(store.history(session_id))
 
 
 def update_memory(session_id: str, user_msg: str, bot_msg: str):
-    path = MEM_DIR / f"{session_id}.json"
-    arr = []
-    if path.exists():
-        arr = json.loads(path.read_text(encoding='utf-8'))
-    arr.append({"user": user_msg, "bot": bot_msg})
-    path.write_text(json.dumps(arr, ensure_ascii=False, indent=2), encoding='utf-8')
+    get_store().append(session_id, user_msg, bot_msg)
+
+
+def clear_memory(session_id: str):
+    get_store().delete(session_id)
 
 
 def chat_with_memory(session_id: str, user_input: str) -> str:
-    mem = load_memory(session_id)
+    with span("memory"):
+        mem = load_memory(session_id)
     bot_answer = run_rag(user_input, memory_context=mem)
-    update_memory(session_id, user_input, bot_answer)
+    with span("memory"):
+        update_memory(session_id, user_input, bot_answer)
     return bot_answer
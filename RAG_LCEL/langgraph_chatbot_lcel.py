@@ -1,49 +1,80 @@
 """
 High-level orchestration and intent routing. Simplified LCEL-style flow.
 """
+import sys
 from typing import Dict
-from langchain_community.llms import HuggingFacePipeline
-from transformers import AutoTokenizer
-import torch
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
 
+from als_core.intent_router import LCEL_INTENTS, LCEL_KEYWORDS, IntentResult, IntentRouter
+from als_core.model_registry import registry
+from als_core.output_limits import OutputLimits
+from als_core.prefix_cache import register_prefix
+from als_core.tracing import GENERATION, span
 from chatbot_with_memory_lcel import chat_with_memory
 
-# Load TinyLlama tokenizer
-tokenizer = AutoTokenizer.from_pretrained("TinyLlama/TinyLlama-1.1B-Chat-v1.0")
-
-# Local TinyLlama model (NO API KEY, NO OPENAI)
-llm = HuggingFacePipeline.from_model_id(
-    model_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
-    task="text-generation",
-    device=0 if torch.cuda.is_available() else -1,
-    pipeline_kwargs={
-        "max_new_tokens": 120,
-        "temperature": 0.3,
-        "top_p": 0.9,
-        "repetition_penalty": 1.2,
-        "eos_token_id": tokenizer.eos_token_id,
-        "pad_token_id": tokenizer.eos_token_id,
-        "return_full_text": False
-    }
+# Local TinyLlama model (NO API KEY, NO OPENAI), loaded on first use or by
+# registry.warm_up(); the tokenizer is the shared pipeline's own
+def get_llm():
+    tokenizer = registry.tokenizer()
+    return registry.hf_llm(
+        max_new_tokens=120,
+        temperature=0.3,
+        top_p=0.9,
+        repetition_penalty=1.2,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.eos_token_id,
+        return_full_text=False
+    )
+
+
+# LLM intent classifier (TinyLlama), only used when the router is unsure
+INTENT_PROMPT = (
+    "Classify the user's intent into one of the following labels:\n"
+    "ask_als, personal, out_of_scope.\n\n"
+    "Text: {text}\n\nAnswer with only the label."
 )
+# Constant preamble, prefilled once and reused (KV cache)
+register_prefix("lcel_intent", lambda slot: INTENT_PROMPT.format(text=slot))
+# Only the first word is read: stop decoding once it is complete
+INTENT_LIMITS = OutputLimits(max_words=1)
 
 
-# Intent Classifier using TinyLlama
-def classify_intent(text: str) -> str:
-    prompt = (
-        "Classify the user's intent into one of the following labels:\n"
-        "ask_als, personal, out_of_scope.\n\n"
-        f"Text: {text}\n\nAnswer with only the label."
-    )
+def classify_intent_llm(text: str) -> str:
+    prompt = INTENT_PROMPT.format(text=text)
+
+    with span(GENERATION, step="intent"):
+        response = get_llm().invoke(prompt, output_limits=INTENT_LIMITS)
+    words = response.strip().split()
+    return words[0].strip(".,:;\"'").lower() if words else "out_of_scope"
+
+
+# Intent router: keywords, then nearest centroid over MiniLM embeddings
+def get_intent_router() -> IntentRouter:
+    def factory():
+        embedder = registry.embedder()
+        return IntentRouter(
+            LCEL_INTENTS,
+            embed_documents=embedder.embed_documents,
+            embed_query=embedder.embed_query,
+            keywords=LCEL_KEYWORDS,
+            fallback=classify_intent_llm,
+            name="lcel",
+        )
+    return registry.get_or_create("intent_router:lcel", factory)
+
 
-    response = llm.invoke(prompt)
-    label = response.strip().split()[0].lower()
-    return label
+def classify_intent(text: str) -> IntentResult:
+    with span("intent") as attrs:
+        result = get_intent_router().classify(text)
+        attrs["method"] = result.method
+    return result
 
 
 # Main message handler
 def handle_message(session_id: str, text: str) -> Dict[str, str]:
-    intent = classify_intent(text)
+    routed = classify_intent(text)
+    intent = routed.label
 
     if intent in ("ask_als", "personal"):
         ans = chat_with_memory(session_id, text)
@@ -53,7 +84,7 @@ def handle_message(session_id: str, text: str) -> Dict[str, str]:
             "For medical or legal advice, please consult a licensed professional."
         )
 
-    return {"answer": ans, "intent": intent}
+    return {"answer": ans, "intent": intent, "intent_confidence": round(routed.confidence, 3)}
 
 
 # Optional test block
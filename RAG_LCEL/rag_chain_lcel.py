@@ -2,28 +2,27 @@
 Usage: import rag_chain_lcel and call `run_rag(question, memory_context=None)`
 This file demonstrates LCEL-style composition using LangChain primitives.
 """
+import sys
 from typing import Optional, List
-from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-import chromadb
-from chromadb.config import Settings
 from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
+
+from als_core import config
+from als_core.context_packer import ContextPacker, openai_token_counter
+from als_core.model_registry import registry
+from als_core.tracing import GENERATION, PROMPT_BUILD, RETRIEVAL, span
 
 BASE_DIR = Path(__file__).resolve().parent
 CHROMA_DIR = BASE_DIR / 'chroma_db'
 EMBED_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
 LLM_MODEL = 'gpt-4o-mini'  # replace with available model or use HF model wrapper
 
-# Retriever
-def get_retriever(top_k: int = 5):
-    client = chromadb.Client(Settings(persist_directory=str(CHROMA_DIR), chroma_db_impl="duckdb+parquet"))
-    collection = client.get_collection(name='als_chunks')
-    embed = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    chroma = Chroma(collection_name='als_chunks', embedding_function=embed, client=client)
-    return chroma.as_retriever(search_kwargs={"k": top_k})
+# Retriever: dense + BM25 fused with RRF (client, collection, embedder and
+# keyword index are shared registry singletons)
+def get_retriever(top_k: int = 4):
+    return registry.retriever(k=top_k, collection_name='als_chunks', persist_dir=CHROMA_DIR)
 
 # Prompt template
 PROMPT_TPL = """
@@ -45,14 +44,32 @@ USER QUESTION:
 prompt = PromptTemplate(input_variables=["context", "memory", "question"], template=PROMPT_TPL)
 
 
-def run_rag(question: str, memory_context: Optional[str] = "", top_k: int = 5) -> str:
+# Packs retrieved chunks (relevance order, near-duplicates dropped) into
+# ALS_CONTEXT_MAX_TOKENS, counted in the chat model's own tokens
+def get_packer() -> ContextPacker:
+    return registry.get_or_create(
+        "context_packer:lcel",
+        lambda: ContextPacker(openai_token_counter(LLM_MODEL), window=config.OPENAI_CONTEXT_WINDOW,
+                              separator="\n---\n"),
+    )
+
+
+def run_rag(question: str, memory_context: Optional[str] = "", top_k: int = 4) -> str:
     retriever = get_retriever(top_k=top_k)
-    results = retriever.get_relevant_documents(question)
-    context = "\n---\n".join([r.page_content for r in results]) if results else ""
+    with span(RETRIEVAL) as attrs:
+        results = retriever.get_relevant_documents(question)
+        attrs["docs"] = len(results)
 
-    final_prompt = prompt.format(context=context, memory=memory_context or "", question=question)
+    with span(PROMPT_BUILD) as attrs:
+        packer = get_packer()
+        # Template, memory, question and the answer come out of the window first
+        reserved = packer.count_tokens(prompt.format(context="", memory=memory_context or "", question=question))
+        packed = packer.pack([r.page_content for r in results], reserved=reserved + config.OPENAI_ANSWER_TOKENS)
+        attrs.update(context_tokens=packed.tokens, reserved_tokens=reserved)
+        final_prompt = prompt.format(context=packed.text, memory=memory_context or "", question=question)
 
     # Use a chat model — you can swap to HF models
-    llm = ChatOpenAI(temperature=0.2, model_name="gpt-4o-mini")
-    resp = llm([HumanMessage(content=final_prompt)])
+    llm = registry.chat_openai(LLM_MODEL, temperature=0.2)
+    with span(GENERATION, step="answer"):
+        resp = llm([HumanMessage(content=final_prompt)])
     return resp.content
@@ -2,24 +2,17 @@
 RAG chain implemented in LCEL style with NEW Chroma v0.5+ API
 """
 
+import sys
 from typing import Optional
 from pathlib import Path
-
-# NEW LangChain community imports
-# from langchain_community.chat_models import ChatOpenAI
-from langchain_openai import ChatOpenAI
-from langchain_community.vectorstores import Chroma
-
-# NEW embeddings 
-from langchain_huggingface import HuggingFaceEmbeddings
-
-# NEW Chroma Client
-from langchain_chroma import Chroma
-from chromadb import PersistentClient
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repo root, for als_core
 
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
 
+# Embedder, Chroma client and LLM handles are process-wide singletons
+from als_core.model_registry import registry
+
 # CONFIG
 BASE_DIR = Path(__file__).resolve().parent
 CHROMA_DIR = BASE_DIR / "chroma_db"
@@ -28,25 +21,15 @@ EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 LLM_MODEL = "gpt-4o-mini"   # change if needed
 
 # RETRIEVER 
-def get_retriever(top_k: int = 5):
+def get_retriever(top_k: int = 4):
     """
-    Uses NEW Chroma persistent client + LCEL compatible vector store
+    Uses NEW Chroma persistent client + LCEL compatible vector store, fused
+    with the BM25 keyword index (reciprocal rank fusion).
+    The client, collection, embedder and index are loaded once by the
+    registry; only the (cheap) retriever view is created per call.
     """
-    client = PersistentClient(path=str(CHROMA_DIR))
-
     # Access the SAME collection created in rag_setup_lcel.py
-    collection = client.get_collection("als_chunks")
-
-    embedder = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-
-    # Create a LangChain-compatible vectorstore wrapper
-    vectorstore = Chroma(
-        client=client,
-        collection_name="als_chunks",
-        embedding_function=embedder,
-    )
-
-    return vectorstore.as_retriever(search_kwargs={"k": top_k})
+    return registry.retriever(k=top_k, collection_name="als_chunks", persist_dir=CHROMA_DIR)
 
 # PROMPT
 PROMPT_TPL = """
@@ -74,7 +57,7 @@ prompt = PromptTemplate(
 def run_rag(
     question: str,
     memory_context: Optional[str] = "",
-    top_k: int = 5
+    top_k: int = 4
 ) -> str:
 
     retriever = get_retriever(top_k=top_k)
@@ -90,11 +73,8 @@ def run_rag(
         question=question,
     )
 
-    # LLM (LCEL compatible)
-    llm = ChatOpenAI(
-        temperature=0.2,
-        model_name=LLM_MODEL
-    )
+    # LLM (LCEL compatible, cached by the registry)
+    llm = registry.chat_openai(LLM_MODEL, temperature=0.2)
 
     response = llm([HumanMessage(content=final_prompt)])
 
@@ -1,14 +1,55 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from RAG.langgraph_chatbot import chat
+from RAG_LEL.langgraph_chatbot import chat
+from RAG_LEL.rag_chain import get_llm, get_parallel_chain, get_support_router
+from RAG_LEL.rag_setup import get_retriever
+from als_core import config
+from als_core.inference_executor import InferenceExecutor, add_exception_handlers
+from als_core.metrics import CONTENT_TYPE, metrics
+from als_core.model_registry import registry
+from als_core.tracing import TracingMiddleware
+
+# Blocking generation runs here, never on the event loop
+executor = InferenceExecutor()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Load the embedder, vector store and TinyLlama once per worker
+    registry.warm_up(["embedder", "llm"])
+    get_retriever()
+    get_support_router()
+    if config.LEL_EXECUTION == "parallel":
+        get_parallel_chain()
+    else:
+        get_llm()
+    yield
+    executor.shutdown()
+    registry.teardown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+add_exception_handlers(app)
+app.add_middleware(TracingMiddleware)
 
 class Query(BaseModel):
     question: str
 
 
+@app.get("/health")
+async def health():
+    return {"status": "ok", "inference": executor.stats()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
 @app.post("/chat")
-async def ask(query: Query):
-    result = chat(query.question)
+async def ask(query: Query, request: Request):
+    result = await executor.run(chat, query.question, request=request)
     return {"answer": result}
@@ -1,6 +1,6 @@
 from langgraph.graph import StateGraph
 from typing import TypedDict
-from RAG.rag_chain import answer_question
+from RAG_LEL.rag_chain import answer_question
 
 
 class ChatState(TypedDict):
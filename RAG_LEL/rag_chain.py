@@ -1,55 +1,137 @@
-from langchain_huggingface import HuggingFacePipeline
+import time
+from typing import Dict, List, Sequence
+
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chains.combine_documents import create_stuff_documents_chain
-# from langchain.chains.combine_documents import StuffDocumentsChain
 from langchain_core.documents import Document
 from .prompts import rag_prompt, support_prompt
 from .rag_setup import get_retriever
-from transformers import pipeline
+from als_core import config
+from als_core.context_packer import ContextPacker, token_counter
+from als_core.intent_router import EMPATHY_INTENTS, EMPATHY_KEYWORDS, IntentRouter
+from als_core.model_registry import registry
+from als_core.output_limits import OutputLimits
+from als_core.prefix_cache import register_prefix
+from als_core.tracing import GENERATION, POST_PROCESSING, PROMPT_BUILD, RETRIEVAL, span
 import os
 os.environ["HF_HUB_OFFLINE"] = "1"
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
-from langchain_core.runnables import RunnableParallel
+from langchain_core.runnables import RunnableLambda, RunnableParallel
 from langchain_core.prompts import PromptTemplate
 
-retriever = get_retriever()
-
-hf_pipeline = pipeline(
-    "text-generation",
-    model="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
-    max_new_tokens=200,
-    repetition_penalty=1.3,
-    do_sample=False
-)
-hf_pipeline.tokenizer.pad_token_id = hf_pipeline.model.config.eos_token_id
-hf_pipeline.model.config.use_cache = True
-llm = HuggingFacePipeline(pipeline=hf_pipeline)
-
+# Importing this module does no model work: TinyLlama and the chains are
+# built on first use (or by registry.warm_up) and then shared.
 parser = StrOutputParser()
+MAX_NEW_TOKENS = 200
+GENERATION_KWARGS = {"max_new_tokens": MAX_NEW_TOKENS, "repetition_penalty": 1.3, "do_sample": False}
+BRANCHES = ("medical", "support")
+
+# Checked while decoding, so neither branch runs past what the answer keeps:
+# a new role section ends it, the summary is capped at 800 characters and
+# the support message at its 5 lines. (<|assistant|> is not a stop: the
+# answer may follow an echoed tag, see _format_answer.)
+ROLE_STOPS = ("<|system|>", "<|context|>", "<|user|>")
+BRANCH_LIMITS = {
+    "medical": OutputLimits(stop=ROLE_STOPS, max_chars=800),
+    "support": OutputLimits(stop=ROLE_STOPS, max_lines=5),
+}
+
+# Constant prompt headers, prefilled once and reused (KV cache)
+register_prefix("lel_rag", lambda slot: rag_prompt.format(context=slot, question=""))
+register_prefix("lel_support", lambda slot: support_prompt.format(question=slot))
+
+
+def get_llm():
+    # TinyLlama weights are shared with every other pipeline in this process
+    # (or held by the model server)
+    if not config.MODEL_SERVER:
+        hf_pipeline = registry.hf_pipeline()
+        hf_pipeline.tokenizer.pad_token_id = hf_pipeline.model.config.eos_token_id
+        hf_pipeline.model.config.use_cache = True
+    return registry.hf_llm(**GENERATION_KWARGS)
+
+
+def get_parallel_chain(branches: Sequence[str] = BRANCHES):
+    """
+    RunnableParallel over `branches` (ALS_LEL_EXECUTION=parallel). Each branch
+    returns (text, perf_counter() when it finished).
+    """
+    def factory():
+        llm = get_llm()
+        chains = {
+            # ---- SUMMARY CHAIN ----
+            "medical": rag_prompt | llm.bind(output_limits=BRANCH_LIMITS["medical"]) | parser,
+            # ---- SUPPORT CHAIN ----
+            "support": support_prompt | llm.bind(output_limits=BRANCH_LIMITS["support"]) | parser,
+        }
+        stamp = RunnableLambda(lambda text: (text, time.perf_counter()))
+        return RunnableParallel(**{name: chains[name] | stamp for name in branches})
+    return registry.get_or_create(("lel_parallel_chain", tuple(branches)), factory)
+
+
+# Same distress router as RAG's empathy node (keywords, then MiniLM centroids)
+def get_support_router() -> IntentRouter:
+    def factory():
+        embedder = registry.embedder()
+        return IntentRouter(
+            EMPATHY_INTENTS,
+            embed_documents=embedder.embed_documents,
+            embed_query=embedder.embed_query,
+            keywords=EMPATHY_KEYWORDS,
+            name="empathy",
+        )
+    return registry.get_or_create("intent_router:empathy", factory)
+
+
+def needs_support(question: str) -> bool:
+    if not config.LEL_SUPPORT_ROUTING:
+        return True
+    with span("intent") as attrs:
+        attrs["label"] = get_support_router().classify(question).label
+    return attrs["label"] == "distress"
+
+
+def generate_branches(context: str, question: str, branches: Sequence[str] = BRANCHES) -> Dict[str, str]:
+    """
+    Answer of each branch. By default the prompts go to the model as one
+    batched generate call; each branch's wall time is stored on the span.
+    """
+    with span(GENERATION, step="+".join(branches), mode=config.LEL_EXECUTION) as attrs:
+        started = time.perf_counter()
+        if config.LEL_EXECUTION == "parallel":
+            result = get_parallel_chain(branches).invoke({"context": context, "question": question})
+            texts = {name: text for name, (text, _) in result.items()}
+            seconds = {name: done - started for name, (_, done) in result.items()}
+        else:
+            prompts: List[str] = [
+                rag_prompt.format(context=context, question=question) if name == "medical"
+                else support_prompt.format(question=question)
+                for name in branches
+            ]
+            result = get_llm().generate(prompts, output_limits=[BRANCH_LIMITS[name] for name in branches])
+            elapsed = time.perf_counter() - started
+            texts, seconds = {}, {}
+            for name, (generation,) in zip(branches, result.generations):
+                texts[name] = generation.text
+                seconds[name] = (generation.generation_info or {}).get("seconds", elapsed)
+        # No-op unless the LLM could not stop on the limits itself
+        texts = {name: BRANCH_LIMITS[name].apply(text) for name, text in texts.items()}
+        for name, value in seconds.items():
+            attrs[f"{name}_s"] = round(value, 3)
+    return texts
+
+
+def get_packer() -> ContextPacker:
+    return registry.get_or_create(
+        "context_packer:lel", lambda: ContextPacker(token_counter(registry.tokenizer()))
+    )
 
-doc_chain = create_stuff_documents_chain(llm, rag_prompt)
-# doc_chain = StuffDocumentsChain(
-#     llm_chain=llm,
-#     document_variable_name="context",
-#     prompt=rag_prompt
-# )
-
-# ---- SUMMARY CHAIN ----
-summary_chain = rag_prompt | llm | parser
-
-# ---- SUPPORT CHAIN ----
-support_chain = support_prompt | llm | parser
-
-# ---- PARALLEL EXECUTION ----
-parallel_chain = RunnableParallel(
-    medical=summary_chain,
-    support=support_chain
-)
 
 def answer_question(question: str) -> str:
 
-    raw = retriever.invoke(question)
+    with span(RETRIEVAL) as attrs:
+        raw = get_retriever().invoke(question)
+        attrs["docs"] = len(raw)
 
     # Guard if no docs
     if not raw:
@@ -63,36 +145,47 @@ def answer_question(question: str) -> str:
         else:
             docs.append(Document(page_content=str(d)))
 
-    # Build context for parallel chains
-    context = "\n\n".join(d.page_content for d in docs)
+    # Build context for the medical branch
+    # (relevance order, near-duplicates dropped, within the token budget left
+    # by the prompt template, the question and the generated answer)
+    with span(PROMPT_BUILD) as attrs:
+        packer = get_packer()
+        reserved = packer.count_tokens(rag_prompt.format(context="", question=question)) + MAX_NEW_TOKENS
+        packed = packer.pack([d.page_content for d in docs], reserved=reserved)
+        attrs["context_tokens"] = packed.tokens
+        context = packed.text
+
+    # Medical summary, plus the support message only when the user is distressed
+    branches = BRANCHES if needs_support(question) else ("medical",)
+    result = generate_branches(context, question, branches)
+
+    with span(POST_PROCESSING):
+        return _format_answer(result)
 
-    # Run both chains in parallel
-    result = parallel_chain.invoke({
-        "context": context,
-        "question": question
-    })
 
+def _format_answer(result) -> str:
     medical = result.get("medical", "")
-    support = result.get("support", "").strip()
+    if "<|assistant|>" in medical:
+        medical = medical.split("<|assistant|>")[-1].strip()
+    if "support" not in result:
+        return f"""
+Medical Summary:
+{medical}
+"""
+
+    support = result["support"].strip()
 
     # remove template echoes
     for bad in ["You are", "RULES:", "User question:", "Answer:"]:
         support = support.replace(bad, "").strip()
 
-    # enforce line limit (max 5 lines)
-    support_lines = support.splitlines()
-    support = "\n".join(support_lines[:5])
-
-
     # Clean TinyLlama tokens
-    if "<|assistant|>" in medical:
-        medical = medical.split("<|assistant|>")[-1].strip()
     if "<|assistant|>" in support:
         support = support.split("<|assistant|>")[-1].strip()
 
     return f"""
 Medical Summary:
-{medical[:800]}
+{medical}
 
 Support Response:
 {support}
@@ -1,18 +1,15 @@
 import os
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-import os
 os.environ["HF_HUB_OFFLINE"] = "1"
 os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
+from als_core.model_registry import registry
+
 PERSIST_DIR = os.path.abspath(r"D:\ALS-chatbot\RAG\chroma_db")
 
 def get_embeddings():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    return registry.embedder()
 
 def get_retriever():
-    vectorstore = Chroma(
-        persist_directory=PERSIST_DIR,
-        embedding_function=get_embeddings()
-    )
-    return vectorstore.as_retriever(search_kwargs={"k": 4})
+    # Dense + BM25 fused with RRF: exact terms (drug / gene names) are found
+    # without raising k
+    return registry.retriever(k=3, persist_dir=PERSIST_DIR)
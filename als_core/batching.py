@@ -0,0 +1,286 @@
+"""
+Dynamic micro-batching in front of a causal LM.
+
+Concurrent callers submit prompts; a single scheduler thread collects them for
+at most `max_wait_ms` (or until `max_batch_size` prompts are waiting), pads
+them into one tensor and runs a single batched `model.generate`. Each caller
+gets its own decoded completion back through a Future.
+
+Prompts are only batched together when their generation settings match, since
+one `generate` call takes one set of settings; `output_limits` (see
+als_core.output_limits) are the exception, they are checked per row and a row
+stops decoding as soon as its answer is complete. Every row starts from the
+cached KV of its constant head (see als_core.prefix_cache), so only the
+request-specific rest of each prompt is prefilled.
+
+A prompt submitted with a `streamer` (see als_core.streaming) runs as a batch
+of its own, since transformers streamers take one sequence, but it goes
+through the same scheduler thread: streamed and batched generations never
+decode on the weights at the same time.
+
+Usage:
+    batcher = MicroBatcher(model, tokenizer, max_batch_size=4, max_wait_ms=20)
+    text = batcher.generate(prompt, max_new_tokens=200, repetition_penalty=1.2)
+
+    llm = BatchedLLM(batcher=batcher, generation_kwargs={"max_new_tokens": 200})
+    result = llm.generate([prompt_a, prompt_b])   # both prompts in one batched generate
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+from pydantic import Field
+
+from als_core import config
+from als_core.inference_executor import RequestCancelled, current_cancel_event
+from als_core.metrics import metrics
+from als_core.output_limits import OutputLimits
+
+# Keyword arguments understood by the transformers pipeline but not by generate()
+_PIPELINE_ONLY_KWARGS = {"return_full_text", "handle_long_generation", "clean_up_tokenization_spaces"}
+
+BATCH_SIZE = metrics.histogram(
+    "als_batch_size", "Prompts per batched generate call", buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+BATCH_FILL = metrics.histogram(
+    "als_batch_fill_ratio", "Batch size divided by the configured maximum",
+    buckets=(0.125, 0.25, 0.5, 0.75, 1.0),
+)
+QUEUE_WAIT = metrics.histogram("als_batch_queue_wait_seconds", "Time a prompt waited for its batch")
+GENERATE_TIME = metrics.histogram("als_batch_generate_seconds", "Wall time of one batched generate call")
+BATCHED_PROMPTS = metrics.counter("als_batch_prompts_total", "Prompts processed by the micro-batcher")
+
+
+def _settings_key(gen_kwargs: Dict[str, Any]) -> tuple:
+    # Output limits are checked per row, so they don't split batches
+    return tuple(sorted((k, repr(v)) for k, v in gen_kwargs.items() if k != "output_limits"))
+
+
+@dataclass
+class _Pending:
+    prompt: str
+    gen_kwargs: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+    cancel_event: Optional[threading.Event] = None
+    streamer: Any = None    # receives the tokens as they are decoded (batch of one)
+
+
+class MicroBatcher:
+    """Collects prompts from many threads and generates them in batches."""
+
+    def __init__(self, model, tokenizer,
+                 max_batch_size: int = config.BATCH_MAX_SIZE,
+                 max_wait_ms: float = config.BATCH_MAX_WAIT_MS,
+                 prefix_cache=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_cache = prefix_cache
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        # Decoder-only models must be padded on the left for batched generation
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # --- Public API ---
+    def submit(self, prompt: str, streamer=None, cancel_event: Optional[threading.Event] = None,
+               **gen_kwargs) -> Future:
+        self._ensure_started()
+        gen_kwargs = {k: v for k, v in gen_kwargs.items() if k not in _PIPELINE_ONLY_KWARGS}
+        pending = _Pending(prompt, gen_kwargs, cancel_event=cancel_event or current_cancel_event(),
+                           streamer=streamer)
+        self._queue.put(pending)
+        return pending.future
+
+    def generate(self, prompt: str, **gen_kwargs) -> str:
+        return self.submit(prompt, **gen_kwargs).result()
+
+    def generate_many(self, prompts: List[str], **gen_kwargs) -> List[str]:
+        futures = [self.submit(p, **gen_kwargs) for p in prompts]
+        return [f.result() for f in futures]
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # --- Scheduler ---
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)   # let the loop see the sentinel
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            groups: Dict[tuple, List[_Pending]] = {}
+            for item in self._collect(first):
+                key = ("stream", id(item)) if item.streamer is not None else _settings_key(item.gen_kwargs)
+                groups.setdefault(key, []).append(item)
+            for items in groups.values():
+                self._run_batch(items)
+
+    def _run_batch(self, items: List[_Pending]):
+        import torch
+        from transformers import StoppingCriteriaList
+        from als_core.stopping import CancellationCriteria, OutputLimitCriteria
+
+        live = []
+        for item in items:
+            if item.cancel_event is not None and item.cancel_event.is_set():
+                item.future.set_exception(RequestCancelled())
+                if item.streamer is not None:
+                    item.streamer.end()
+            else:
+                live.append(item)
+        if not live:
+            return
+
+        started = time.perf_counter()
+        for item in live:
+            QUEUE_WAIT.observe(started - item.enqueued)
+        BATCH_SIZE.observe(len(live))
+        BATCH_FILL.observe(len(live) / self.max_batch_size)
+        BATCHED_PROMPTS.inc(len(live))
+
+        try:
+            gen_kwargs = dict(live[0].gen_kwargs)
+            gen_kwargs.setdefault("pad_token_id", self.tokenizer.pad_token_id)
+            gen_kwargs.pop("output_limits", None)
+            prompts = [item.prompt for item in live]
+            batch = None
+            if self.prefix_cache is not None:
+                rows = self.tokenizer(prompts)["input_ids"]
+                batch = self.prefix_cache.lookup_batch(rows, self.tokenizer.pad_token_id)
+            if batch is not None:
+                encoded = {"input_ids": batch.input_ids, "attention_mask": batch.attention_mask}
+                gen_kwargs["past_key_values"] = batch.cache
+            else:
+                encoded = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+
+            criteria = StoppingCriteriaList(gen_kwargs.pop("stopping_criteria", None) or [])
+            criteria.append(CancellationCriteria([item.cancel_event for item in live]))
+            limits = [item.gen_kwargs.get("output_limits") for item in live]
+            limit_criteria = None
+            if any(limits):
+                # Each row halts as soon as its answer is complete
+                limit_criteria = OutputLimitCriteria(self.tokenizer, encoded["input_ids"].shape[1], limits)
+                criteria.append(limit_criteria)
+            if live[0].streamer is not None:
+                gen_kwargs["streamer"] = live[0].streamer
+            with torch.inference_mode():
+                output = self.model.generate(**encoded, stopping_criteria=criteria, **gen_kwargs)
+            new_tokens = output[:, encoded["input_ids"].shape[1]:]
+            texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+            if limit_criteria is not None:
+                limit_criteria.record(gen_kwargs.get("max_new_tokens"))
+                texts = [lim.apply(text) if lim else text for lim, text in zip(limits, texts)]
+        except Exception as exc:  # deliver the failure to every waiting caller
+            for item in live:
+                item.future.set_exception(exc)
+                if item.streamer is not None:
+                    item.streamer.end()     # unblock the reader
+            return
+        finally:
+            GENERATE_TIME.observe(time.perf_counter() - started)
+
+        for item, text in zip(live, texts):
+            item.future.set_result(text)
+
+
+class BatchedLLM(LLM):
+    """LangChain LLM whose calls are served by a shared MicroBatcher."""
+
+    batcher: Any
+    generation_kwargs: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hf_micro_batched"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"generation_kwargs": self.generation_kwargs}
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        gen_kwargs = {**self.generation_kwargs, **kwargs}
+        limits = _with_stop(gen_kwargs.pop("output_limits", None), stop)
+        if limits is not None:
+            gen_kwargs["output_limits"] = limits
+        return self.batcher.generate(prompt, **gen_kwargs)
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        """
+        Submit every prompt before waiting, so they land in the same batch
+        (LLM._generate would call _call one prompt at a time). Each generation
+        carries the wall time until its own completion in generation_info.
+        `output_limits` may be a list with one entry per prompt.
+        """
+        started = time.perf_counter()
+        gen_kwargs = {**self.generation_kwargs, **kwargs}
+        limits = gen_kwargs.pop("output_limits", None)
+        if not isinstance(limits, (list, tuple)):
+            limits = [limits] * len(prompts)
+
+        futures = {}
+        for i, (prompt, prompt_limits) in enumerate(zip(prompts, limits)):
+            prompt_limits = _with_stop(prompt_limits, stop)
+            extra = {"output_limits": prompt_limits} if prompt_limits is not None else {}
+            futures[self.batcher.submit(prompt, **gen_kwargs, **extra)] = i
+        generations: List[List[Generation]] = [[] for _ in prompts]
+        for future in as_completed(futures):
+            info = {"seconds": time.perf_counter() - started}
+            generations[futures[future]] = [Generation(text=future.result(), generation_info=info)]
+        return LLMResult(generations=generations)
+
+
+def _with_stop(limits: Optional[OutputLimits], stop: Optional[List[str]]) -> Optional[OutputLimits]:
+    # Stop sequences end decoding too, instead of being cut off afterwards
+    if not stop:
+        return limits
+    return (limits or OutputLimits()).with_stop(stop)
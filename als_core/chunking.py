@@ -0,0 +1,123 @@
+"""
+Per-article chunking with stable, content-addressed chunk IDs.
+
+Each scraped article is split on its own (chunks never span two sources) and
+every chunk gets an ID derived from its source URL and text. Re-running the
+splitter on unchanged data therefore yields exactly the same IDs, which is what
+lets ingestion skip chunks that are already embedded.
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from als_core import config
+
+# Placeholders written by the scraper when a page could not be fetched
+_FAILED_PREFIXES = ("Error fetching URL", "No content extracted")
+
+# URL path keyword -> topic (first match wins, default "overview")
+_TOPIC_KEYWORDS = [
+    ("caregiver", "caregiving"),
+    ("children", "family"),
+    ("relationships", "family"),
+    ("genetic", "genetics"),
+    ("drugs", "treatment"),
+    ("understanding", "overview"),
+    ("myths", "overview"),
+    ("clinical-research", "research"),
+    ("research", "research"),
+    ("registry", "research"),
+    ("breathing", "breathing"),
+    ("nutrition", "nutrition"),
+    ("communication", "communication"),
+    ("mobility", "daily_living"),
+    ("home-modifications", "daily_living"),
+    ("daily-living", "daily_living"),
+]
+
+# Metadata fields that /ask accepts as filters
+FILTER_FIELDS = ("domain", "publisher", "topic", "doc_type")
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: Dict[str, object] = field(default_factory=dict)
+
+
+def load_articles(path: Path = config.DATA_PATH) -> List[Dict[str, str]]:
+    """Load scraped articles, skipping failed fetches and duplicate URLs."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    seen, articles = set(), []
+    for item in data:
+        url, content = item.get("url", ""), (item.get("content") or "").strip()
+        if not content or content.startswith(_FAILED_PREFIXES) or url in seen:
+            continue
+        seen.add(url)
+        articles.append({"url": url, "content": content})
+    return articles
+
+
+def chunk_id(url: str, text: str, occurrence: int = 0) -> str:
+    """Stable ID of a chunk: hash of its source and text (+ repeat counter)."""
+    digest = hashlib.sha256(f"{url}\n{text}".encode("utf-8")).hexdigest()[:32]
+    return f"{digest}-{occurrence}" if occurrence else digest
+
+
+def source_metadata(url: str) -> Dict[str, str]:
+    """Source-level metadata derived from the article URL."""
+    parsed = urlparse(url)
+    domain = parsed.netloc.lower().removeprefix("www.")
+    path = parsed.path.lower()
+    topic = next((t for keyword, t in _TOPIC_KEYWORDS if keyword in path), "overview")
+    return {
+        "url": url,
+        "domain": domain,                                # e.g. ninds.nih.gov
+        "publisher": ".".join(domain.split(".")[-2:]),   # e.g. nih.gov
+        "topic": topic,
+        "doc_type": "guide" if "guide" in path else "article",
+    }
+
+
+def split_article(article: Dict[str, str], splitter: RecursiveCharacterTextSplitter) -> List[Chunk]:
+    url = article["url"]
+    source = source_metadata(url)
+    chunks, occurrences = [], {}
+    for ordinal, text in enumerate(splitter.split_text(article["content"])):
+        # The same boilerplate sentence may appear twice in one page
+        n = occurrences.get(text, 0)
+        occurrences[text] = n + 1
+        chunks.append(Chunk(id=chunk_id(url, text, n), text=text, metadata={**source, "chunk": ordinal}))
+    return chunks
+
+
+def split_articles(articles: Iterable[Dict[str, str]], chunk_size: int = 400,
+                   chunk_overlap: int = 50) -> List[Chunk]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks: List[Chunk] = []
+    for article in articles:
+        chunks.extend(split_article(article, splitter))
+    return chunks
+
+
+def build_filter(filters: Optional[Dict[str, List[str]]]) -> Optional[Dict]:
+    """
+    Turn {"topic": ["caregiving"], "publisher": ["nih.gov"]} into a Chroma
+    `where` clause, so filtering happens inside the vector search.
+    """
+    clauses = [
+        {name: {"$in": list(values)}}
+        for name, values in (filters or {}).items()
+        if name in FILTER_FIELDS and values
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
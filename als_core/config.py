@@ -0,0 +1,108 @@
+"""
+Shared runtime configuration for the RAG, RAG_LCEL and RAG_LEL pipelines.
+Every value can be overridden through the environment (or a .env file).
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Paths ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "webscrapped-data" / "als_articles_expanded.json"
+CHROMA_DIR = Path(os.getenv("ALS_CHROMA_DIR", str(BASE_DIR / "RAG" / "chroma_db")))
+COLLECTION_NAME = os.getenv("ALS_COLLECTION_NAME", "langchain")
+
+# --- Models ---
+EMBED_MODEL = os.getenv("ALS_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CHAT_MODEL_ID = os.getenv("ALS_CHAT_MODEL_ID", "TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+OPENAI_MODEL = os.getenv("ALS_OPENAI_MODEL", "gpt-4o-mini")
+
+# --- Start-up ---
+# Comma separated list of components loaded by registry.warm_up()
+WARMUP_COMPONENTS = [
+    c.strip() for c in os.getenv("ALS_WARMUP", "embedder,vectorstore,llm").split(",") if c.strip()
+]
+
+# --- Local model backend (TinyLlama / Flan-T5 precision and torch threads) ---
+INFERENCE_BACKEND = os.getenv("ALS_INFERENCE_BACKEND", "fp32")         # fp32, bf16 or int8
+TORCH_THREADS = int(os.getenv("ALS_TORCH_THREADS", "0"))               # 0 = torch default
+TORCH_INTEROP_THREADS = int(os.getenv("ALS_TORCH_INTEROP_THREADS", "0"))
+
+# --- Inference executor (bounded worker pool in front of the LLM) ---
+# Workers mostly wait on the micro-batcher, which owns the model, so keep
+# enough of them to fill a batch.
+INFERENCE_WORKERS = int(os.getenv("ALS_INFERENCE_WORKERS", "4"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("ALS_INFERENCE_QUEUE_DEPTH", "8"))
+INFERENCE_TIMEOUT_S = float(os.getenv("ALS_INFERENCE_TIMEOUT_S", "120"))
+RETRY_AFTER_S = int(os.getenv("ALS_RETRY_AFTER_S", "5"))
+
+# --- Embedding service (MiniLM; shared by retrieval, caches and ingestion) ---
+EMBED_BATCH_SIZE = int(os.getenv("ALS_EMBED_BATCH_SIZE", "64"))       # texts per forward pass
+EMBED_MAX_WAIT_MS = float(os.getenv("ALS_EMBED_MAX_WAIT_MS", "2"))    # query coalescing window
+EMBED_CACHE_SIZE = int(os.getenv("ALS_EMBED_CACHE_SIZE", "4096"))     # cached query vectors
+EMBED_DTYPE = os.getenv("ALS_EMBED_DTYPE", "float32")                 # or float16
+
+# --- Retrieval (dense MiniLM + BM25, merged with reciprocal rank fusion) ---
+RETRIEVAL_MODE = os.getenv("ALS_RETRIEVAL", "hybrid")                 # or "dense"
+VECTOR_BACKEND = os.getenv("ALS_VECTOR_BACKEND", "chroma")             # or "snapshot" (memory-mapped export)
+HYBRID_FETCH_K = int(os.getenv("ALS_HYBRID_FETCH_K", "10"))           # candidates per retriever
+RRF_K = int(os.getenv("ALS_RRF_K", "60"))
+
+# --- Cross-encoder reranking (optional, between retrieval and prompt) ---
+RERANK_ENABLED = os.getenv("ALS_RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("ALS_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("ALS_RERANK_CANDIDATES", "8"))      # over-fetched chunks
+RERANK_TOP_N = int(os.getenv("ALS_RERANK_TOP_N", "3"))                # chunks kept by default
+RERANK_BUDGET_MS = float(os.getenv("ALS_RERANK_BUDGET_MS", "80"))     # else keep retrieval order
+
+# --- Micro-batching of TinyLlama generation ---
+BATCHING_ENABLED = os.getenv("ALS_BATCHING", "1") == "1"
+BATCH_MAX_SIZE = int(os.getenv("ALS_BATCH_MAX_SIZE", "4"))
+BATCH_MAX_WAIT_MS = float(os.getenv("ALS_BATCH_MAX_WAIT_MS", "20"))
+
+# --- Shared model server (one copy of the weights for every API worker) ---
+MODEL_SERVER = os.getenv("ALS_MODEL_SERVER", "")                      # Unix socket / pipe; empty = in-process
+MODEL_SERVER_AUTHKEY = os.getenv("ALS_MODEL_SERVER_AUTHKEY", "").encode()  # required, no default secret
+MODEL_SERVER_TIMEOUT_S = float(os.getenv("ALS_MODEL_SERVER_TIMEOUT_S", "120"))  # wait for it at start-up
+MODEL_SERVER_CLIENT_THREADS = int(os.getenv("ALS_MODEL_SERVER_CLIENT_THREADS", "8"))  # connections per worker
+
+# --- RAG_LEL medical / support branches ---
+LEL_EXECUTION = os.getenv("ALS_LEL_EXECUTION", "batched")             # batched | parallel
+LEL_SUPPORT_ROUTING = os.getenv("ALS_LEL_SUPPORT_ROUTING", "1") == "1"  # skip support unless distress
+
+# --- KV-cache reuse of the constant prompt heads ---
+PREFIX_CACHE_ENABLED = os.getenv("ALS_PREFIX_CACHE", "1") == "1"
+PREFIX_CACHE_MIN_TOKENS = int(os.getenv("ALS_PREFIX_CACHE_MIN_TOKENS", "16"))  # shorter matches aren't worth a copy
+
+# --- Semantic answer cache ---
+CACHE_ENABLED = os.getenv("ALS_CACHE", "1") == "1"
+CACHE_THRESHOLD = float(os.getenv("ALS_CACHE_THRESHOLD", "0.92"))
+CACHE_MAX_ENTRIES = int(os.getenv("ALS_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_S = float(os.getenv("ALS_CACHE_TTL_S", "3600"))
+
+# --- Tracing ---
+# Log one structured JSON line per request (request id + stage spans)
+TRACE_LOG = os.getenv("ALS_TRACE_LOG", "0") == "1"
+
+# --- Intent routing (nearest centroid over MiniLM embeddings) ---
+# Below this confidence the RAG_LCEL router falls back to the TinyLlama classifier
+INTENT_THRESHOLD = float(os.getenv("ALS_INTENT_THRESHOLD", "0.6"))
+
+# --- Session memory (RAG_LCEL) ---
+MEMORY_DB = Path(os.getenv("ALS_MEMORY_DB", str(BASE_DIR / "RAG_LCEL" / "memory" / "sessions.db")))
+MEMORY_TTL_S = float(os.getenv("ALS_MEMORY_TTL_S", str(30 * 24 * 3600)))   # idle sessions are deleted
+MEMORY_MAX_TURNS = int(os.getenv("ALS_MEMORY_MAX_TURNS", "6"))             # turns injected into the prompt
+MEMORY_MAX_TOKENS = int(os.getenv("ALS_MEMORY_MAX_TOKENS", "600"))         # token budget of those turns
+
+# --- Prompt context packing ---
+CONTEXT_WINDOW = int(os.getenv("ALS_CONTEXT_WINDOW", "2048"))              # TinyLlama's window
+CONTEXT_MAX_TOKENS = int(os.getenv("ALS_CONTEXT_MAX_TOKENS", "1024"))      # cap on retrieved context
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("ALS_CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+OPENAI_CONTEXT_WINDOW = int(os.getenv("ALS_OPENAI_CONTEXT_WINDOW", "128000"))   # RAG_LCEL's gpt-4o-mini
+OPENAI_ANSWER_TOKENS = int(os.getenv("ALS_OPENAI_ANSWER_TOKENS", "512"))        # reserved for its answer
+
+# --- Extractive context compression (RAG answer prompt) ---
+SUMMARY_MAX_WORDS = int(os.getenv("ALS_SUMMARY_MAX_WORDS", "250"))        # longer contexts are compressed
@@ -0,0 +1,136 @@
+"""
+Token-budget-aware packing of retrieved chunks into a prompt context.
+
+Chunks are taken in relevance (retrieval) order and added while they fit in the
+budget, measured in real tokens of the loaded tokenizer:
+
+    budget = min(max_tokens, window - reserved)
+
+where `reserved` covers everything else in the prompt (template, question,
+memory) plus the generation budget. Near-duplicate chunks (e.g. the same
+boilerplate paragraph scraped from two pages) are dropped: a chunk whose word
+trigrams are mostly contained in an already packed chunk adds no information.
+
+Usage:
+    packer = ContextPacker(token_counter(tokenizer))
+    packed = packer.pack(chunks, reserved=prompt_tokens + max_new_tokens)
+    packed.text, packed.tokens
+"""
+import functools
+import re
+from typing import Callable, FrozenSet, List, NamedTuple, Optional, Sequence
+
+from als_core import config
+from als_core.metrics import metrics
+
+PACKED_TOKENS = metrics.histogram(
+    "als_context_tokens", "Tokens of retrieved context packed into a prompt",
+    buckets=(64, 128, 256, 384, 512, 768, 1024, 1536, 2048),
+)
+DROPPED_CHUNKS = metrics.counter("als_context_chunks_dropped_total", "Chunks left out of the prompt by reason")
+
+_WORD = re.compile(r"\w+")
+
+
+class PackedContext(NamedTuple):
+    text: str
+    chunks: List[str]
+    tokens: int
+    budget: int
+    dropped_duplicates: int = 0
+    dropped_budget: int = 0
+
+
+def token_counter(tokenizer, cache_size: int = 4096) -> Callable[[str], int]:
+    """Token count with the given HF tokenizer; chunk texts repeat, so cache them."""
+    @functools.lru_cache(maxsize=cache_size)
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return count
+
+
+def openai_token_counter(model_name: str, cache_size: int = 4096) -> Callable[[str], int]:
+    """Token count for an OpenAI chat model (tiktoken), without loading any local model.
+
+    tiktoken ships with langchain-openai; without it, ~4 characters per token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: -(-len(text) // 4)
+    try:
+        encoding = tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+
+    @functools.lru_cache(maxsize=cache_size)
+    def count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+    return count
+
+
+def _shingles(text: str, n: int = 3) -> FrozenSet[tuple]:
+    words = _WORD.findall(text.lower())
+    if len(words) < n:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(zip(*(words[i:] for i in range(n))))
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        max_tokens: int = config.CONTEXT_MAX_TOKENS,
+        window: Optional[int] = config.CONTEXT_WINDOW,
+        dedupe_threshold: float = config.CONTEXT_DEDUPE_THRESHOLD,
+        separator: str = "\n\n",
+    ):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.window = window
+        self.dedupe_threshold = dedupe_threshold
+        self.separator = separator
+        self._separator_tokens = count_tokens(separator) if separator.strip() else 1
+
+    def budget(self, reserved: int = 0) -> int:
+        if self.window is None:
+            return self.max_tokens
+        return max(0, min(self.max_tokens, self.window - reserved))
+
+    def _is_duplicate(self, shingles: FrozenSet[tuple], kept: List[FrozenSet[tuple]]) -> bool:
+        for other in kept:
+            overlap = len(shingles & other)
+            if overlap and overlap / min(len(shingles), len(other)) >= self.dedupe_threshold:
+                return True
+        return False
+
+    def pack(self, chunks: Sequence[str], reserved: int = 0) -> PackedContext:
+        """Fill the budget with chunks in the given (relevance) order."""
+        budget = self.budget(reserved)
+        packed: List[str] = []
+        kept_shingles: List[FrozenSet[tuple]] = []
+        used = duplicates = over_budget = 0
+
+        for chunk in chunks:
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            shingles = _shingles(chunk)
+            if self._is_duplicate(shingles, kept_shingles):
+                duplicates += 1
+                continue
+            cost = self.count_tokens(chunk) + (self._separator_tokens if packed else 0)
+            if used + cost > budget:
+                # A later, shorter chunk may still fit
+                over_budget += 1
+                continue
+            packed.append(chunk)
+            kept_shingles.append(shingles)
+            used += cost
+
+        PACKED_TOKENS.observe(used)
+        if duplicates:
+            DROPPED_CHUNKS.inc(duplicates, reason="duplicate")
+        if over_budget:
+            DROPPED_CHUNKS.inc(over_budget, reason="budget")
+        return PackedContext(self.separator.join(packed), packed, used, budget, duplicates, over_budget)
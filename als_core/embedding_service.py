@@ -0,0 +1,188 @@
+"""
+Shared embedding service in front of the MiniLM sentence embedder.
+
+Wraps any LangChain `Embeddings` (HuggingFaceEmbeddings in production) and adds
+
+- query coalescing: concurrent `embed_query` calls are collected by one
+  scheduler thread for at most `max_wait_ms` and embedded in a single batched
+  forward pass,
+- an LRU cache of query vectors keyed by normalised text (lower-cased,
+  whitespace collapsed; MiniLM is uncased, so the vector is the same), so the
+  answer cache, the intent routers and retrieval embed a question only once,
+- bulk `embed_documents` in slices of `batch_size` for ingestion,
+- float32 or float16 output (`dtype`); float16 halves the cache footprint.
+
+It is itself an `Embeddings`, so Chroma and every other caller use it as a
+drop-in replacement. The registry hands it out as `registry.embedder()`.
+
+Usage:
+    service = EmbeddingService(HuggingFaceEmbeddings(model_name=...), batch_size=64)
+    service.embed_query("What is ALS?")
+    service.embed_array(texts)      # np.ndarray of shape (len(texts), dim)
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from als_core import config
+from als_core.metrics import metrics
+from als_core.tracing import EMBEDDING, span
+
+QUERY_REQUESTS = metrics.counter("als_embedding_queries_total", "Query embeddings by result (hit or miss)")
+QUERY_BATCH_SIZE = metrics.histogram(
+    "als_embedding_batch_size", "Queries per coalesced embedding forward pass", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+EMBEDDED_TEXTS = metrics.counter("als_embedded_texts_total", "Texts run through the embedding model by kind")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+@dataclass
+class _Pending:
+    key: str
+    text: str
+    future: Future = field(default_factory=Future)
+
+
+class EmbeddingService(Embeddings):
+    """Coalescing, caching front end of one embedding model (thread-safe)."""
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        batch_size: int = config.EMBED_BATCH_SIZE,
+        max_wait_ms: float = config.EMBED_MAX_WAIT_MS,
+        cache_size: int = config.EMBED_CACHE_SIZE,
+        dtype: str = config.EMBED_DTYPE,
+    ):
+        self.inner = inner
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self.dtype = np.dtype(dtype)
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # --- Documents (ingestion, sentence ranking, router exemplars) ---
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in slices of `batch_size`; rows in input order."""
+        if not texts:
+            return np.empty((0, 0), dtype=self.dtype)
+        parts = [
+            np.asarray(self.inner.embed_documents(texts[i:i + self.batch_size]), dtype=self.dtype)
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        EMBEDDED_TEXTS.inc(len(texts), kind="document")
+        return np.concatenate(parts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    # --- Queries (cached, coalesced) ---
+    def embed_query_array(self, text: str) -> np.ndarray:
+        key = normalize_text(text)
+        with span(EMBEDDING) as attrs:
+            with self._cache_lock:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+            attrs["cached"] = vector is not None
+            QUERY_REQUESTS.inc(result="hit" if vector is not None else "miss")
+            if vector is None:
+                vector = self._submit(key, text).result()
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    # --- Scheduler (same shape as the generation micro-batcher) ---
+    def _submit(self, key: str, text: str) -> Future:
+        self._ensure_started()
+        pending = _Pending(key, text)
+        self._queue.put(pending)
+        return pending.future
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="embedding-service", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.batch_size:
+            try:
+                # Take whatever is already queued, then wait out the deadline
+                item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)   # let the loop see the sentinel
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._run_batch(self._collect(first))
+
+    def _run_batch(self, items: List[_Pending]):
+        # Identical concurrent questions share one row of the batch
+        texts = {}
+        for item in items:
+            texts.setdefault(item.key, item.text)
+        QUERY_BATCH_SIZE.observe(len(texts))
+        try:
+            if len(texts) == 1:
+                (text,) = texts.values()
+                vectors = np.asarray([self.inner.embed_query(text)], dtype=self.dtype)
+            else:
+                vectors = np.asarray(self.inner.embed_documents(list(texts.values())), dtype=self.dtype)
+        except Exception as exc:  # deliver the failure to every waiting caller
+            for item in items:
+                item.future.set_exception(exc)
+            return
+        EMBEDDED_TEXTS.inc(len(texts), kind="query")
+
+        by_key = dict(zip(texts, vectors))
+        for key, vector in by_key.items():
+            self._remember(key, vector)
+        for item in items:
+            item.future.set_result(by_key[item.key])
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,104 @@
+"""
+Extractive context compression ranked by MiniLM embeddings (no LLM call).
+
+The context is split into sentences, every sentence is scored by cosine
+similarity to the question (one matrix-vector product over the normalised
+sentence matrix), and the best sentences are kept, in their original order,
+until the word budget is full. Contexts already within the budget are returned
+unchanged.
+
+Sentence embeddings are cached: the same chunks come back for related
+questions, so usually only the question itself is embedded.
+
+Usage:
+    summarizer = ExtractiveSummarizer(embedder.embed_documents, embedder.embed_query)
+    summarizer.summarize(context, question)
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from als_core import config
+from als_core.metrics import metrics
+
+COMPRESSION = metrics.histogram(
+    "als_summary_kept_ratio", "Fraction of context words kept by extractive compression",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+
+# Sentence ends (. ! ?) followed by whitespace, or line breaks
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_BREAK.split(text) if s and s.strip()]
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+class ExtractiveSummarizer:
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        embed_query: Callable[[str], List[float]],
+        max_words: int = config.SUMMARY_MAX_WORDS,
+        cache_size: int = 4096,
+    ):
+        self.embed_documents = embed_documents
+        self.embed_query = embed_query
+        self.max_words = max_words
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def _sentence_matrix(self, sentences: Sequence[str]) -> np.ndarray:
+        """Unit vectors for the sentences; only cache misses are embedded (in one batch)."""
+        vectors = {}
+        with self._lock:
+            for sentence in sentences:
+                if sentence in self._cache:
+                    self._cache.move_to_end(sentence)
+                    vectors[sentence] = self._cache[sentence]
+        missing = list(dict.fromkeys(s for s in sentences if s not in vectors))
+        if missing:
+            embedded = self._normalize(np.asarray(self.embed_documents(missing), dtype=np.float32))
+            vectors.update(zip(missing, embedded))
+            with self._lock:
+                self._cache.update(zip(missing, embedded))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.stack([vectors[s] for s in sentences])
+
+    def select(self, sentences: Sequence[str], question: str) -> List[int]:
+        """Indices of the sentences to keep, in original order."""
+        query = self._normalize(np.asarray(self.embed_query(question), dtype=np.float32))
+        scores = self._sentence_matrix(sentences) @ query
+        kept, seen, used = [], set(), 0
+        for i in np.argsort(-scores, kind="stable"):
+            words = _word_count(sentences[i])
+            if sentences[i] in seen or used + words > self.max_words:
+                # Repeats add nothing; a shorter, lower-ranked sentence may still fit
+                continue
+            kept.append(int(i))
+            seen.add(sentences[i])
+            used += words
+        return sorted(kept)
+
+    def summarize(self, context: str, question: str) -> str:
+        total = _word_count(context)
+        if total <= self.max_words:
+            return context
+        sentences = split_sentences(context)
+        summary = " ".join(sentences[i] for i in self.select(sentences, question))
+        COMPRESSION.observe(_word_count(summary) / total)
+        return summary
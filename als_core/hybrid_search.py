@@ -0,0 +1,264 @@
+"""
+Hybrid retrieval: BM25 keyword search fused with dense vector search.
+
+Dense MiniLM retrieval misses queries that hinge on exact terms (riluzole,
+edaravone, SOD1, C9orf72). A small in-process BM25 index over the same chunks
+catches those, and the two rankings are merged with reciprocal rank fusion
+
+    score(d) = sum over rankings of 1 / (rrf_k + rank(d))
+
+which needs no score calibration between the retrievers, so a smaller `k`
+keeps the same recall.
+
+The index is persisted as JSON next to the Chroma store
+(`<persist_dir>/bm25_<collection>.json`), updated incrementally by
+RAG/rag_setup.py, and built from the Chroma collection on first use for stores
+that were ingested without it. Processes reload the file when it changes.
+Workers serving from the vector snapshot rebuild it from each new snapshot
+version (recorded as the index `source`).
+
+Usage:
+    retriever = registry.retriever(k=3)           # HybridRetriever
+    docs = retriever.search("Is edaravone approved?", filters={"topic": ["treatment"]})
+    docs = retriever.invoke("Is edaravone approved?")   # LangChain retriever API
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from als_core import config
+from als_core.chunking import build_filter
+from als_core.metrics import metrics
+from als_core.tracing import span
+
+FUSED_RESULTS = metrics.counter(
+    "als_hybrid_results_total", "Documents returned by hybrid retrieval by source (dense, bm25 or both)"
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i in is it its my of on or "
+    "that the their there this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _matches(metadata: Dict[str, Any], filters: Optional[Dict[str, List[str]]]) -> bool:
+    return all(metadata.get(name) in values for name, values in (filters or {}).items() if values)
+
+
+class BM25Index:
+    """Okapi BM25 over chunk texts, with incremental add / delete (thread-safe)."""
+
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self.source: Optional[str] = None     # what it was built from (vector snapshot version)
+        self._mtime = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- Updates ---
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Optional[Sequence[Dict]] = None):
+        """Add or replace chunks."""
+        with self._lock:
+            for i, (doc_id, text) in enumerate(zip(ids, texts)):
+                self._remove(doc_id)
+                text = text or ""
+                terms = Counter(tokenize(text))
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+                length = sum(terms.values())
+                # Chroma returns None for chunks stored without metadata
+                self._docs[doc_id] = (text, dict(metadatas[i] or {}) if metadatas else {})
+                self._lengths[doc_id] = length
+                self._total_length += length
+
+    def rebuild(self, ids: Sequence[str], texts: Sequence[str], metadatas: Optional[Sequence[Dict]] = None,
+                source: Optional[str] = None):
+        """Replace every chunk (e.g. with the rows of a new snapshot version)."""
+        with self._lock:
+            self._docs, self._lengths, self._postings, self._total_length = {}, {}, {}, 0
+            self.add(ids, texts, metadatas)
+            self.source = source
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def update_metadata(self, ids: Sequence[str], metadatas: Sequence[Dict]):
+        with self._lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in self._docs:
+                    self._docs[doc_id] = (self._docs[doc_id][0], dict(metadata or {}))
+
+    def _remove(self, doc_id: str):
+        if doc_id not in self._docs:
+            return
+        text, _ = self._docs.pop(doc_id)
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    # --- Search ---
+    def search(self, query: str, k: int = 10,
+               filters: Optional[Dict[str, List[str]]] = None) -> List[Tuple[Document, float]]:
+        self.refresh()
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_length = self._total_length / n
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            results = []
+            for doc_id in sorted(scores, key=scores.get, reverse=True):
+                text, metadata = self._docs[doc_id]
+                if _matches(metadata, filters):
+                    results.append((Document(page_content=text, metadata=metadata, id=doc_id), scores[doc_id]))
+                    if len(results) == k:
+                        break
+            return results
+
+    # --- Persistence ---
+    def save(self, path: Optional[Path] = None):
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {
+                "k1": self.k1, "b": self.b, "source": self.source,
+                "docs": {doc_id: {"text": text, "metadata": metadata}
+                         for doc_id, (text, metadata) in self._docs.items()},
+            }
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp, path)   # readers never see a half-written file
+            self.path = path
+            self._mtime = path.stat().st_mtime_ns
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        index = cls(path)
+        index.refresh()
+        return index
+
+    def refresh(self):
+        """Reload from disk if another process (ingestion) rewrote the file."""
+        if self.path is None:
+            return
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        payload = json.loads(self.path.read_text(encoding="utf-8"))
+        docs = payload["docs"]
+        with self._lock:
+            self.k1, self.b = payload.get("k1", self.k1), payload.get("b", self.b)
+            self.rebuild(list(docs), [d["text"] for d in docs.values()], [d["metadata"] for d in docs.values()],
+                         source=payload.get("source"))
+            self._mtime = mtime
+
+    @classmethod
+    def from_collection(cls, collection, path: Optional[Path] = None, batch_size: int = 1000) -> "BM25Index":
+        """Build the index from every chunk of a Chroma collection."""
+        index = cls(path)
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            rows = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            index.add(rows["ids"], rows["documents"], rows["metadatas"])
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], rrf_k: int = config.RRF_K) -> List[Document]:
+    """Merge ranked lists; documents are identified by their text."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retrieval fused with RRF (dense only when `index` is None).
+    With a `reranker`, its `candidates` chunks are over-fetched and reranked
+    down to `k`.
+    """
+
+    vectorstore: Any
+    index: Optional[Any] = None
+    reranker: Optional[Any] = None
+    k: int = 4
+    fetch_k: int = config.HYBRID_FETCH_K
+    rrf_k: int = config.RRF_K
+
+    def search(self, query: str, k: Optional[int] = None,
+               filters: Optional[Dict[str, List[str]]] = None) -> List[Document]:
+        """Top-k chunks; `filters` as accepted by als_core.chunking.build_filter."""
+        k = k or self.k
+        n = max(k, self.reranker.candidates) if self.reranker is not None else k
+        docs = self._retrieve(query, n, filters)
+        if self.reranker is None:
+            return docs
+        with span("rerank") as attrs:
+            attrs["candidates"] = len(docs)
+            return self.reranker.rerank(query, docs, top_n=k)
+
+    def _retrieve(self, query: str, k: int, filters: Optional[Dict[str, List[str]]]) -> List[Document]:
+        where = build_filter(filters)
+        search_kwargs = {"filter": where} if where else {}
+        if self.index is None:
+            return self.vectorstore.similarity_search(query, k=k, **search_kwargs)
+
+        fetch_k = max(k, self.fetch_k)
+        dense = self.vectorstore.similarity_search(query, k=fetch_k, **search_kwargs)
+        with span("bm25"):
+            keyword = [doc for doc, _ in self.index.search(query, k=fetch_k, filters=filters)]
+        fused = reciprocal_rank_fusion([dense, keyword], self.rrf_k)[:k]
+
+        dense_texts = {doc.page_content for doc in dense}
+        keyword_texts = {doc.page_content for doc in keyword}
+        for doc in fused:
+            in_dense, in_keyword = doc.page_content in dense_texts, doc.page_content in keyword_texts
+            FUSED_RESULTS.inc(source="both" if in_dense and in_keyword else "dense" if in_dense else "bm25")
+        return fused
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.search(query)
@@ -0,0 +1,102 @@
+"""
+Selectable numeric backend for the local generation models (TinyLlama, Flan-T5).
+
+    fp32  full precision, the transformers default (~4.4 GB for TinyLlama)
+    bf16  bfloat16 weights; about half the memory and faster matmuls on CPUs
+          with AVX512-BF16 / AMX (falls back to fp32 where unsupported)
+    int8  dynamic int8 quantization of every nn.Linear (weights stored in int8,
+          activations quantized on the fly); CPU only
+
+The registry loads the model through `load_model`, so switching backend is a
+config change (ALS_INFERENCE_BACKEND) and no chain code is involved. Torch's
+intra-/inter-op thread pools are sized from ALS_TORCH_THREADS and
+ALS_TORCH_INTEROP_THREADS (0 keeps the torch default), which matters when
+several workers share one box.
+
+Usage:
+    model, backend = load_model("TinyLlama/TinyLlama-1.1B-Chat-v1.0", "text-generation")
+"""
+import logging
+import threading
+from typing import Any, Tuple
+
+from als_core import config
+
+BACKENDS = ("fp32", "bf16", "int8")
+
+logger = logging.getLogger("als.backend")
+
+_threads_lock = threading.Lock()
+_threads_configured = False
+
+
+def configure_threads(num_threads: int = config.TORCH_THREADS,
+                      interop_threads: int = config.TORCH_INTEROP_THREADS):
+    """Size torch's thread pools once per process (before the first forward pass)."""
+    global _threads_configured
+    import torch
+    with _threads_lock:
+        if _threads_configured:
+            return
+        _threads_configured = True
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        if interop_threads > 0:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError:   # only allowed before any inter-op work started
+                logger.warning("Inter-op threads already in use; ALS_TORCH_INTEROP_THREADS ignored")
+
+
+def bf16_supported() -> bool:
+    import torch
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def _auto_class(task: str):
+    from transformers import AutoModelForCausalLM, AutoModelForSeq2SeqLM
+    return AutoModelForSeq2SeqLM if task == "text2text-generation" else AutoModelForCausalLM
+
+
+def resolve_backend(backend: str, device: int) -> str:
+    """The backend that will actually be used on this machine."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "int8" and device >= 0:
+        logger.warning("int8 dynamic quantization runs on CPU only; using fp32 on the GPU")
+        return "fp32"
+    if backend == "bf16" and device < 0 and not bf16_supported():
+        logger.warning("This CPU has no fast bfloat16 support; using fp32")
+        return "fp32"
+    return backend
+
+
+def load_model(model_id: str, task: str, backend: str = config.INFERENCE_BACKEND,
+               device: int = -1) -> Tuple[Any, str]:
+    """Load `model_id` for `task` with the requested backend; returns (model, backend used)."""
+    import torch
+
+    backend = resolve_backend(backend, device)
+    dtype = torch.bfloat16 if backend == "bf16" else torch.float32
+    model = _auto_class(task).from_pretrained(model_id, dtype=dtype)
+    model.eval()
+    if backend == "int8":
+        from torch.ao.quantization import quantize_dynamic
+        model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, backend
+
+
+def model_size_mb(model) -> float:
+    """Parameter + buffer memory, including packed int8 weights."""
+    import torch
+    total = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    for module in model.modules():
+        # Dynamically quantized Linear layers expose their packed tensors as methods
+        if callable(getattr(module, "weight", None)):
+            for tensor in (module.weight(), module.bias()):
+                if isinstance(tensor, torch.Tensor):
+                    total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024)
@@ -0,0 +1,184 @@
+"""
+Bounded executor that keeps blocking LLM inference off the asyncio event loop.
+
+Requests are handed to a small worker pool. At most `max_workers` run at once
+and at most `queue_depth` more may wait; anything beyond that is rejected
+immediately with a 503 + Retry-After instead of piling up. Each request has a
+timeout, and a request whose client has gone away is cancelled: queued work is
+dropped before it starts and running generations stop at the next decoding
+step (see als_core.stopping.CancellationCriteria).
+
+Usage (FastAPI):
+    executor = InferenceExecutor()
+    add_exception_handlers(app)
+
+    @app.post("/ask")
+    async def ask(req: AskRequest, request: Request):
+        return await executor.run(handle_message, req.session_id, req.question, request=request)
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from als_core import config
+
+# Cancellation flag of the request that the current worker thread is serving
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "als_cancel_event", default=None
+)
+
+
+def current_cancel_event() -> Optional[threading.Event]:
+    """The cancel flag of the request running in this thread, if any."""
+    return _cancel_event.get()
+
+
+def is_cancelled() -> bool:
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+# --- Errors (mapped to HTTP responses by add_exception_handlers) ---
+class InferenceError(Exception):
+    status_code = 500
+    detail = "Inference failed."
+
+    def headers(self) -> Dict[str, str]:
+        return {}
+
+
+class InferenceOverloaded(InferenceError):
+    status_code = 503
+    detail = "The assistant is busy right now, please retry shortly."
+
+    def __init__(self, retry_after: int):
+        super().__init__(self.detail)
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(self.retry_after)}
+
+
+class InferenceTimeout(InferenceError):
+    status_code = 504
+    detail = "The assistant took too long to answer."
+
+
+class ClientDisconnected(InferenceError):
+    status_code = 499
+    detail = "Client closed the request."
+
+
+class RequestCancelled(InferenceError):
+    status_code = 499
+    detail = "Request was cancelled before it started."
+
+
+class InferenceExecutor:
+    """Worker pool with a fixed queue depth, timeouts and cancellation."""
+
+    def __init__(
+        self,
+        max_workers: int = config.INFERENCE_WORKERS,
+        queue_depth: int = config.INFERENCE_QUEUE_DEPTH,
+        timeout_s: float = config.INFERENCE_TIMEOUT_S,
+        retry_after_s: int = config.RETRY_AFTER_S,
+        disconnect_poll_s: float = 0.5,
+    ):
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.timeout_s = timeout_s
+        self.retry_after_s = retry_after_s
+        self.disconnect_poll_s = disconnect_poll_s
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._capacity = max_workers + queue_depth
+        self._slots = threading.BoundedSemaphore(self._capacity)
+        self._in_flight = 0
+        self._counter_lock = threading.Lock()
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _job(self, cancel: threading.Event, fn: Callable[..., Any], args, kwargs):
+        token = _cancel_event.set(cancel)
+        try:
+            if cancel.is_set():
+                raise RequestCancelled()
+            return fn(*args, **kwargs)
+        finally:
+            _cancel_event.reset(token)
+            with self._counter_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    async def run(self, fn: Callable[..., Any], *args, request=None,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run `fn(*args, **kwargs)` on the pool and await its result.
+        `request` (a Starlette Request) enables cancellation on disconnect.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise InferenceOverloaded(self.retry_after_s)
+        with self._counter_lock:
+            self._in_flight += 1
+
+        cancel = threading.Event()
+        loop = asyncio.get_running_loop()
+        try:
+            # Run in a copy of the caller's context so the request trace
+            # (als_core.tracing) follows the job onto the worker thread
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(
+                self._pool, context.run, self._job, cancel, fn, args, kwargs
+            )
+        except RuntimeError:
+            # Pool already shut down: the job never ran, so give the slot back
+            with self._counter_lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+
+        deadline = loop.time() + (timeout or self.timeout_s)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                cancel.set()
+                self.timed_out += 1
+                raise InferenceTimeout()
+            done, _ = await asyncio.wait({future}, timeout=min(self.disconnect_poll_s, remaining))
+            if done:
+                return future.result()
+            if request is not None and await request.is_disconnected():
+                cancel.set()
+                self.cancelled += 1
+                raise ClientDisconnected()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "capacity": self._capacity,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def add_exception_handlers(app):
+    """Turn executor errors into JSON responses with the right status code."""
+    from fastapi import Request
+    from fastapi.responses import JSONResponse
+
+    @app.exception_handler(InferenceError)
+    async def _inference_error(_: Request, exc: InferenceError):
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.detail},
+            headers=exc.headers(),
+        )
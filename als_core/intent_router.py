@@ -0,0 +1,186 @@
+"""
+Fast intent routing: keyword rules, then nearest centroid over MiniLM embeddings.
+
+Each label is described by a handful of exemplar phrases; their embeddings are
+averaged into one centroid per label (computed once, on first use). A message
+is routed by
+
+1. an optional keyword pre-filter (word-boundary regexes, confidence 1.0),
+2. cosine similarity to every centroid, turned into a confidence with a
+   softmax, and
+3. only when that confidence is below the threshold, an optional LLM fallback.
+
+Classification costs one query embedding (a few ms) instead of an LLM
+generation.
+
+Usage:
+    router = IntentRouter(LCEL_INTENTS, embed_documents=embedder.embed_documents,
+                          embed_query=embedder.embed_query, keywords=LCEL_KEYWORDS,
+                          fallback=classify_with_llm)
+    router.classify("My mum was just diagnosed, I'm terrified")
+    # IntentResult(label='personal', confidence=0.93, method='embedding')
+"""
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from als_core import config
+from als_core.metrics import metrics
+
+INTENT_REQUESTS = metrics.counter("als_intent_requests_total", "Routed messages by router, label and method")
+
+# --- RAG_LCEL intents ---
+LCEL_INTENTS: Dict[str, List[str]] = {
+    "ask_als": [
+        "What are the early symptoms of ALS?",
+        "How is ALS diagnosed?",
+        "Is ALS hereditary or genetic?",
+        "What treatments are available for ALS?",
+        "How fast does amyotrophic lateral sclerosis progress?",
+        "What is the life expectancy with ALS?",
+        "Which drugs are approved for ALS?",
+        "How does ALS affect breathing and swallowing?",
+        "Are there clinical trials for ALS?",
+        "What equipment helps with mobility in ALS?",
+    ],
+    "personal": [
+        "My father was just diagnosed with ALS and I'm scared",
+        "I feel so alone caring for my wife with ALS",
+        "I was diagnosed with ALS last month and I don't know what to do",
+        "I'm exhausted from caregiving and feel guilty",
+        "How do I tell my kids that I have ALS?",
+        "I'm worried about my mom, her speech is getting worse",
+        "I can't stop crying since the diagnosis",
+        "My husband has ALS and I don't know how to cope",
+    ],
+    "out_of_scope": [
+        "What's the weather like tomorrow?",
+        "Write me a poem about the sea",
+        "Who won the football match last night?",
+        "How do I cook pasta carbonara?",
+        "What is the price of bitcoin today?",
+        "Can you help me with my math homework?",
+        "Recommend a good movie to watch",
+        "How do I reset my router password?",
+    ],
+}
+
+LCEL_KEYWORDS: Dict[str, List[str]] = {
+    # Checked in order; first match wins
+    "personal": [r"\bi('m| am) (so )?(scared|afraid|terrified|worried|lost|overwhelmed)\b",
+                 r"\bi feel\b", r"\b(my|our) (mom|mum|dad|father|mother|wife|husband|partner|son|daughter)\b"],
+    "ask_als": [r"\bals\b", r"\bamyotrophic\b", r"\blou gehrig", r"\bmotor neurone? disease\b"],
+}
+
+# --- RAG empathy check (answer + optional comforting message) ---
+EMPATHY_INTENTS: Dict[str, List[str]] = {
+    "distress": [
+        "I'm so scared about what's going to happen",
+        "I feel hopeless and sad since the diagnosis",
+        "I'm worried sick about my father",
+        "I'm afraid I won't be able to cope",
+        "This is overwhelming, I can't handle it",
+        "I feel anxious all the time",
+        "I'm heartbroken watching my wife get weaker",
+    ],
+    "neutral": [
+        "What are the early symptoms of ALS?",
+        "How is ALS diagnosed?",
+        "What treatments are available?",
+        "Is ALS genetic?",
+        "What does riluzole do?",
+        "How do feeding tubes work in ALS?",
+        "Where can I find a clinical trial?",
+    ],
+}
+
+EMPATHY_KEYWORDS: Dict[str, List[str]] = {
+    "distress": [r"\b(sad|worried|scared|afraid|anxious|terrified|hopeless|overwhelmed|depressed)\b"],
+}
+
+
+class IntentResult(NamedTuple):
+    label: str
+    confidence: float
+    method: str     # "keyword", "embedding" or "llm"
+
+
+class IntentRouter:
+    """Nearest-centroid classifier over exemplar embeddings, with keyword and LLM fallbacks."""
+
+    def __init__(
+        self,
+        exemplars: Dict[str, List[str]],
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        embed_query: Callable[[str], List[float]],
+        keywords: Optional[Dict[str, List[str]]] = None,
+        threshold: float = config.INTENT_THRESHOLD,
+        temperature: float = 0.05,
+        fallback: Optional[Callable[[str], str]] = None,
+        name: str = "intent",
+    ):
+        self.labels = list(exemplars)
+        self.exemplars = exemplars
+        self.embed_documents = embed_documents
+        self.embed_query = embed_query
+        self.keywords = [
+            (label, re.compile(pattern, re.IGNORECASE))
+            for label, patterns in (keywords or {}).items() for pattern in patterns
+        ]
+        self.threshold = threshold
+        self.temperature = temperature
+        self.fallback = fallback
+        self.name = name
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def centroids(self) -> np.ndarray:
+        """One unit vector per label (exemplars embedded in a single batch)."""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    texts = [t for label in self.labels for t in self.exemplars[label]]
+                    vectors = self._normalize(np.asarray(self.embed_documents(texts), dtype=np.float32))
+                    rows, start = [], 0
+                    for label in self.labels:
+                        n = len(self.exemplars[label])
+                        rows.append(vectors[start:start + n].mean(axis=0))
+                        start += n
+                    self._centroids = self._normalize(np.stack(rows))
+        return self._centroids
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Softmax over the cosine similarities to each centroid."""
+        query = self._normalize(np.asarray(self.embed_query(text), dtype=np.float32))
+        sims = self.centroids() @ query
+        logits = (sims - sims.max()) / self.temperature
+        probs = np.exp(logits) / np.exp(logits).sum()
+        return dict(zip(self.labels, probs.tolist()))
+
+    def classify(self, text: str) -> IntentResult:
+        result = self._classify(text)
+        INTENT_REQUESTS.inc(router=self.name, label=result.label, method=result.method)
+        return result
+
+    def _classify(self, text: str) -> IntentResult:
+        for label, pattern in self.keywords:
+            if pattern.search(text):
+                return IntentResult(label, 1.0, "keyword")
+
+        scores = self.scores(text)
+        label = max(scores, key=scores.get)
+        if scores[label] >= self.threshold or self.fallback is None:
+            return IntentResult(label, scores[label], "embedding")
+
+        # Free model output: never route on (or label metrics with) an unknown value
+        fallback_label = str(self.fallback(text)).strip()
+        if fallback_label not in self.labels:
+            fallback_label = "out_of_scope"
+        return IntentResult(fallback_label, scores.get(fallback_label, 0.0), "llm")
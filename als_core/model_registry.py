@@ -0,0 +1,374 @@
+"""
+Process-wide registry of lazily loaded models and stores.
+
+The RAG, RAG_LCEL and RAG_LEL pipelines ask this registry for their embedder,
+Chroma client / vector store and LLM handles instead of building them on every
+call, so each worker process loads the weights and opens the store only once.
+
+Usage:
+    from als_core.model_registry import registry
+
+    vectorstore = registry.vectorstore()
+    llm = registry.hf_llm(max_new_tokens=200)
+
+    registry.warm_up()      # e.g. on FastAPI startup
+    registry.teardown()     # e.g. on FastAPI shutdown
+
+With ALS_MODEL_SERVER set, TinyLlama and MiniLM live in a separate model
+server process (see als_core.model_server) and the handles returned here
+forward to it; only tokenizers are loaded locally.
+"""
+import gc
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from als_core import config
+
+
+def _freeze(kwargs: Dict[str, Any]) -> tuple:
+    """Turn keyword arguments into a hashable cache key."""
+    return tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+
+def _device() -> int:
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+class ModelRegistry:
+    """Thread-safe cache of lazily constructed singletons."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._instances: Dict[Hashable, Any] = {}
+        self._overrides: Dict[str, Callable[..., Any]] = {}
+
+    # --- Core cache ---
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the instance stored under `key`, building it once if missing."""
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+
+        # One lock per key: loading the LLM must not block a caller that only
+        # needs the (already loaded) embedder.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._instances:
+                self._instances[key] = factory()
+            return self._instances[key]
+
+    def override(self, component: str, factory: Callable[..., Any]):
+        """
+        Replace the factory of a component (embedder, chroma_client, vectorstore,
+        bm25, cross_encoder, pipeline, prefix_cache, llm, chat_openai). The override receives the same arguments
+        as the default factory. Used by benchmarks and offline runs to plug in
+        stub models.
+        """
+        with self._lock:
+            self._overrides[component] = factory
+            # Dependent instances (e.g. a vector store holding the old embedder)
+            # must be rebuilt too, so start from an empty cache.
+            self._instances.clear()
+
+    def _build(self, component: str, default: Callable[..., Any], *args, **kwargs) -> Any:
+        factory = self._overrides.get(component, default)
+        return factory(*args, **kwargs)
+
+    def loaded(self) -> List[Hashable]:
+        return list(self._instances)
+
+    # --- Embeddings ---
+    def embedder(self, model_name: str = config.EMBED_MODEL):
+        """
+        The embedding service (query coalescing + cache) around the model.
+        An "embedder" override replaces the model, not the service.
+        """
+        def factory(model_name):
+            if config.MODEL_SERVER:
+                from als_core.model_server import RemoteEmbeddings
+                return RemoteEmbeddings(self.model_client(), model_name)
+            from langchain_huggingface import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(
+                model_name=model_name,
+                encode_kwargs={"batch_size": config.EMBED_BATCH_SIZE, "normalize_embeddings": True},
+            )
+
+        def service():
+            from als_core.embedding_service import EmbeddingService
+            return EmbeddingService(self._build("embedder", factory, model_name))
+        key = ("embedder", model_name)
+        return self.get_or_create(key, service)
+
+    # --- Vector store ---
+    def chroma_client(self, persist_dir: Path = config.CHROMA_DIR):
+        path = str(Path(persist_dir).resolve())
+
+        def factory(path):
+            from chromadb import PersistentClient
+            return PersistentClient(path=path)
+        key = ("chroma_client", path)
+        return self.get_or_create(key, lambda: self._build("chroma_client", factory, path))
+
+    def collection(self, collection_name: str = config.COLLECTION_NAME,
+                   persist_dir: Path = config.CHROMA_DIR, create: bool = False):
+        """
+        The Chroma collection; a missing one raises (an empty store must not
+        silently answer without context). Only ingestion passes create=True.
+        """
+        client = self.chroma_client(persist_dir)
+        key = ("collection", str(Path(persist_dir).resolve()), collection_name)
+
+        def factory():
+            if create:
+                return client.get_or_create_collection(collection_name)
+            return client.get_collection(collection_name)
+        return self.get_or_create(key, factory)
+
+    def vectorstore(self, collection_name: str = config.COLLECTION_NAME,
+                    persist_dir: Path = config.CHROMA_DIR):
+        path = str(Path(persist_dir).resolve())
+
+        def factory(collection_name, path):
+            if config.VECTOR_BACKEND == "snapshot":
+                from als_core.vector_snapshot import SnapshotVectorStore
+                return SnapshotVectorStore(self.vector_snapshot(collection_name, path), self.embedder())
+            from langchain_chroma import Chroma
+            return Chroma(
+                client=self.chroma_client(path),
+                collection_name=collection_name,
+                embedding_function=self.embedder(),
+                create_collection_if_not_exists=False,
+            )
+        key = ("vectorstore", path, collection_name)
+        return self.get_or_create(key, lambda: self._build("vectorstore", factory, collection_name, path))
+
+    def bm25_index(self, collection_name: str = config.COLLECTION_NAME,
+                   persist_dir: Path = config.CHROMA_DIR):
+        """
+        Keyword index over the same chunks, persisted next to the Chroma store.
+        Built from the collection when the file is missing or out of date, and
+        from the vector snapshot (checked on every call) when serving from it.
+        """
+        path = Path(persist_dir).resolve() / f"bm25_{collection_name}.json"
+
+        def factory(collection_name, path):
+            from als_core.hybrid_search import BM25Index
+            if config.VECTOR_BACKEND == "snapshot":
+                # Workers serving from the snapshot never open Chroma (synced below)
+                return BM25Index.load(path) if path.exists() else BM25Index(path)
+            collection = self.collection(collection_name, path.parent)
+            if path.exists():
+                index = BM25Index.load(path)
+                if len(index) == collection.count():
+                    return index
+            index = BM25Index.from_collection(collection, path)
+            index.save()
+            return index
+        key = ("bm25", str(path))
+        index = self.get_or_create(key, lambda: self._build("bm25", factory, collection_name, path))
+        if config.VECTOR_BACKEND == "snapshot":
+            self._sync_bm25(index, self.vector_snapshot(collection_name, path.parent))
+        return index
+
+    @staticmethod
+    def _sync_bm25(index, snapshot):
+        """Rebuild (and save) the index when it doesn't hold the current snapshot version."""
+        snapshot.refresh()      # re-exported since the last call?
+        index.refresh()         # another worker may have saved the rebuilt index already
+        if index.source != snapshot.version:
+            index.rebuild(snapshot.ids, snapshot.texts(), snapshot.metadatas, source=snapshot.version)
+            index.save()        # else the next refresh() reloads the stale file over it
+
+    def vector_snapshot(self, collection_name: str = config.COLLECTION_NAME,
+                        persist_dir: Path = config.CHROMA_DIR):
+        """Memory-mapped export of the collection (see als_core.vector_snapshot)."""
+        from als_core.vector_snapshot import VectorSnapshot, snapshot_dir
+        path = snapshot_dir(collection_name, persist_dir)
+        return self.get_or_create(("vector_snapshot", str(path)), lambda: VectorSnapshot.load(path))
+
+    def retriever(self, k: int = 4, collection_name: str = config.COLLECTION_NAME,
+                  persist_dir: Path = config.CHROMA_DIR):
+        """
+        Hybrid (dense + BM25) retriever, or dense only with ALS_RETRIEVAL=dense,
+        followed by the cross-encoder reranker when ALS_RERANK=1. Cheap per call.
+        """
+        from als_core.hybrid_search import HybridRetriever
+        index = self.bm25_index(collection_name, persist_dir) if config.RETRIEVAL_MODE == "hybrid" else None
+        reranker = self.reranker() if config.RERANK_ENABLED else None
+        return HybridRetriever(vectorstore=self.vectorstore(collection_name, persist_dir), index=index,
+                               reranker=reranker, k=k)
+
+    # --- Reranking ---
+    def cross_encoder(self, model_name: str = config.RERANK_MODEL):
+        def factory(model_name):
+            from sentence_transformers import CrossEncoder
+            return CrossEncoder(model_name, device="cuda" if _device() >= 0 else "cpu")
+        key = ("cross_encoder", model_name)
+        return self.get_or_create(key, lambda: self._build("cross_encoder", factory, model_name))
+
+    def reranker(self, model_name: str = config.RERANK_MODEL):
+        """
+        Latency-bounded reranker. The cross-encoder is loaded on its first
+        scoring call, inside the budget (or by warm_up("reranker")).
+        """
+        def factory():
+            from als_core.reranker import Reranker
+            # One batched forward pass over all candidates
+            return Reranker(lambda pairs: self.cross_encoder(model_name).predict(pairs, batch_size=len(pairs)))
+        return self.get_or_create(("reranker", model_name), factory)
+
+    def index_version(self, persist_dir: Path = config.CHROMA_DIR) -> int:
+        """
+        Cheap version stamp of the persisted vector store (mtime of its SQLite
+        file). Changes whenever ingestion writes to the store, so caches built
+        on top of retrieval results can invalidate themselves.
+        """
+        try:
+            return (Path(persist_dir) / "chroma.sqlite3").stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    # --- LLMs ---
+    def hf_pipeline(self, model_id: str = config.CHAT_MODEL_ID, task: str = "text-generation"):
+        """
+        The transformers pipeline that owns the model weights (shared), loaded
+        with the ALS_INFERENCE_BACKEND precision (fp32, bf16 or int8).
+        """
+        def factory(model_id, task):
+            from transformers import AutoTokenizer, pipeline
+            from als_core.inference_backend import configure_threads, load_model
+            configure_threads()
+            device = _device()
+            model, _ = load_model(model_id, task, device=device)
+            return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_id), device=device)
+        key = ("pipeline", model_id, task)
+        return self.get_or_create(key, lambda: self._build("pipeline", factory, model_id, task))
+
+    def tokenizer(self, model_id: str = config.CHAT_MODEL_ID, task: str = "text-generation"):
+        if config.MODEL_SERVER:
+            # Prompt building only needs the tokenizer, not the weights
+            from transformers import AutoTokenizer
+            return self.get_or_create(("tokenizer", model_id), lambda: AutoTokenizer.from_pretrained(model_id))
+        return self.hf_pipeline(model_id, task).tokenizer
+
+    def prefix_cache(self, model_id: str = config.CHAT_MODEL_ID):
+        """
+        KV caches of the registered constant prompt heads (None with
+        ALS_PREFIX_CACHE=0, or when the model server holds the model).
+        """
+        if not config.PREFIX_CACHE_ENABLED or config.MODEL_SERVER:
+            return None
+
+        def factory(model_id):
+            from als_core.prefix_cache import PrefixCache
+            pipe = self.hf_pipeline(model_id)
+            return PrefixCache(pipe.model, pipe.tokenizer, model_id)
+        key = ("prefix_cache", model_id)
+        return self.get_or_create(key, lambda: self._build("prefix_cache", factory, model_id))
+
+    def batcher(self, model_id: str = config.CHAT_MODEL_ID):
+        """Micro-batching scheduler that serialises access to the model weights."""
+        def factory(model_id):
+            if config.MODEL_SERVER:
+                from als_core.model_server import RemoteBatcher
+                return RemoteBatcher(self.model_client(), model_id)
+            from als_core.batching import MicroBatcher
+            pipe = self.hf_pipeline(model_id)
+            return MicroBatcher(pipe.model, pipe.tokenizer, prefix_cache=self.prefix_cache(model_id))
+        key = ("batcher", model_id)
+        return self.get_or_create(key, lambda: self._build("batcher", factory, model_id))
+
+    def hf_llm(self, model_id: str = config.CHAT_MODEL_ID, task: str = "text-generation",
+               **pipeline_kwargs):
+        """
+        LangChain wrapper around the shared pipeline. Wrappers with different
+        generation settings are cheap and all reuse the same weights.
+        Text generation goes through the micro-batcher unless ALS_BATCHING=0
+        (always, with a model server).
+        """
+        def factory(model_id, task, **pipeline_kwargs):
+            if task == "text-generation" and (config.BATCHING_ENABLED or config.MODEL_SERVER):
+                from als_core.batching import BatchedLLM
+                return BatchedLLM(batcher=self.batcher(model_id), generation_kwargs=pipeline_kwargs)
+
+            from langchain_huggingface import HuggingFacePipeline
+            from transformers import StoppingCriteriaList
+            from als_core.stopping import CancellationCriteria
+            pipe = self.hf_pipeline(model_id, task)
+            if task == "text-generation":
+                pipeline_kwargs.setdefault("pad_token_id", pipe.tokenizer.eos_token_id)
+            # Abandoned requests (see inference_executor) stop decoding early
+            pipeline_kwargs.setdefault(
+                "stopping_criteria", StoppingCriteriaList([CancellationCriteria()])
+            )
+            return HuggingFacePipeline(pipeline=pipe, model_id=model_id, pipeline_kwargs=pipeline_kwargs)
+        key = ("llm", model_id, task, _freeze(pipeline_kwargs))
+        return self.get_or_create(
+            key, lambda: self._build("llm", factory, model_id, task, **pipeline_kwargs)
+        )
+
+    def model_client(self, address: Optional[str] = None):
+        """Connection(s) to the model server at `address` (default ALS_MODEL_SERVER)."""
+        from als_core.model_server import ModelClient
+        address = address or config.MODEL_SERVER
+        return self.get_or_create(("model_client", address), lambda: ModelClient(address))
+
+    def chat_openai(self, model_name: str = config.OPENAI_MODEL, temperature: float = 0.2):
+        def factory(model_name, temperature):
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(temperature=temperature, model_name=model_name)
+        key = ("chat_openai", model_name, temperature)
+        return self.get_or_create(
+            key, lambda: self._build("chat_openai", factory, model_name, temperature)
+        )
+
+    # --- Lifecycle hooks ---
+    def warm_up(self, components: Optional[Iterable[str]] = None):
+        """Load the given components now instead of on the first request."""
+        for component in components or config.WARMUP_COMPONENTS:
+            if component == "embedder":
+                self.embedder()
+            elif component == "vectorstore":
+                self.vectorstore()
+                if config.RETRIEVAL_MODE == "hybrid":
+                    self.bm25_index()
+            elif component == "llm" and config.MODEL_SERVER:
+                self.model_client().wait_ready()
+                self.tokenizer()
+            elif component == "llm":
+                self.hf_pipeline()
+                prefix_cache = self.prefix_cache()
+                if prefix_cache is not None:
+                    prefix_cache.warm()
+            elif component == "reranker":
+                self.cross_encoder()
+            elif component == "openai":
+                self.chat_openai()
+            else:
+                raise ValueError(f"Unknown warm-up component: {component}")
+
+    def teardown(self):
+        """Drop every cached instance and release the memory they held."""
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+            self._key_locks.clear()
+        for instance in instances:
+            close = getattr(instance, "close", None)
+            if callable(close):
+                close()
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+# --- Process-wide instance ---
+registry = ModelRegistry()
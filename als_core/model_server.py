@@ -0,0 +1,300 @@
+"""
+Model server: one process owns TinyLlama and MiniLM, API workers call it over IPC.
+
+With `uvicorn --workers N` every worker would otherwise load its own copy of
+the weights, so memory, not CPU, caps N. Instead one server process loads the
+models once and answers generation and embedding requests on a Unix socket
+(a named pipe on Windows) through `multiprocessing.connection`. Its
+micro-batcher and embedding service coalesce requests across all workers, so
+concurrent requests from different workers still share one forward pass.
+
+Workers only need ALS_MODEL_SERVER set to the same address (and the server's
+ALS_MODEL_SERVER_AUTHKEY, a secret without a default): the registry then
+hands out `RemoteBatcher` / `RemoteEmbeddings` (and a bare tokenizer for
+prompt building) instead of loading anything, and chain code is unchanged.
+
+    export ALS_MODEL_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python -m als_core.model_server --address /tmp/als-models.sock
+    cd RAG && ALS_MODEL_SERVER=/tmp/als-models.sock uvicorn api_main:api --workers 4
+
+Prompt heads for the KV prefix cache are registered by the chain modules,
+which only the workers import. Before its first generation for a model, a
+client sends the rendered heads it knows (op "register_prefixes"); the server
+registers them and its batcher prefills each one once, on first use.
+
+Requests are pickled tuples (op, args, kwargs); replies are ("ok", result) or
+("error", message), and a stream is a run of ("piece", text) ending with
+("end", None). Cancellation of abandoned requests does not cross the socket:
+a non-streamed generation runs to completion on the server.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from als_core import config
+from als_core.metrics import metrics
+
+logger = logging.getLogger("als.model_server")
+
+SERVER_REQUESTS = metrics.counter("als_model_server_requests_total", "Model server requests by operation")
+SERVER_SECONDS = metrics.histogram("als_model_server_seconds", "Model server time per request by operation")
+
+
+class ModelServerError(RuntimeError):
+    """The model server failed to serve a request."""
+
+
+def _require_authkey(authkey: bytes) -> bytes:
+    # Anyone who can reach the socket and knows the key can drive generation
+    if not authkey:
+        raise ModelServerError(
+            "ALS_MODEL_SERVER_AUTHKEY must be set (the same secret for the server and its workers), e.g. "
+            "python -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    return authkey
+
+
+# --- Server ---
+class ModelServer:
+    """Serves the registry's models to other processes (one thread per connection)."""
+
+    def __init__(self, address: str = config.MODEL_SERVER, authkey: bytes = config.MODEL_SERVER_AUTHKEY):
+        self.address = address
+        self.authkey = _require_authkey(authkey)
+        self._listener: Optional[Listener] = None
+
+    def warm_up(self, components: Sequence[str] = ("embedder", "llm")):
+        from als_core.model_registry import registry
+        if components:
+            registry.warm_up(components)
+        if "llm" in components:
+            registry.batcher()
+
+    def serve_forever(self):
+        if not self.address.startswith("\\\\") and os.path.exists(self.address):
+            os.unlink(self.address)     # stale socket of a previous run
+        self._listener = Listener(self.address, authkey=self.authkey)
+        logger.info("Model server listening on %s (pid %d)", self.address, os.getpid())
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except OSError:     # listener closed
+                    break
+                threading.Thread(target=self._serve, args=(conn,), name="model-server-conn", daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _serve(self, conn: Connection):
+        with conn:
+            while True:
+                try:
+                    op, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                started = time.perf_counter()
+                SERVER_REQUESTS.inc(op=op)
+                try:
+                    if op == "stream":
+                        self._stream(conn, *args, **kwargs)
+                    else:
+                        conn.send(("ok", self._handle(op, *args, **kwargs)))
+                except (EOFError, OSError, BrokenPipeError):
+                    return      # client went away
+                except Exception as exc:
+                    logger.exception("Model server request %s failed", op)
+                    conn.send(("error", f"{type(exc).__name__}: {exc}"))
+                finally:
+                    SERVER_SECONDS.observe(time.perf_counter() - started, op=op)
+
+    def _handle(self, op: str, *args, **kwargs) -> Any:
+        from als_core.model_registry import registry
+        if op == "generate":
+            prompt, model_id = args
+            return registry.batcher(model_id).generate(prompt, **kwargs)
+        if op == "embed_documents":
+            texts, model_name = args
+            return registry.embedder(model_name).embed_documents(texts)
+        if op == "embed_query":
+            text, model_name = args
+            return registry.embedder(model_name).embed_query(text)
+        if op == "register_prefixes":
+            from als_core.prefix_cache import register_prefix
+            heads, model_id = args
+            for name, text in heads.items():
+                register_prefix(name, text, model_id=model_id)    # prefilled by the next lookup
+            return len(heads)
+        if op == "ping":
+            from als_core.prefix_cache import registered_prefixes
+            return {"pid": os.getpid(), "loaded": [repr(key) for key in registry.loaded()],
+                    "prefixes": registered_prefixes()}
+        raise ValueError(f"Unknown model server operation: {op}")
+
+    def _stream(self, conn: Connection, prompt: str, model_id: str, stop: Optional[List[str]], **gen_kwargs):
+        from als_core.streaming import stream_generate
+        pieces = stream_generate(prompt, model_id, stop=stop, **gen_kwargs)
+        try:
+            for piece in pieces:
+                conn.send(("piece", piece))
+        finally:
+            pieces.close()      # stops decoding when the client disconnected
+        conn.send(("end", None))
+
+
+# --- Client ---
+class ModelClient:
+    """Connection to the model server; one connection per calling thread."""
+
+    def __init__(self, address: str = config.MODEL_SERVER, authkey: bytes = config.MODEL_SERVER_AUTHKEY):
+        self.address = address
+        self.authkey = _require_authkey(authkey)
+        self._local = threading.local()
+        self._sent_lock = threading.RLock()    # call() clears the set on reconnect
+        self._sent_prefixes: Dict[str, set] = {}     # model_id -> head names the server has
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        for attempt in (1, 2):
+            try:
+                conn = self._connection()
+                conn.send((op, args, kwargs))
+                status, payload = conn.recv()
+                break
+            except (EOFError, OSError):
+                # Server restarted: reconnect once (and send the prompt heads again)
+                self._drop()
+                with self._sent_lock:
+                    self._sent_prefixes.clear()
+                if attempt == 2:
+                    raise
+        if status == "error":
+            raise ModelServerError(payload)
+        return payload
+
+    def sync_prefixes(self, model_id: str = config.CHAT_MODEL_ID):
+        """Send the prompt heads registered in this process that the server doesn't have yet."""
+        from als_core.prefix_cache import prefix_texts
+        with self._sent_lock:
+            sent = self._sent_prefixes.setdefault(model_id, set())
+            heads = {name: text for name, text in prefix_texts(model_id).items() if name not in sent}
+            if heads:
+                self.call("register_prefixes", heads, model_id)
+                sent.update(heads)
+
+    def stream(self, prompt: str, model_id: str = config.CHAT_MODEL_ID,
+               stop: Optional[List[str]] = None, **gen_kwargs) -> Iterator[str]:
+        self.sync_prefixes(model_id)
+        conn = self._connection()
+        conn.send(("stream", (prompt, model_id, stop), gen_kwargs))
+        finished = False
+        try:
+            while True:
+                status, payload = conn.recv()
+                if status == "piece":
+                    yield payload
+                elif status == "end":
+                    finished = True
+                    return
+                else:
+                    raise ModelServerError(payload)
+        finally:
+            if not finished:
+                # Consumer stopped early: closing the socket stops the server's decoding
+                self._drop()
+
+    def wait_ready(self, timeout_s: float = config.MODEL_SERVER_TIMEOUT_S) -> dict:
+        """Block until the server accepts connections (it may still be loading)."""
+        deadline = time.monotonic() + timeout_s
+        while True:
+            try:
+                return self.call("ping")
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise ModelServerError(f"No model server at {self.address} after {timeout_s:.0f}s")
+                time.sleep(0.2)
+
+    def close(self):
+        self._drop()
+
+
+class RemoteBatcher:
+    """MicroBatcher interface (submit / generate / generate_many) served by the model server."""
+
+    def __init__(self, client: ModelClient, model_id: str = config.CHAT_MODEL_ID,
+                 threads: int = config.MODEL_SERVER_CLIENT_THREADS):
+        self.client = client
+        self.model_id = model_id
+        # Concurrent submits use separate connections, so the server can batch them
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="model-client")
+
+    def submit(self, prompt: str, **gen_kwargs) -> Future:
+        self.client.sync_prefixes(self.model_id)
+        return self._pool.submit(self.client.call, "generate", prompt, self.model_id, **gen_kwargs)
+
+    def generate(self, prompt: str, **gen_kwargs) -> str:
+        self.client.sync_prefixes(self.model_id)
+        return self.client.call("generate", prompt, self.model_id, **gen_kwargs)
+
+    def generate_many(self, prompts: List[str], **gen_kwargs) -> List[str]:
+        futures = [self.submit(p, **gen_kwargs) for p in prompts]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+class RemoteEmbeddings(Embeddings):
+    """The server's embedding model as a LangChain `Embeddings`."""
+
+    def __init__(self, client: ModelClient, model_name: str = config.EMBED_MODEL):
+        self.client = client
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.call("embed_documents", list(texts), self.model_name)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.call("embed_query", text, self.model_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve TinyLlama and MiniLM to the API workers.")
+    parser.add_argument("--address", default=config.MODEL_SERVER or "/tmp/als-models.sock",
+                        help="Unix socket path (or \\\\.\\pipe\\name on Windows)")
+    parser.add_argument("--warm-up", nargs="*", default=["embedder", "llm"], choices=["embedder", "llm"],
+                        help="models loaded before listening (none: on the first request)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # This process serves the models itself, whatever the workers are told
+    config.MODEL_SERVER = ""
+    server = ModelServer(args.address)
+    server.warm_up(args.warm_up)
+    if config.PREFIX_CACHE_ENABLED:
+        logger.info("KV prefix cache on: prompt heads are registered by the workers on their first request")
+    else:
+        logger.info("KV prefix cache off (ALS_PREFIX_CACHE=0)")
+    server.serve_forever()
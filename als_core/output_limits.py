@@ -0,0 +1,92 @@
+"""
+When is a generated answer complete?
+
+The prompts ask TinyLlama for "3–5 sentences", "exactly 5 short lines" or a
+single label, yet `max_new_tokens` keeps it decoding well past that and the
+surplus used to be cut off afterwards. `OutputLimits` states the shape of a
+complete answer: stop strings (role tags), and line, sentence, word and
+character budgets. als_core.stopping.OutputLimitCriteria checks it between
+decoding steps, so generation halts as soon as the answer is complete, and
+`apply` trims the text to exactly the limit.
+
+It is plain, hashable data (no torch import), so chain modules can define
+limits at import time and they travel through generation kwargs, the
+micro-batcher and the model server socket.
+
+Usage:
+    ANSWER_LIMITS = OutputLimits(stop=ROLE_TAGS, max_sentences=5)
+    text = llm.invoke(prompt, output_limits=ANSWER_LIMITS)
+    text = ANSWER_LIMITS.apply(text)    # no-op when decoding already stopped on it
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+# End of a sentence: terminator(s), optional closing quote / bracket, then
+# whitespace. A single letter before the dot ("e.g. ", "i.e. ") is not an end.
+_SENTENCE_END = re.compile(r"(?<!\b[A-Za-z])[.!?]+[\"')\]]*(?=\s)")
+_WORD = re.compile(r"\S+")
+
+
+@dataclass(frozen=True)
+class OutputLimits:
+    """Every limit is optional; the first one reached completes the answer."""
+
+    stop: Tuple[str, ...] = ()              # e.g. role tags opening a new turn
+    max_lines: Optional[int] = None         # non-empty lines
+    max_sentences: Optional[int] = None
+    max_words: Optional[int] = None
+    max_chars: Optional[int] = None         # leading whitespace not counted
+
+    def __post_init__(self):
+        object.__setattr__(self, "stop", tuple(self.stop))
+
+    def with_stop(self, stop: Sequence[str]) -> "OutputLimits":
+        extra = tuple(s for s in stop if s not in self.stop)
+        if not extra:
+            return self
+        return OutputLimits(self.stop + extra, self.max_lines, self.max_sentences, self.max_words, self.max_chars)
+
+    def reached(self, text: str) -> Optional[str]:
+        """The limit `text` has reached ("stop", "lines", ...), or None while incomplete."""
+        if any(s in text for s in self.stop):
+            return "stop"
+        if self.max_lines is not None:
+            complete = text.split("\n")[:-1]
+            if sum(1 for line in complete if line.strip()) >= self.max_lines:
+                return "lines"
+        if self.max_sentences is not None and len(_SENTENCE_END.findall(text)) >= self.max_sentences:
+            return "sentences"
+        if self.max_words is not None:
+            words = len(text.split())
+            if words > self.max_words or (words == self.max_words and text[-1:].isspace()):
+                return "words"
+        if self.max_chars is not None and len(text.lstrip()) >= self.max_chars:
+            return "chars"
+        return None
+
+    def apply(self, text: str) -> str:
+        """`text` cut right at the first limit it exceeds."""
+        hits = [text.find(s) for s in self.stop if s in text]
+        if hits:
+            text = text[:min(hits)]
+        if self.max_lines is not None:
+            kept, count = [], 0
+            for line in text.split("\n"):
+                if count == self.max_lines:
+                    break
+                kept.append(line)
+                count += bool(line.strip())
+            text = "\n".join(kept)
+        if self.max_sentences is not None:
+            ends = list(_SENTENCE_END.finditer(text))
+            if len(ends) >= self.max_sentences:
+                text = text[:ends[self.max_sentences - 1].end()]
+        if self.max_words is not None:
+            words = list(_WORD.finditer(text))
+            if len(words) >= self.max_words:
+                text = text[:words[self.max_words - 1].end()]
+        if self.max_chars is not None:
+            lead = len(text) - len(text.lstrip())
+            text = text[:lead + self.max_chars]
+        return text
@@ -0,0 +1,194 @@
+"""
+KV-cache reuse for the constant heads of the TinyLlama prompts.
+
+Every answer prompt starts with the same system message / instructions (RAG
+answer and empathy prompts, the RAG_LEL headers, the RAG_LCEL classifier
+preamble). Chain modules register those heads at import time; the first time
+the model is loaded (registry.warm_up, or the first request) each head is
+prefilled once and its past_key_values are kept.
+
+A generation then looks up the registered head sharing the longest token
+prefix with its prompt, starts from a copy of that cache (cropped to the
+shared length) and only prefills the request-specific rest. Matching on token
+IDs keeps the output identical to the uncached path even when the tokenizer
+merges the last head token with the text that follows.
+
+Batches are covered too (`lookup_batch`): each row starts from the cache of
+its own head, e.g. the RAG_LEL medical and support prompts generated
+together. Rows are laid out as [pad | head | pad | rest], with the heads
+right-aligned over the cached positions and the rests left-padded after them;
+the attention mask hides both pads and position IDs follow the mask, so every
+row sees exactly its own prompt.
+
+Usage:
+    # in a chain module (no model work)
+    register_prefix("lel_rag", lambda slot: rag_prompt.format(context=slot, question=""))
+
+    # in the code that calls model.generate
+    cache, reused = registry.prefix_cache().lookup(encoded["input_ids"])
+    model.generate(**encoded, past_key_values=cache, ...)
+
+    batch = registry.prefix_cache().lookup_batch(token_id_rows, tokenizer.pad_token_id)
+    if batch is not None:
+        model.generate(input_ids=batch.input_ids, attention_mask=batch.attention_mask,
+                       past_key_values=batch.cache, ...)
+"""
+import copy
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from als_core import config
+from als_core.metrics import metrics
+
+PREFIX_REQUESTS = metrics.counter("als_prefix_cache_requests_total", "Prefix cache lookups by result (hit, miss)")
+PREFIX_TOKENS = metrics.counter("als_prefix_cache_tokens_total", "Prompt tokens whose prefill was skipped")
+
+# Stands in for the first request-specific part when rendering a template
+_SLOT = "\x00SLOT\x00"
+
+# model_id -> name -> prefix text, or render(slot) -> prompt with `slot` in place
+# of the first variable part (evaluated lazily, e.g. needs the chat template)
+_REGISTERED: Dict[str, Dict[str, Union[str, Callable[[str], str]]]] = {}
+
+
+def register_prefix(name: str, prefix: Union[str, Callable[[str], str]],
+                    model_id: str = config.CHAT_MODEL_ID):
+    _REGISTERED.setdefault(model_id, {})[name] = prefix
+
+
+def registered_prefixes() -> Dict[str, List[str]]:
+    """model_id -> names of the registered heads."""
+    return {model_id: sorted(heads) for model_id, heads in _REGISTERED.items()}
+
+
+def prefix_text(prefix: Union[str, Callable[[str], str]]) -> str:
+    return prefix if isinstance(prefix, str) else prefix(_SLOT).split(_SLOT)[0]
+
+
+def prefix_texts(model_id: str = config.CHAT_MODEL_ID) -> Dict[str, str]:
+    """name -> rendered head text of every head registered for `model_id`."""
+    return {name: prefix_text(prefix) for name, prefix in _REGISTERED.get(model_id, {}).items()}
+
+
+class _Entry(NamedTuple):
+    input_ids: "torch.Tensor"   # (1, n) prefix token IDs
+    cache: object               # transformers DynamicCache holding their keys / values
+
+
+class PrefixBatch(NamedTuple):
+    input_ids: "torch.Tensor"        # (batch, head + rest), see the module docstring for the layout
+    attention_mask: "torch.Tensor"   # (batch, head + rest)
+    cache: object                    # DynamicCache covering the first `head` positions of every row
+    reused: List[int]                # cached prompt tokens per row
+
+
+class PrefixCache:
+    """Past key values of the registered prompt heads of one model."""
+
+    def __init__(self, model, tokenizer, model_id: str = config.CHAT_MODEL_ID,
+                 min_tokens: int = config.PREFIX_CACHE_MIN_TOKENS):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.model_id = model_id
+        self.min_tokens = min_tokens
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def warm(self) -> int:
+        """Prefill every registered head not computed yet; returns how many are cached."""
+        import torch
+        from transformers import DynamicCache
+
+        with self._lock:
+            for name, prefix in _REGISTERED.get(self.model_id, {}).items():
+                if name in self._entries:
+                    continue
+                input_ids = self.tokenizer(prefix_text(prefix), return_tensors="pt")["input_ids"]
+                input_ids = input_ids.to(self.model.device)
+                with torch.inference_mode():
+                    output = self.model(input_ids=input_ids, past_key_values=DynamicCache(), use_cache=True)
+                self._entries[name] = _Entry(input_ids, output.past_key_values)
+            return len(self._entries)
+
+    def _match(self, ids) -> Tuple[Optional[_Entry], int]:
+        """The registered head sharing the longest token prefix with `ids` (1-D), and that length."""
+        if len(self._entries) < len(_REGISTERED.get(self.model_id, {})):
+            self.warm()   # heads registered after warm-up
+        best, best_len = None, 0
+        for entry in self._entries.values():
+            prefix = entry.input_ids[0]
+            n = min(len(prefix), len(ids) - 1)    # leave at least one token to prefill
+            if n <= best_len:
+                continue
+            mismatch = (prefix[:n] != ids[:n]).nonzero()
+            common = int(mismatch[0]) if len(mismatch) else n
+            if common > best_len:
+                best, best_len = entry, common
+        if best is None or best_len < self.min_tokens:
+            return None, 0
+        return best, best_len
+
+    def lookup(self, input_ids) -> Tuple[Optional[object], int]:
+        """
+        A private copy of the cache for the longest registered head that
+        `input_ids` (shape (1, n)) starts with, and the number of tokens it
+        covers; (None, 0) when no head matches at least `min_tokens`.
+        """
+        import torch
+
+        best, best_len = self._match(input_ids[0])
+        if best is None:
+            PREFIX_REQUESTS.inc(result="miss")
+            return None, 0
+        with torch.inference_mode():
+            cache = copy.deepcopy(best.cache)
+            surplus = best.input_ids.shape[1] - best_len
+            if surplus:
+                cache.crop(-surplus)    # drop the head tokens the prompt doesn't share
+        PREFIX_REQUESTS.inc(result="hit")
+        PREFIX_TOKENS.inc(best_len)
+        return cache, best_len
+
+    def lookup_batch(self, rows: Sequence[Sequence[int]], pad_token_id: int) -> Optional[PrefixBatch]:
+        """
+        Inputs and a fresh cache for generating the unpadded token ID `rows`
+        together, each from the cache of its own head; None when no row
+        matches a head (prefill the batch in full).
+        """
+        import torch
+        from transformers import DynamicCache
+
+        device = self.model.device
+        rows = [torch.as_tensor(row, dtype=torch.long, device=device) for row in rows]
+        matches = [self._match(row) for row in rows]
+        for entry, _ in matches:
+            PREFIX_REQUESTS.inc(result="hit" if entry is not None else "miss")
+        if all(entry is None for entry, _ in matches):
+            return None
+
+        head = max(n for _, n in matches)
+        rest = max(len(row) - n for row, (_, n) in zip(rows, matches))
+        input_ids = torch.full((len(rows), head + rest), pad_token_id, dtype=torch.long, device=device)
+        attention_mask = torch.zeros((len(rows), head + rest), dtype=torch.long, device=device)
+        for i, (row, (_, n)) in enumerate(zip(rows, matches)):
+            input_ids[i, head - n:head] = row[:n]
+            attention_mask[i, head - n:head] = 1
+            input_ids[i, head + rest - (len(row) - n):] = row[n:]
+            attention_mask[i, head + rest - (len(row) - n):] = 1
+
+        layers = [list(entry.cache) if entry is not None else None for entry, _ in matches]
+        template = next(l for l in layers if l is not None)
+        data = []
+        with torch.inference_mode():
+            for layer_idx, (keys, values, _) in enumerate(template):
+                batch_keys = keys.new_zeros((len(rows), keys.shape[1], head, keys.shape[3]))
+                batch_values = values.new_zeros((len(rows), values.shape[1], head, values.shape[3]))
+                for i, (row_layers, (_, n)) in enumerate(zip(layers, matches)):
+                    if n:
+                        row_keys, row_values, _ = row_layers[layer_idx]
+                        batch_keys[i, :, head - n:] = row_keys[0, :, :n]
+                        batch_values[i, :, head - n:] = row_values[0, :, :n]
+                data.append((batch_keys, batch_values))
+        PREFIX_TOKENS.inc(sum(n for _, n in matches))
+        return PrefixBatch(input_ids, attention_mask, DynamicCache(data),
+                           [n for _, n in matches])
@@ -0,0 +1,102 @@
+"""
+Optional cross-encoder reranking between retrieval and prompt building.
+
+Retrieval over-fetches candidates; a small local cross-encoder
+(ms-marco-MiniLM-L-6 by default) scores every (question, chunk) pair in one
+batched call, and only the best `top_n` chunks go on to the prompt, so
+TinyLlama prefills fewer, better chunks.
+
+Scoring runs on a small worker pool under a hard latency budget: when it takes
+longer than `budget_ms` (including the first call, which loads the model), the
+caller gets the retrieval order back and the late result is discarded. A
+timed-out job keeps its worker until it finishes, so while every worker is
+busy new calls skip reranking instead of queueing behind it.
+
+Usage:
+    reranker = Reranker(score_fn=cross_encoder.predict, top_n=3, budget_ms=80)
+    docs = reranker.rerank(question, candidates)
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from als_core import config
+from als_core.metrics import metrics
+
+RERANK_REQUESTS = metrics.counter("als_rerank_requests_total", "Rerank calls by result (reranked, timeout, busy, error)")
+RERANK_DURATION = metrics.histogram(
+    "als_rerank_seconds", "Cross-encoder scoring time per call",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+RANK_SHIFT = metrics.histogram(
+    "als_rerank_rank_shift", "Positions a kept chunk moved compared to retrieval order",
+    buckets=(0, 1, 2, 3, 5, 8, 13),
+)
+PROMOTED = metrics.counter(
+    "als_rerank_promoted_total", "Kept chunks that retrieval ranked below the top_n cut-off"
+)
+
+
+class Reranker:
+    def __init__(
+        self,
+        score_fn: Callable[[List[Tuple[str, str]]], Sequence[float]],
+        top_n: int = config.RERANK_TOP_N,
+        candidates: int = config.RERANK_CANDIDATES,
+        budget_ms: float = config.RERANK_BUDGET_MS,
+        workers: int = 2,
+    ):
+        self.score_fn = score_fn
+        self.top_n = top_n
+        self.candidates = candidates
+        self.budget_s = budget_ms / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reranker")
+        self._slots = threading.BoundedSemaphore(workers)   # jobs in flight, late ones included
+
+    def _score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        started = time.perf_counter()
+        try:
+            scores = self.score_fn([(query, doc.page_content) for doc in docs])
+        finally:
+            self._slots.release()
+        RERANK_DURATION.observe(time.perf_counter() - started)
+        return [float(s) for s in scores]
+
+    def rerank(self, query: str, docs: Sequence[Document], top_n: Optional[int] = None) -> List[Document]:
+        """Best `top_n` of `docs` by cross-encoder score; retrieval order on timeout or error."""
+        top_n = top_n or self.top_n
+        docs = list(docs)
+        if len(docs) <= 1:
+            return docs[:top_n]
+
+        if not self._slots.acquire(blocking=False):
+            RERANK_REQUESTS.inc(result="busy")   # earlier jobs still scoring: keep retrieval order
+            return docs[:top_n]
+        try:
+            future = self._pool.submit(self._score, query, docs)
+        except RuntimeError:                     # pool shut down
+            self._slots.release()
+            RERANK_REQUESTS.inc(result="error")
+            return docs[:top_n]
+        try:
+            scores = future.result(timeout=self.budget_s)
+        except FutureTimeout:
+            RERANK_REQUESTS.inc(result="timeout")
+            return docs[:top_n]
+        except Exception:
+            RERANK_REQUESTS.inc(result="error")
+            return docs[:top_n]
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_n]
+        RERANK_REQUESTS.inc(result="reranked")
+        for new_rank, old_rank in enumerate(order):
+            RANK_SHIFT.observe(abs(old_rank - new_rank))
+            if old_rank >= top_n:
+                PROMOTED.inc()
+        return [docs[i] for i in order]
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,161 @@
+"""
+Semantic answer cache keyed by question embeddings.
+
+Questions are embedded with the already-loaded MiniLM model; a lookup returns
+the stored answer of the most similar cached question when its cosine
+similarity is above the threshold. Entries expire after a TTL, the least
+recently used entry is evicted when the cache is full, and everything is
+dropped when the vector store version changes (e.g. after re-ingestion).
+
+Usage:
+    cache = SemanticCache(embed_fn=registry.embedder().embed_query,
+                          version_fn=registry.index_version)
+
+    hit = cache.lookup(question)
+    if hit.value is None:
+        value = run_pipeline(question)
+        cache.store(question, value, vector=hit.vector)
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from als_core import config
+from als_core.metrics import metrics
+
+CACHE_REQUESTS = metrics.counter("als_answer_cache_requests_total", "Semantic cache lookups by result")
+CACHE_EVICTIONS = metrics.counter("als_answer_cache_evictions_total", "Semantic cache evictions by reason")
+
+
+class CacheLookup(NamedTuple):
+    value: Optional[Any]
+    vector: np.ndarray
+    similarity: float = 0.0
+
+
+@dataclass
+class _Entry:
+    question: str
+    namespace: str
+    vector: np.ndarray
+    value: Any
+    created: float
+
+
+class SemanticCache:
+    """Thread-safe near-duplicate cache with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]],
+        threshold: float = config.CACHE_THRESHOLD,
+        max_entries: int = config.CACHE_MAX_ENTRIES,
+        ttl_s: float = config.CACHE_TTL_S,
+        version_fn: Optional[Callable[[], Any]] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.version_fn = version_fn
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        # Stacked vectors of the current entries, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+        self.hits = 0
+        self.misses = 0
+
+    # --- Helpers ---
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(question.strip()), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self._clear("invalidate")
+
+    def _clear(self, reason: str):
+        if self._entries:
+            CACHE_EVICTIONS.inc(len(self._entries), reason=reason)
+        self._entries.clear()
+        self._matrix = None
+
+    def _drop(self, entry_id: int, reason: str):
+        del self._entries[entry_id]
+        self._matrix = None
+        CACHE_EVICTIONS.inc(reason=reason)
+
+    def _expire(self, now: float):
+        expired = [i for i, e in self._entries.items() if now - e.created > self.ttl_s]
+        for entry_id in expired:
+            self._drop(entry_id, "ttl")
+
+    # --- Public API ---
+    def lookup(self, question: str, namespace: str = "") -> CacheLookup:
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            if self._entries and self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[i].vector for i in self._matrix_ids])
+
+            best_id, best_sim = None, 0.0
+            if self._matrix is not None:
+                sims = self._matrix @ vector
+                for idx in np.argsort(-sims):
+                    entry_id = self._matrix_ids[idx]
+                    if sims[idx] < self.threshold:
+                        break
+                    if self._entries[entry_id].namespace == namespace:
+                        best_id, best_sim = entry_id, float(sims[idx])
+                        break
+
+            if best_id is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(result="miss")
+                return CacheLookup(None, vector)
+
+            self._entries.move_to_end(best_id)   # most recently used
+            self.hits += 1
+            CACHE_REQUESTS.inc(result="hit")
+            return CacheLookup(self._entries[best_id].value, vector, best_sim)
+
+    def store(self, question: str, value: Any, namespace: str = "",
+              vector: Optional[np.ndarray] = None):
+        if vector is None:
+            vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            self._entries[self._next_id] = _Entry(question, namespace, vector, value, time.time())
+            self._next_id += 1
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest, "lru")
+
+    def invalidate(self):
+        """Drop every entry, e.g. after the vector store has been rebuilt."""
+        with self._lock:
+            self._clear("invalidate")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
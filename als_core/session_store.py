@@ -0,0 +1,180 @@
+"""
+Append-only conversation memory in SQLite (WAL mode).
+
+Every turn is one INSERT keyed by (session_id, seq), so appending is O(1)
+whatever the length of the conversation, and reading the history only touches
+the last few rows through the primary-key index. Writers to the same session
+are serialised by an in-process lock stripe plus an IMMEDIATE transaction (so
+several worker processes can share the file). Sessions idle for longer than the
+TTL are deleted opportunistically on append.
+
+Usage:
+    store = SessionStore(config.MEMORY_DB)
+    store.append("abc", "What is ALS?", "ALS is ...")
+    turns = store.history("abc", max_turns=6, max_tokens=600)
+    prompt_memory = format_history(turns)
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+from als_core import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    turns      INTEGER NOT NULL,
+    last_seen  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+CREATE TABLE IF NOT EXISTS turns (
+    session_id TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    user       TEXT NOT NULL,
+    bot        TEXT NOT NULL,
+    created    REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+_LOCK_STRIPES = 64
+
+
+class Turn(NamedTuple):
+    user: str
+    bot: str
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def format_history(turns: List[Turn]) -> str:
+    return "\n".join(f"User: {t.user}\nBot: {t.bot}" for t in turns)
+
+
+class SessionStore:
+    """Thread-safe session memory backed by one SQLite database file."""
+
+    def __init__(self, path: Path = config.MEMORY_DB, ttl_s: float = config.MEMORY_TTL_S,
+                 cleanup_interval_s: float = 300.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.cleanup_interval_s = cleanup_interval_s
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._last_cleanup = 0.0
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    # --- Connections (one per thread) ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        return self._stripes[hash(session_id) % _LOCK_STRIPES]
+
+    # --- Writes ---
+    def append(self, session_id: str, user: str, bot: str):
+        now = time.time()
+        conn = self._conn()
+        with self._lock(session_id):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT turns FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                seq = (row[0] if row else 0) + 1
+                conn.execute("INSERT INTO turns VALUES (?, ?, ?, ?, ?)", (session_id, seq, user, bot, now))
+                conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET turns = excluded.turns, last_seen = excluded.last_seen",
+                    (session_id, seq, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if now - self._last_cleanup > self.cleanup_interval_s:
+            self._last_cleanup = now
+            self.cleanup(now)
+
+    def delete(self, session_id: str):
+        conn = self._conn()
+        with self._lock(session_id):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Delete sessions idle for longer than the TTL; returns how many."""
+        cutoff = (now or time.time()) - self.ttl_s
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = "SELECT session_id FROM sessions WHERE last_seen < ?"
+            conn.execute(f"DELETE FROM turns WHERE session_id IN ({expired})", (cutoff,))
+            deleted = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted
+
+    def import_json(self, session_id: str, path: Path) -> int:
+        """One-time import of a legacy `<session_id>.json` memory file."""
+        turns = json.loads(Path(path).read_text(encoding="utf-8"))
+        for turn in turns:
+            self.append(session_id, turn["user"], turn["bot"])
+        Path(path).rename(Path(path).with_suffix(".json.imported"))
+        return len(turns)
+
+    # --- Reads ---
+    def history(self, session_id: str, max_turns: int = config.MEMORY_MAX_TURNS,
+                max_tokens: Optional[int] = config.MEMORY_MAX_TOKENS,
+                count_tokens: Callable[[str], int] = approx_tokens) -> List[Turn]:
+        """
+        The most recent turns, oldest first: at most `max_turns`, and only as
+        many as fit in `max_tokens` (the newest turn is always kept).
+        """
+        rows = self._conn().execute(
+            "SELECT user, bot FROM turns WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, max_turns),
+        ).fetchall()
+        turns, used = [], 0
+        for user, bot in rows:
+            cost = count_tokens(user) + count_tokens(bot)
+            if turns and max_tokens is not None and used + cost > max_tokens:
+                break
+            turns.append(Turn(user, bot))
+            used += cost
+        return turns[::-1]
+
+    def turn_count(self, session_id: str) -> int:
+        row = self._conn().execute("SELECT turns FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
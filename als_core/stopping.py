@@ -0,0 +1,74 @@
+"""
+Custom stopping criteria evaluated by `model.generate` between decoding steps.
+"""
+from typing import List, Optional, Sequence
+
+import threading
+
+import torch
+from transformers import StoppingCriteria
+
+from als_core.inference_executor import current_cancel_event
+from als_core.metrics import metrics
+from als_core.output_limits import OutputLimits
+
+EARLY_STOPS = metrics.counter("als_generation_early_stops_total", "Generations halted by an output limit, by limit")
+TOKENS_SAVED = metrics.counter(
+    "als_generation_tokens_saved_total",
+    "Decoding steps left unused (max_new_tokens minus tokens generated) when an output limit halted generation",
+)
+
+
+class CancellationCriteria(StoppingCriteria):
+    """
+    Stops generation as soon as the request being served has been cancelled
+    (client disconnected or timed out), so abandoned requests free the CPU.
+
+    Without explicit events it checks the request running in the calling
+    thread. A batched generate passes one event per row instead.
+    """
+
+    def __init__(self, cancel_events: Optional[List[Optional[threading.Event]]] = None):
+        self.cancel_events = cancel_events
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        events = self.cancel_events
+        if events is None:
+            events = [current_cancel_event()] * input_ids.shape[0]
+        flags = [event is not None and event.is_set() for event in events]
+        return torch.tensor(flags, dtype=torch.bool, device=input_ids.device)
+
+
+class OutputLimitCriteria(StoppingCriteria):
+    """
+    Stops each row of a (batched) generate as soon as its completion reaches
+    its OutputLimits (None: no limit for that row). `prompt_length` is the
+    padded prompt width, where the completions start.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, limits: Sequence[Optional[OutputLimits]]):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.limits = list(limits)
+        self.reasons: List[Optional[str]] = [None] * len(self.limits)
+        self.generated: List[int] = [0] * len(self.limits)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        completions = input_ids[:, self.prompt_length:]
+        for row, limits in enumerate(self.limits):
+            if limits is None or self.reasons[row] is not None:
+                continue
+            text = self.tokenizer.decode(completions[row], skip_special_tokens=True)
+            self.reasons[row] = limits.reached(text)
+            self.generated[row] = completions.shape[1]
+        flags = [reason is not None for reason in self.reasons]
+        return torch.tensor(flags, dtype=torch.bool, device=input_ids.device)
+
+    def record(self, max_new_tokens: Optional[int]):
+        """Count the rows that stopped early and the decoding steps they skipped."""
+        for reason, generated in zip(self.reasons, self.generated):
+            if reason is None:
+                continue
+            EARLY_STOPS.inc(limit=reason)
+            if max_new_tokens:
+                TOKENS_SAVED.inc(max(max_new_tokens - generated, 0), limit=reason)
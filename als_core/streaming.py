@@ -0,0 +1,204 @@
+"""
+Token streaming for TinyLlama answers.
+
+`stream_generate` submits the prompt to the shared micro-batcher with a
+transformers TextIteratorStreamer and yields text pieces as they are decoded,
+so streamed answers take turns on the weights with every other generation.
+`sse_events` turns those pieces into Server-Sent Events for FastAPI's
+StreamingResponse and records time-to-first-token.
+
+`StreamSlot` bounds how many streams may be open at once (ALS_INFERENCE_WORKERS
++ ALS_INFERENCE_QUEUE_DEPTH, as for the inference executor); beyond that the
+endpoint answers 503 + Retry-After before doing any work.
+
+Usage:
+    slot = StreamSlot()     # raises InferenceOverloaded when all slots are taken
+    pieces = slot.guard(stream_generate(prompt, max_new_tokens=280, stop=["<|user|>"]))
+    return StreamingResponse(sse_events(pieces, started), media_type="text/event-stream")
+"""
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from als_core import config
+from als_core.inference_executor import InferenceOverloaded
+from als_core.metrics import metrics
+from als_core.model_registry import registry
+
+GENERATION_TTFT = metrics.histogram(
+    "als_generation_ttft_seconds", "Time from generate() start to the first decoded token"
+)
+REQUEST_TTFT = metrics.histogram(
+    "als_request_ttft_seconds", "Time from request arrival to the first streamed token (retrieval included)"
+)
+STREAM_DURATION = metrics.histogram("als_stream_duration_seconds", "Total duration of a streamed answer")
+STREAMS_REJECTED = metrics.counter("als_streams_rejected_total", "Streams refused with 503 (all slots taken)")
+
+_STREAM_SLOTS = threading.BoundedSemaphore(config.INFERENCE_WORKERS + config.INFERENCE_QUEUE_DEPTH)
+
+
+class StreamSlot:
+    """One of the bounded streaming slots, held until the stream is finished or dropped."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held = _STREAM_SLOTS.acquire(blocking=False)
+        if not self._held:
+            STREAMS_REJECTED.inc()
+            raise InferenceOverloaded(config.RETRY_AFTER_S)
+
+    def release(self):
+        with self._lock:
+            if self._held:
+                self._held = False
+                _STREAM_SLOTS.release()
+
+    def guard(self, pieces: Iterator[str]) -> "_Guarded":
+        return _Guarded(pieces, self)
+
+    def __del__(self):
+        self.release()     # response never iterated (client gone before the body)
+
+
+class _Guarded:
+    """Iterator releasing its slot when exhausted, closed or garbage-collected."""
+
+    def __init__(self, pieces: Iterator[str], slot: StreamSlot):
+        self._pieces = pieces
+        self._slot = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._pieces)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        close = getattr(self._pieces, "close", None)
+        try:
+            if callable(close):
+                close()
+        finally:
+            self._slot.release()
+
+
+_PIPELINE_ONLY_KWARGS = {"return_full_text", "handle_long_generation", "clean_up_tokenization_spaces"}
+
+
+def _hold_back(text: str, stops: List[str]) -> int:
+    """Length of the tail of `text` that could still grow into a stop sequence."""
+    longest = 0
+    for stop in stops:
+        for n in range(min(len(stop) - 1, len(text)), 0, -1):
+            if stop.startswith(text[-n:]):
+                longest = max(longest, n)
+                break
+    return longest
+
+
+def stream_generate(prompt: str, model_id: str = config.CHAT_MODEL_ID,
+                    stop: Optional[List[str]] = None, **gen_kwargs) -> Iterator[str]:
+    """
+    Yield the completion of `prompt` piece by piece. Generation stops at the
+    first stop sequence, when `output_limits` (gen kwarg) is reached, or as
+    soon as the consumer stops iterating.
+    """
+    if config.MODEL_SERVER:
+        yield from _stream_remote(prompt, model_id, stop, **gen_kwargs)
+        return
+
+    from transformers import TextIteratorStreamer
+
+    batcher = registry.batcher(model_id)
+    cancel = threading.Event()
+
+    limits = gen_kwargs.get("output_limits")
+    stops = list(stop or []) + [s for s in (limits.stop if limits else ()) if s not in (stop or [])]
+    streamer = TextIteratorStreamer(batcher.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    # The batcher applies the output limits while decoding and the prefix cache
+    started = time.perf_counter()
+    future = batcher.submit(prompt, streamer=streamer, cancel_event=cancel, **gen_kwargs)
+
+    pending = ""
+    emitted = ""
+    first = True
+    try:
+        for piece in streamer:
+            if first and piece:
+                GENERATION_TTFT.observe(time.perf_counter() - started)
+                first = False
+            pending += piece
+            hits = [pending.find(s) for s in stops if s in pending]
+            if hits:
+                head = pending[:min(hits)]
+                if head:
+                    yield head
+                return
+            keep = _hold_back(pending, stops)
+            ready, pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+            if ready and limits is not None and limits.reached(emitted + ready):
+                # The last token may run past the limit: emit only up to it
+                tail = limits.apply(emitted + ready)[len(emitted):]
+                if tail:
+                    yield tail
+                return
+            if ready:
+                emitted += ready
+                yield ready
+        if future.exception() is not None:
+            raise future.exception()
+        if pending:
+            yield limits.apply(emitted + pending)[len(emitted):] if limits is not None else pending
+    finally:
+        # Consumer finished, hit a stop sequence or went away: stop decoding
+        cancel.set()
+        STREAM_DURATION.observe(time.perf_counter() - started)
+
+
+def _stream_remote(prompt: str, model_id: str, stop: Optional[List[str]], **gen_kwargs) -> Iterator[str]:
+    """Same pieces, decoded by the model server (which applies the stop sequences)."""
+    gen_kwargs = {k: v for k, v in gen_kwargs.items() if k not in _PIPELINE_ONLY_KWARGS}
+    started = time.perf_counter()
+    first = True
+    try:
+        for piece in registry.model_client().stream(prompt, model_id, stop=stop, **gen_kwargs):
+            if first and piece:
+                GENERATION_TTFT.observe(time.perf_counter() - started)
+                first = False
+            yield piece
+    finally:
+        STREAM_DURATION.observe(time.perf_counter() - started)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_events(pieces: Iterator[str], request_started: float,
+               done: Optional[Callable[[str], Dict[str, Any]]] = None) -> Iterator[str]:
+    """
+    Format streamed pieces as `token` events followed by a final `done` event.
+    `done(answer)` may add extra fields (e.g. retrieved contexts) to it.
+    """
+    answer = ""
+    first = True
+    try:
+        for piece in pieces:
+            if first:
+                REQUEST_TTFT.observe(time.perf_counter() - request_started)
+                first = False
+            answer += piece
+            yield sse_event("token", {"text": piece})
+    except Exception as exc:
+        yield sse_event("error", {"detail": str(exc)})
+        return
+    payload = {"answer": answer.strip()}
+    if done is not None:
+        payload.update(done(answer))
+    yield sse_event("done", payload)
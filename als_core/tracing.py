@@ -0,0 +1,220 @@
+"""
+Lightweight per-request stage timing.
+
+Pipeline code wraps its stages in `span(...)` (or graph nodes in `@traced`).
+Every span feeds the process-wide metrics (`/metrics`): its duration, and the
+`docs` / `prompt_tokens` / `generated_tokens` attributes when set. While a
+trace is active (see `start_trace`, or `TracingMiddleware` for whole HTTP
+requests) the span is also recorded on it, and with ALS_TRACE_LOG=1 the
+finished trace is logged as one JSON line keyed by its request ID.
+
+Usage:
+    with start_trace() as trace:
+        with span("retrieval") as attrs:
+            docs = retriever.invoke(question)
+            attrs["docs"] = len(docs)
+    print(trace.durations())    # {"retrieval": 0.012}
+"""
+import contextvars
+import functools
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from als_core import config
+from als_core.metrics import metrics
+
+# Canonical stage names shared by the three pipelines
+EMBEDDING = "embedding"
+RETRIEVAL = "retrieval"            # embedding + vector search
+PROMPT_BUILD = "prompt_build"
+GENERATION = "generation"
+POST_PROCESSING = "post_processing"
+NODE = "node"                      # a whole LangGraph node (see `traced`)
+
+# Span attributes that become metric labels
+_LABEL_ATTRS = ("node", "step")
+
+STAGE_DURATION = metrics.histogram("als_stage_duration_seconds", "Duration of pipeline stages and graph nodes")
+TOKENS = metrics.counter("als_tokens_total", "Prompt and generated tokens by stage")
+RETRIEVED_DOCS = metrics.histogram(
+    "als_retrieved_docs", "Documents returned per retrieval", buckets=(0, 1, 2, 3, 4, 5, 8, 10, 20)
+)
+REQUEST_DURATION = metrics.histogram("als_request_duration_seconds", "HTTP request duration by route template")
+
+logger = logging.getLogger("als.trace")
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    child_time: float = 0.0     # time spent in spans nested inside this one
+
+    @property
+    def self_time(self) -> float:
+        return self.duration - self.child_time
+
+
+@dataclass
+class Trace:
+    request_id: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+
+    def durations(self, exclusive: bool = True) -> Dict[str, float]:
+        """
+        Total seconds per span name (a stage may run several times). With
+        `exclusive`, time spent in nested spans is only counted for the child.
+        """
+        totals: Dict[str, float] = {}
+        for s in self.spans:
+            totals[s.name] = totals.get(s.name, 0.0) + (s.self_time if exclusive else s.duration)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "spans": [
+                {"name": s.name, "offset_ms": round((s.start - self.started) * 1000, 2),
+                 "ms": round(s.duration * 1000, 2), **s.attrs}
+                for s in sorted(self.spans, key=lambda s: s.start)
+            ],
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "als_trace", default=None
+)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "als_span", default=None
+)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def start_trace(request_id: Optional[str] = None) -> Iterator[Trace]:
+    trace = Trace(request_id or uuid.uuid4().hex[:16])
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def _record(current: Span):
+    labels = {"stage": current.name}
+    labels.update({k: current.attrs[k] for k in _LABEL_ATTRS if k in current.attrs})
+    STAGE_DURATION.observe(current.duration, **labels)
+    for kind in ("prompt", "generated"):
+        n = current.attrs.get(f"{kind}_tokens")
+        if n:
+            TOKENS.inc(n, kind=kind, **labels)
+    if "docs" in current.attrs:
+        RETRIEVED_DOCS.observe(current.attrs["docs"], **labels)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block. The yielded dict can be filled with attributes (doc counts,
+    token counts, ...) that are stored on the span.
+    """
+    current = Span(name, time.perf_counter(), attrs=attrs)
+    parent = _current_span.get()
+    token = _current_span.set(current)
+    try:
+        yield attrs
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        if parent is not None:
+            parent.child_time += current.duration
+        _record(current)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(current)
+
+
+def traced(node: str) -> Callable:
+    """Decorator: run a LangGraph node (or any step) inside a `node` span."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(NODE, node=node):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def log_trace(trace: Trace, **fields):
+    """Emit the trace as one structured JSON log line (when ALS_TRACE_LOG=1)."""
+    if config.TRACE_LOG:
+        logger.info(json.dumps({**trace.to_dict(), **fields}, default=str))
+
+
+# --- ASGI middleware ---
+def _route_template(scope) -> str:
+    """Matched route (e.g. "/items/{id}"), so probes and path params don't add series."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class TracingMiddleware:
+    """
+    Give every HTTP request a trace and a request ID (taken from the
+    X-Request-ID header or generated), echo the ID in the response headers,
+    record the request duration, and log the trace once the response body
+    (including a streamed one) has been sent.
+
+    Usage:
+        app.add_middleware(TracingMiddleware)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if config.TRACE_LOG and not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or None
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", trace.request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        with start_trace(request_id) as trace:
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                duration = time.perf_counter() - trace.started
+                REQUEST_DURATION.observe(duration, path=_route_template(scope))
+                log_trace(trace, method=scope.get("method"), path=scope.get("path"),
+                          status=status["code"], ms=round(duration * 1000, 2))
@@ -0,0 +1,283 @@
+"""
+Read-only, memory-mapped snapshot of the vector store for fast worker start.
+
+Opening Chroma's SQLite store and hydrating its index costs every cold
+worker time and private memory, although the corpus is small and never
+changes between ingestions. `export_snapshot` writes the collection once as
+
+    <version>.embeddings.npy   float32 (n, dim), L2-normalised rows, contiguous
+    <version>.offsets.npy      int64 (n + 1) byte offsets into texts.bin
+    <version>.texts.bin        UTF-8 chunk texts, concatenated
+    <version>.meta.json        chunk IDs and metadata
+    manifest.json              the current version (written last)
+
+into `<persist_dir>/snapshot_<collection>/`. `VectorSnapshot.load` maps the
+matrix with np.load(mmap_mode="r"): loading takes milliseconds, and every
+worker on the host shares the same page-cache pages instead of a private
+copy. Search is a brute-force dot product (cosine, as the MiniLM embeddings
+are normalised) with Chroma-style `where` filters, so `SnapshotVectorStore`
+is a drop-in for the Chroma vector store (ALS_VECTOR_BACKEND=snapshot).
+
+RAG/rag_setup.py re-exports after every ingestion; a running worker picks up
+the new version on its next search. To export an existing store:
+
+    python -m als_core.vector_snapshot
+    python -m als_core.vector_snapshot --persist-dir RAG/chroma_db --collection langchain
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from als_core import config
+
+MANIFEST = "manifest.json"
+
+
+def snapshot_dir(collection_name: str = config.COLLECTION_NAME, persist_dir: Path = config.CHROMA_DIR) -> Path:
+    return Path(persist_dir).resolve() / f"snapshot_{collection_name}"
+
+
+# --- Export ---
+def export_snapshot(collection, directory: Path, batch_size: int = 1000) -> Dict[str, Any]:
+    """Write every chunk of a Chroma collection as a new snapshot version; returns the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{uuid.uuid4().hex[:8]}"   # unique per export
+    total = collection.count()
+
+    ids: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    offsets = [0]
+    matrix = None
+    with open(directory / f"{version}.texts.bin", "wb") as texts:
+        for offset in range(0, total, batch_size):
+            rows = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            vectors = np.asarray(rows["embeddings"], dtype=np.float32)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    directory / f"{version}.embeddings.npy", mode="w+", dtype=np.float32,
+                    shape=(total, vectors.shape[1]),
+                )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            matrix[len(ids):len(ids) + len(vectors)] = vectors / np.maximum(norms, 1e-12)
+            for text in rows["documents"]:
+                data = (text or "").encode("utf-8")
+                texts.write(data)
+                offsets.append(offsets[-1] + len(data))
+            ids.extend(rows["ids"])
+            metadatas.extend(meta or {} for meta in rows["metadatas"])
+    if matrix is None:     # empty collection (zero-size files can't be mapped)
+        np.save(directory / f"{version}.embeddings.npy", np.zeros((0, 0), dtype=np.float32))
+        dim = 0
+    else:
+        dim = matrix.shape[1]
+        matrix.flush()
+        del matrix
+
+    np.save(directory / f"{version}.offsets.npy", np.asarray(offsets, dtype=np.int64))
+    (directory / f"{version}.meta.json").write_text(
+        json.dumps({"ids": ids, "metadatas": metadatas}), encoding="utf-8"
+    )
+    manifest = {"version": version, "count": len(ids), "dim": dim}
+    tmp = directory / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, directory / MANIFEST)   # readers switch to the complete new version
+
+    # Older versions: workers that still map them keep their pages (POSIX)
+    for path in directory.iterdir():
+        if path.name != MANIFEST and not path.name.startswith(version):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    return manifest
+
+
+# --- Load / search ---
+class _Version(NamedTuple):
+    name: str
+    embeddings: np.ndarray              # (n, dim) float32, memory-mapped
+    offsets: np.ndarray                 # (n + 1,) int64
+    texts: np.ndarray                   # uint8, memory-mapped
+    ids: List[str]
+    metadatas: List[Dict[str, Any]]
+    columns: Dict[str, np.ndarray]      # metadata field -> values, built on first filter
+
+
+class VectorSnapshot:
+    """Memory-mapped chunk embeddings, texts and metadata; follows re-exports."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._mtime = 0
+        self._lock = threading.Lock()
+        self._version: Optional[_Version] = None
+        self.refresh()
+
+    @classmethod
+    def load(cls, directory: Path) -> "VectorSnapshot":
+        return cls(directory)
+
+    def __len__(self) -> int:
+        return len(self._version.ids)
+
+    @property
+    def version(self) -> str:
+        return self._version.name
+
+    @property
+    def ids(self) -> List[str]:
+        return self._version.ids
+
+    @property
+    def metadatas(self) -> List[Dict[str, Any]]:
+        return self._version.metadatas
+
+    def refresh(self):
+        """Switch to a newer version if the snapshot was re-exported."""
+        manifest_path = self.directory / MANIFEST
+        mtime = manifest_path.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            prefix = self.directory / manifest["version"]
+            offsets = np.load(f"{prefix}.offsets.npy")
+            meta = json.loads(Path(f"{prefix}.meta.json").read_text(encoding="utf-8"))
+            texts = (np.memmap(f"{prefix}.texts.bin", dtype=np.uint8, mode="r")
+                     if offsets[-1] else np.zeros(0, dtype=np.uint8))
+            # Searches keep using the version they started with
+            embeddings = np.load(f"{prefix}.embeddings.npy", mmap_mode="r" if manifest["count"] else None)
+            self._version = _Version(
+                manifest["version"], embeddings, offsets, texts, meta["ids"], meta["metadatas"], {},
+            )
+            self._mtime = mtime
+
+    def texts(self) -> List[str]:
+        version = self._version
+        return [self._document(version, row).page_content for row in range(len(version.ids))]
+
+    @staticmethod
+    def _document(version: _Version, row: int) -> Document:
+        text = bytes(version.texts[version.offsets[row]:version.offsets[row + 1]]).decode("utf-8")
+        return Document(page_content=text, metadata=dict(version.metadatas[row]), id=version.ids[row])
+
+    # --- Filters (the subset of Chroma's `where` that build_filter produces) ---
+    @staticmethod
+    def _column(version: _Version, name: str) -> np.ndarray:
+        column = version.columns.get(name)
+        if column is None:
+            column = np.empty(len(version.metadatas), dtype=object)
+            column[:] = [meta.get(name) for meta in version.metadatas]
+            version.columns[name] = column
+        return column
+
+    def _mask(self, version: _Version, where: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a Chroma `where` clause ($and, $or, $in, $nin, $eq, $ne)."""
+        masks = []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self._mask(version, clause) for clause in condition]
+                masks.append(np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts))
+                continue
+            column = self._column(version, key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$in":
+                    masks.append(np.isin(column, list(value)))
+                elif op == "$nin":
+                    masks.append(~np.isin(column, list(value)))
+                elif op == "$eq":
+                    masks.append(column == value)
+                elif op == "$ne":
+                    masks.append(column != value)
+                else:
+                    raise ValueError(f"Unsupported filter operator for the vector snapshot: {op}")
+        return np.logical_and.reduce(masks) if masks else np.ones(len(version.ids), dtype=bool)
+
+    def search(self, vector: Iterable[float], k: int = 4,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """The `k` chunks closest to `vector` with their cosine similarity, best first."""
+        self.refresh()
+        version = self._version
+        if not version.ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = version.embeddings @ query
+        if where:
+            allowed = self._mask(version, where)
+            scores = np.where(allowed, scores, -np.inf)
+            k = min(k, int(allowed.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._document(version, int(row)), float(scores[row])) for row in top]
+
+
+class SnapshotVectorStore(VectorStore):
+    """LangChain vector store over a VectorSnapshot (read-only)."""
+
+    def __init__(self, snapshot: VectorSnapshot, embedding: Embeddings):
+        self.snapshot = snapshot
+        self.embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.snapshot.search(embedding, k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Scores are cosine similarities (higher is closer), unlike Chroma's distances."""
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4,
+                          filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "SnapshotVectorStore":
+        raise NotImplementedError("Snapshots are exported from the Chroma store (see export_snapshot)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the Chroma collection as a memory-mapped snapshot.")
+    parser.add_argument("--persist-dir", type=Path, default=config.CHROMA_DIR)
+    parser.add_argument("--collection", default=config.COLLECTION_NAME)
+    args = parser.parse_args()
+
+    from als_core.model_registry import registry
+    out = snapshot_dir(args.collection, args.persist_dir)
+    started = time.perf_counter()
+    manifest = export_snapshot(registry.collection(args.collection, args.persist_dir), out)
+    print(f"Snapshot {manifest['version']} ({manifest['count']} chunks, dim {manifest['dim']}) "
+          f"written to {out} in {time.perf_counter() - started:.2f}s")
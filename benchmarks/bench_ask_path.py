@@ -0,0 +1,102 @@
+"""
+Latency saved on RAG/main.py's /ask path by passing precomputed contexts.
+
+Compares, on the same models and questions:
+    legacy       what /ask used to do: similarity_search in main.py, then the
+                 graph's retrieve node re-retrieved through RetrievalQA
+                 (a full distilgpt2 generation) and threw main.py's context away,
+                 then answer + empathy on TinyLlama
+    precomputed  similarity_search in main.py, then the graph starts at the
+                 answer node (route_start skips retrieval when context is set)
+
+Reports per-stage percentiles, query embeddings and LLM calls per request, and
+the p50/p95 latency saved. Stub models by default; `--local` for real ones.
+
+    python benchmarks/bench_ask_path.py --repeat 3 --out ask_path.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_pipelines import ROOT, _install_stubs, _peak_rss_mb, measure, summarize  # noqa: E402
+
+sys.path.insert(0, str(ROOT / "RAG"))
+
+TOP_K = 3   # UserQuery.top_k default
+
+
+def build_variants():
+    from als_core.model_registry import registry
+    from als_core.tracing import RETRIEVAL, span, traced
+    import langgraph_chatbot as chatbot
+
+    def main_retrieve(question: str) -> str:
+        # RAG/main.py::retrieve
+        with span(RETRIEVAL):
+            docs = registry.vectorstore().similarity_search(question, k=TOP_K)
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    def precomputed(question: str) -> str:
+        state = {"user_input": question, "context": main_retrieve(question), "bot_output": ""}
+        return chatbot.app.invoke(state)["bot_output"]
+
+    @traced("retrieve")
+    def legacy_retrieve_state(state):
+        from langchain.chains import RetrievalQA
+        qa = registry.get_or_create("bench_legacy_qa", lambda: RetrievalQA.from_chain_type(
+            llm=registry.hf_llm("distilgpt2", temperature=0.4, max_length=512),
+            retriever=registry.vectorstore().as_retriever(),
+            chain_type="stuff",
+            return_source_documents=True,
+        ))
+        with span(RETRIEVAL):
+            state["context"] = qa.invoke({"query": state["user_input"]})["result"]
+        return state
+
+    def legacy(question: str) -> str:
+        main_retrieve(question)   # computed by main.py, then discarded by the graph
+        state = {"user_input": question, "context": "", "bot_output": ""}
+        for node in (legacy_retrieve_state, chatbot.answer_state, chatbot.empathy_state):
+            state = node(state)
+        return state["bot_output"]
+
+    return {"legacy": legacy, "precomputed": precomputed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /ask path with and without precomputed contexts.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--local", action="store_true", help="use the real local models and Chroma store")
+    parser.add_argument("--decode-ms", type=float, default=1.0, help="stub LLM latency per new token")
+    parser.add_argument("--embed-ms", type=float, default=2.0, help="stub embedder latency per query")
+    parser.add_argument("--out", type=Path, default=Path("bench_ask_path.json"))
+    args = parser.parse_args()
+
+    _install_stubs(args.decode_ms, args.embed_ms, args.local)
+    report = {"meta": {"mode": "local" if args.local else "stub", "repeat": args.repeat}, "variants": {}}
+    for name, ask in build_variants().items():
+        started = time.perf_counter()
+        requests = measure(ask, args.repeat, args.warmup)
+        report["variants"][name] = summarize(
+            {"requests": requests, "import_s": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+        )
+
+    before, after = (report["variants"][v]["stages"]["total"] for v in ("legacy", "precomputed"))
+    report["saved"] = {
+        "p50_ms": round(before["p50_ms"] - after["p50_ms"], 2),
+        "p95_ms": round(before["p95_ms"] - after["p95_ms"], 2),
+        "p50_pct": round(100 * (1 - after["p50_ms"] / before["p50_ms"]), 1) if before["p50_ms"] else 0.0,
+    }
+
+    for name, result in report["variants"].items():
+        total = result["stages"]["total"]
+        print(f"{name:<12} p50={total['p50_ms']}ms p95={total['p95_ms']}ms  per request: {result['per_request']}")
+    print(f"saved        p50={report['saved']['p50_ms']}ms ({report['saved']['p50_pct']}%) "
+          f"p95={report['saved']['p95_ms']}ms")
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
@@ -0,0 +1,144 @@
+"""
+Compare the TinyLlama inference backends (fp32, bf16, int8) on CPU.
+
+Each backend runs in a fresh subprocess (so peak RSS is its own) and reports
+    load_s             loading (and quantizing) the model
+    model_mb           parameter memory, packed int8 weights included
+    tokens_per_s       greedy decoding throughput over the prompt set
+    peak_rss_mb
+and, against the fp32 run,
+    exact_match        fraction of answers identical to fp32
+    token_agreement    mean length of the common token prefix / fp32 length
+
+Greedy decoding makes the runs deterministic, so any difference comes from
+the backend's numerics.
+
+    python benchmarks/bench_backends.py --out backends.json
+    python benchmarks/bench_backends.py --backends fp32 int8 --threads 4 --max-new-tokens 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_pipelines import ROOT, _git_commit, _peak_rss_mb  # noqa: E402
+
+sys.path.insert(0, str(ROOT))
+from als_core import config  # noqa: E402
+from als_core.inference_backend import BACKENDS  # noqa: E402
+
+CONTEXT = (
+    "Amyotrophic lateral sclerosis (ALS) is a progressive disease of the motor neurons. Early symptoms "
+    "include muscle twitching, cramps, weakness in a hand or leg and slurred speech. Riluzole and "
+    "edaravone are approved treatments that can modestly slow progression."
+)
+QUESTIONS = [
+    "What are the early symptoms of ALS?",
+    "Which drugs are approved for ALS?",
+    "Is ALS hereditary?",
+    "How is ALS diagnosed?",
+    "How can caregivers get support?",
+]
+
+
+def _prompt(tokenizer, question: str) -> str:
+    messages = [
+        {"role": "system", "content": "You are an empathetic medical assistant specializing in ALS. "
+                                      "Answer clearly and concisely (3-5 sentences)."},
+        {"role": "user", "content": f"Context:\n{CONTEXT}\n\nQuestion: {question}"},
+    ]
+    if getattr(tokenizer, "chat_template", None):
+        return tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    return "\n".join(m["content"] for m in messages) + "\nAnswer:"
+
+
+def run_worker(backend: str, model_id: str, max_new_tokens: int) -> dict:
+    import torch
+    from transformers import AutoTokenizer
+    from als_core.inference_backend import configure_threads, load_model, model_size_mb
+
+    configure_threads()
+    started = time.perf_counter()
+    model, used = load_model(model_id, "text-generation", backend=backend, device=-1)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    result = {"backend": used, "load_s": time.perf_counter() - started,
+              "model_mb": model_size_mb(model), "threads": torch.get_num_threads()}
+
+    answers, generated, decode_s = [], 0, 0.0
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    for question in QUESTIONS:
+        encoded = tokenizer(_prompt(tokenizer, question), return_tensors="pt")
+        started = time.perf_counter()
+        with torch.inference_mode():
+            output = model.generate(**encoded, max_new_tokens=max_new_tokens, do_sample=False,
+                                    pad_token_id=pad_token_id)
+        decode_s += time.perf_counter() - started
+        new_tokens = output[0, encoded["input_ids"].shape[1]:].tolist()
+        generated += len(new_tokens)
+        answers.append({"tokens": new_tokens, "text": tokenizer.decode(new_tokens, skip_special_tokens=True)})
+
+    result.update(tokens_per_s=generated / decode_s, generated_tokens=generated,
+                  peak_rss_mb=_peak_rss_mb(), answers=answers)
+    return result
+
+
+def parity(answers, baseline) -> dict:
+    exact, agreement = 0, []
+    for ours, ref in zip(answers, baseline):
+        exact += ours["tokens"] == ref["tokens"]
+        common = 0
+        for a, b in zip(ours["tokens"], ref["tokens"]):
+            if a != b:
+                break
+            common += 1
+        agreement.append(common / max(len(ref["tokens"]), 1))
+    return {"exact_match": exact / len(baseline), "token_agreement": sum(agreement) / len(agreement)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fp32 / bf16 / int8 TinyLlama backends.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--model", default=config.CHAT_MODEL_ID)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=config.TORCH_THREADS, help="torch threads (0 = default)")
+    parser.add_argument("--out", type=Path, default=Path("bench_backends.json"))
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print("\n@@RESULT@@" + json.dumps(run_worker(args.worker, args.model, args.max_new_tokens)))
+        sys.exit(0)
+
+    # fp32 always runs first: it is the parity baseline
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+    env = {**os.environ, "ALS_TORCH_THREADS": str(args.threads)}
+    report = {"meta": {"commit": _git_commit(), "model": args.model, "max_new_tokens": args.max_new_tokens,
+                       "questions": len(QUESTIONS)}, "backends": {}}
+    baseline = None
+    for backend in backends:
+        cmd = [sys.executable, __file__, "--worker", backend, "--model", args.model,
+               "--max-new-tokens", str(args.max_new_tokens)]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, env=env)
+        if proc.returncode != 0 or "@@RESULT@@" not in proc.stdout:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            report["backends"][backend] = {"error": f"worker exited with {proc.returncode}"}
+            continue
+        result = json.loads(proc.stdout.rsplit("@@RESULT@@", 1)[1])
+        answers = result.pop("answers")
+        if backend == "fp32":
+            baseline = answers
+        if baseline is not None:
+            result.update(parity(answers, baseline))
+        result["sample_answer"] = answers[0]["text"]
+        report["backends"][backend] = {
+            k: round(v, 3) if isinstance(v, float) else v for k, v in sorted(result.items())
+        }
+        print(f"{backend:<5} " + ", ".join(
+            f"{k}={v}" for k, v in report["backends"][backend].items() if k != "sample_answer"))
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
@@ -0,0 +1,174 @@
+"""
+Throughput and memory of N API workers: in-process models vs. one model server.
+
+For every worker count N, two modes are run:
+    local     each worker loads TinyLlama itself (uvicorn --workers N today)
+    server    one als_core.model_server process holds the model and the
+              workers talk to it over a Unix socket (ALS_MODEL_SERVER)
+
+Each worker is a separate process. Once all of them are ready (models loaded,
+server reachable), they start together and each sends --requests greedy
+generations one after another. The benchmark reports
+    requests_per_s     all requests / wall time
+    p50_ms, p95_ms     per-request latency
+    worker_rss_mb      mean peak RSS of one worker
+    server_rss_mb      peak RSS of the model server (server mode)
+    total_rss_mb       workers + server: what the host pays for N workers
+
+    python benchmarks/bench_model_server.py --workers 1 2 4 --out model_server.json
+    python benchmarks/bench_model_server.py --model /path/to/checkpoint --modes server --requests 20
+"""
+import argparse
+import json
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_backends import QUESTIONS, _prompt  # noqa: E402
+from bench_pipelines import ROOT, _git_commit, _peak_rss_mb  # noqa: E402
+
+sys.path.insert(0, str(ROOT))
+from als_core import config  # noqa: E402
+
+MODES = ("local", "server")
+
+
+def _process_peak_rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import psutil
+    return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+
+
+def run_worker(requests: int, max_new_tokens: int) -> dict:
+    from als_core.model_registry import registry
+
+    registry.warm_up(["llm"])
+    llm = registry.hf_llm(max_new_tokens=max_new_tokens, do_sample=False)
+    tokenizer = registry.tokenizer()
+    prompts = [_prompt(tokenizer, QUESTIONS[i % len(QUESTIONS)]) for i in range(requests)]
+    llm.invoke(prompts[0])      # first call outside the timing (batcher thread, connection)
+
+    print("@@READY@@", flush=True)
+    sys.stdin.readline()        # start signal
+
+    latencies = []
+    started = time.time()
+    for prompt in prompts:
+        begin = time.perf_counter()
+        llm.invoke(prompt)
+        latencies.append(time.perf_counter() - begin)
+    return {"started": started, "finished": time.time(), "latencies": latencies, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _start_server(address: str, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "als_core.model_server", "--address", address, "--warm-up", "llm"]
+    server = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    from als_core.model_server import ModelClient
+    client = ModelClient(address, env["ALS_MODEL_SERVER_AUTHKEY"].encode())
+    deadline = time.monotonic() + config.MODEL_SERVER_TIMEOUT_S
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError(f"model server exited with {server.returncode}:\n{server.stderr.read()[-2000:]}")
+        try:
+            client.call("ping")     # answers once the model is loaded
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError(f"model server not ready after {config.MODEL_SERVER_TIMEOUT_S:.0f}s")
+            time.sleep(0.2)
+    client.close()
+    return server
+
+
+def run(mode: str, n_workers: int, requests: int, max_new_tokens: int, env: dict) -> dict:
+    server = None
+    env = dict(env)
+    if mode == "server":
+        address = os.path.join(tempfile.mkdtemp(prefix="als-bench-"), "models.sock")
+        server = _start_server(address, env)
+        env["ALS_MODEL_SERVER"] = address
+
+    cmd = [sys.executable, __file__, "--worker", "--requests", str(requests),
+           "--max-new-tokens", str(max_new_tokens)]
+    workers = [subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, text=True) for _ in range(n_workers)]
+    try:
+        for worker in workers:
+            line = worker.stdout.readline()
+            while line and "@@READY@@" not in line:
+                line = worker.stdout.readline()
+            if not line:
+                raise RuntimeError(f"worker exited before start:\n{worker.stderr.read()[-2000:]}")
+        for worker in workers:
+            worker.stdin.write("go\n")
+            worker.stdin.flush()
+
+        results = []
+        for worker in workers:
+            out, err = worker.communicate()
+            if worker.returncode != 0 or "@@RESULT@@" not in out:
+                raise RuntimeError(f"worker exited with {worker.returncode}:\n{err[-2000:]}")
+            results.append(json.loads(out.rsplit("@@RESULT@@", 1)[1]))
+        server_rss = _process_peak_rss_mb(server.pid) if server is not None else 0.0
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    wall_s = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    worker_rss = statistics.mean(r["peak_rss_mb"] for r in results)
+    return {
+        "requests_per_s": len(latencies) / wall_s,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        "worker_rss_mb": worker_rss,
+        "server_rss_mb": server_rss,
+        "total_rss_mb": worker_rss * n_workers + server_rss,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker scaling: in-process models vs. a shared model server.")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--model", default=config.CHAT_MODEL_ID)
+    parser.add_argument("--requests", type=int, default=10, help="generations per worker")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--out", type=Path, default=Path("bench_model_server.json"))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print("\n@@RESULT@@" + json.dumps(run_worker(args.requests, args.max_new_tokens)))
+        sys.exit(0)
+
+    env = {**os.environ, "ALS_CHAT_MODEL_ID": args.model, "ALS_MODEL_SERVER": "",
+           "ALS_MODEL_SERVER_AUTHKEY": secrets.token_hex(32)}
+    report = {"meta": {"commit": _git_commit(), "model": args.model, "requests": args.requests,
+                       "max_new_tokens": args.max_new_tokens}, "runs": {}}
+    for mode in args.modes:
+        for n_workers in args.workers:
+            result = run(mode, n_workers, args.requests, args.max_new_tokens, env)
+            result = {k: round(v, 2) for k, v in result.items()}
+            report["runs"][f"{mode}:{n_workers}"] = result
+            print(f"{mode:<6} workers={n_workers:<2} " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
@@ -0,0 +1,375 @@
+"""
+End-to-end latency benchmark for the three RAG pipelines.
+
+Replays a fixed question set through
+    rag       RAG/langgraph_chatbot.py      retrieve -> answer -> empathy (LangGraph)
+    lcel      RAG_LCEL/langgraph_chatbot_lcel.py   intent -> memory -> run_rag
+    lel       RAG_LEL/rag_chain.py          retrieve -> medical (+ support) in one batched generate
+and reports p50/p95/p99 per stage (embedding, vector_search, prompt_build,
+generation, post_processing, ...) plus the peak RSS of each pipeline.
+
+Every pipeline runs in its own subprocess, so peak RSS is per pipeline and
+no model is shared between them. By default the models are stubs (hashing
+embedder, in-memory vector store over the scraped articles, fixed-latency LLM):
+that measures the pipeline/framework overhead and is reproducible on any
+machine. `--local` uses the real local models and Chroma store instead
+(the OpenAI model of RAG_LCEL stays stubbed unless OPENAI_API_KEY is set).
+
+Results are written as JSON (sorted keys, rounded to 0.01 ms), so two runs can
+be diffed directly or with `--compare`:
+
+    python benchmarks/bench_pipelines.py --out bench.json
+    python benchmarks/bench_pipelines.py --pipelines rag lel --repeat 5 --local
+    python benchmarks/bench_pipelines.py --out new.json --compare bench.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))  # repo root, for als_core
+
+PIPELINES = ("rag", "lcel", "lel")
+STAGE_ORDER = ("embedding", "vector_search", "prompt_build", "generation", "post_processing")
+
+QUESTIONS = [
+    "What are the early symptoms of ALS?",
+    "How is ALS diagnosed?",
+    "Is ALS hereditary?",
+    "What treatments are approved for ALS?",
+    "How can caregivers help with breathing problems?",
+    "What nutrition changes help people living with ALS?",
+    "I'm scared after my father's ALS diagnosis, what should I expect?",
+    "How do I talk to my children about ALS?",
+    "What home modifications make daily living easier with ALS?",
+    "Are there clinical trials I can join?",
+    "How fast does ALS progress?",
+    "What communication devices are available when speech gets harder?",
+]
+
+
+# --- Stub models ---
+def _install_stubs(decode_ms: float, embed_ms: float, use_local: bool):
+    """Register stub factories for every component the pipelines load."""
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    import numpy as np
+
+    from als_core.model_registry import registry
+    from als_core.tracing import GENERATION, span
+
+    class TimedEmbeddings(Embeddings):
+        """Hashing embedder costing `embed_ms` per forward pass (or a wrapped real one).
+
+        The registry puts the embedding service in front of it, which records
+        the `embedding` spans.
+        """
+
+        def __init__(self, inner: Optional[Embeddings] = None, dim: int = 384):
+            self.inner, self.dim = inner, dim
+
+        def _hash(self, text: str) -> List[float]:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for token in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(token.encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+            norm = np.linalg.norm(vector)
+            return (vector / norm if norm else vector).tolist()
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            if self.inner is not None:
+                return self.inner.embed_documents(texts)
+            time.sleep(embed_ms / 1000)
+            return [self._hash(t) for t in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            if self.inner is not None:
+                return self.inner.embed_query(text)
+            time.sleep(embed_ms / 1000)
+            return self._hash(text)
+
+    def embedder_factory(model_name):
+        if use_local:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            return TimedEmbeddings(HuggingFaceEmbeddings(model_name=model_name))
+        return TimedEmbeddings()
+
+    class StubLLM(LLM):
+        """Fixed-latency LLM: `decode_ms` per requested new token."""
+        max_new_tokens: int = 128
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+            with span(GENERATION, stub=True):
+                time.sleep(self.max_new_tokens * decode_ms / 1000)
+            if "Answer with only the label" in prompt:
+                return "ask_als"    # send the LCEL intent router down the full path
+            return ("ALS affects the nerve cells that control muscles. A care team can help "
+                    "plan treatment and support.\nPlease talk to your doctor.")
+
+    class StubChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "stub-chat"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            text = StubLLM(max_new_tokens=128).invoke(messages[-1].content)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    registry.override("embedder", embedder_factory)
+    if not os.getenv("OPENAI_API_KEY"):
+        registry.override("chat_openai", lambda model_name, temperature: StubChatModel())
+    if use_local:
+        return
+
+    class _Namespace:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    class StubTokenizer:
+        eos_token_id = pad_token_id = 2
+
+        def encode(self, text, add_special_tokens=True):
+            return text.split()
+
+        def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+            parts = [f"<|{m['role']}|>\n{m['content']}</s>" for m in messages]
+            return "\n".join(parts) + ("\n<|assistant|>\n" if add_generation_prompt else "")
+
+    def pipeline_factory(model_id, task):
+        return _Namespace(tokenizer=StubTokenizer(),
+                          model=_Namespace(config=_Namespace(eos_token_id=2, use_cache=True)))
+
+    def vectorstore_factory(collection_name, path):
+        from langchain_core.vectorstores import InMemoryVectorStore
+        from als_core.chunking import load_articles, split_articles
+        chunks = split_articles(load_articles())
+        store = InMemoryVectorStore(registry.embedder())
+        store.add_texts([c.text for c in chunks], metadatas=[c.metadata for c in chunks],
+                        ids=[c.id for c in chunks])
+        return store
+
+    def bm25_factory(collection_name, path):
+        from als_core.chunking import load_articles, split_articles
+        from als_core.hybrid_search import BM25Index
+        chunks = split_articles(load_articles())
+        index = BM25Index()
+        index.add([c.id for c in chunks], [c.text for c in chunks], [c.metadata for c in chunks])
+        return index
+
+    class StubCrossEncoder:
+        """Word-overlap scores, `embed_ms` per batched call (used with ALS_RERANK=1)."""
+
+        def predict(self, pairs, batch_size=32):
+            time.sleep(embed_ms / 1000)
+            return [len(set(q.lower().split()) & set(p.lower().split())) for q, p in pairs]
+
+    registry.override("pipeline", pipeline_factory)
+    registry.override("prefix_cache", lambda model_id: None)   # stub model has no KV cache
+    registry.override("llm", lambda model_id, task, **kw: StubLLM(max_new_tokens=kw.get("max_new_tokens", 128)))
+    registry.override("vectorstore", vectorstore_factory)
+    registry.override("bm25", bm25_factory)
+    registry.override("cross_encoder", lambda model_name: StubCrossEncoder())
+
+
+# --- Pipelines (imported lazily, inside the worker process) ---
+def _load_pipeline(name: str):
+    """Return `ask(question) -> answer` for a pipeline."""
+    if name == "rag":
+        sys.path.insert(0, str(ROOT / "RAG"))
+        from langgraph_chatbot import app
+        return lambda q: app.invoke({"user_input": q, "context": None, "bot_output": ""})["bot_output"]
+
+    if name == "lcel":
+        sys.path.insert(0, str(ROOT / "RAG_LCEL"))
+        from chatbot_with_memory_lcel import clear_memory
+        from langgraph_chatbot_lcel import handle_message
+        session_id = f"bench-{uuid.uuid4().hex[:8]}"
+        ask = lambda q: handle_message(session_id, q)["answer"]
+        ask.cleanup = lambda: clear_memory(session_id)
+        return ask
+
+    if name == "lel":
+        from RAG_LEL.rag_chain import answer_question
+        return answer_question
+
+    raise ValueError(f"Unknown pipeline: {name}")
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def measure(ask, repeat: int, warmup: int) -> List[Dict[str, float]]:
+    """Replay QUESTIONS through `ask`; per-request stage timings in ms."""
+    from als_core.tracing import EMBEDDING, RETRIEVAL, start_trace
+
+    for question in QUESTIONS[:warmup]:
+        ask(question)
+
+    requests = []
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            t0 = time.perf_counter()
+            with start_trace() as trace:
+                ask(question)
+            total = time.perf_counter() - t0
+
+            stages = trace.durations()
+            # Retrieval spans wrap the query embedding, so their exclusive
+            # time is the vector search itself.
+            if RETRIEVAL in stages:
+                stages["vector_search"] = stages.pop(RETRIEVAL)
+            stages.setdefault(EMBEDDING, 0.0)
+            stages["total"] = total
+            row = {k: v * 1000 for k, v in stages.items()}
+            # Work counters: uncached query embeddings and (stub) LLM calls per request
+            row["n_embeddings"] = sum(1 for sp in trace.spans if sp.name == EMBEDDING and not sp.attrs.get("cached"))
+            row["n_llm_calls"] = sum(1 for sp in trace.spans if sp.attrs.get("stub"))
+            requests.append(row)
+    return requests
+
+
+def run_worker(name: str, repeat: int, warmup: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    ask = _load_pipeline(name)
+    import_s = time.perf_counter() - started
+    try:
+        requests = measure(ask, repeat, warmup)
+    finally:
+        getattr(ask, "cleanup", lambda: None)()
+    return {"requests": requests, "import_s": import_s, "peak_rss_mb": _peak_rss_mb()}
+
+
+# --- Aggregation ---
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    lo, hi = int(pos), min(int(pos) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(worker: Dict[str, Any]) -> Dict[str, Any]:
+    requests = worker["requests"]
+    counters = sorted({k for r in requests for k in r if k.startswith("n_")})
+    names = {stage for r in requests for stage in r} - set(counters)
+    ordered = [s for s in STAGE_ORDER if s in names] + sorted(names - set(STAGE_ORDER) - {"total"}) + ["total"]
+    stages = {}
+    for stage in ordered:
+        values = [r.get(stage, 0.0) for r in requests]
+        stages[stage] = {
+            "p50_ms": round(_percentile(values, 0.50), 2),
+            "p95_ms": round(_percentile(values, 0.95), 2),
+            "p99_ms": round(_percentile(values, 0.99), 2),
+            "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        }
+    return {
+        "requests": len(requests),
+        "import_s": round(worker["import_s"], 2),
+        "peak_rss_mb": round(worker["peak_rss_mb"], 1),
+        "stages": stages,
+        "per_request": {
+            k.removeprefix("n_"): round(sum(r[k] for r in requests) / len(requests), 2) for k in counters
+        } if requests else {},
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]):
+    print(f"\n{'pipeline':<6} {'stage':<16} {'old p50':>9} {'new p50':>9} {'old p95':>9} {'new p95':>9}")
+    for name, result in new["pipelines"].items():
+        before = old.get("pipelines", {}).get(name, {}).get("stages", {})
+        for stage, p in result.get("stages", {}).items():
+            b = before.get(stage, {})
+            print(f"{name:<6} {stage:<16} {b.get('p50_ms', float('nan')):>9.2f} {p['p50_ms']:>9.2f} "
+                  f"{b.get('p95_ms', float('nan')):>9.2f} {p['p95_ms']:>9.2f}")
+        old_rss = old.get("pipelines", {}).get(name, {}).get("peak_rss_mb", float("nan"))
+        print(f"{name:<6} {'peak_rss_mb':<16} {old_rss:>9.1f} {result.get('peak_rss_mb', float('nan')):>9.1f}")
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage latency benchmark of the RAG pipelines.")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question set")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed questions before measuring")
+    parser.add_argument("--local", action="store_true", help="use the real local models and Chroma store")
+    parser.add_argument("--decode-ms", type=float, default=1.0, help="stub LLM latency per new token")
+    parser.add_argument("--embed-ms", type=float, default=2.0, help="stub embedder latency per query")
+    parser.add_argument("--out", type=Path, default=Path("bench_pipelines.json"))
+    parser.add_argument("--compare", type=Path, help="previous results file to compare against")
+    parser.add_argument("--worker", choices=PIPELINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        os.environ.setdefault("ALS_CACHE", "0")
+        _install_stubs(args.decode_ms, args.embed_ms, args.local)
+        result = run_worker(args.worker, args.repeat, args.warmup)
+        print("\n@@RESULT@@" + json.dumps(result))
+        sys.exit(0)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "local" if args.local else "stub",
+            "questions": len(QUESTIONS),
+            "repeat": args.repeat,
+            "decode_ms": None if args.local else args.decode_ms,
+            "embed_ms": None if args.local else args.embed_ms,
+        },
+        "pipelines": {},
+    }
+    for name in args.pipelines:
+        cmd = [sys.executable, __file__, "--worker", name, "--repeat", str(args.repeat),
+               "--warmup", str(args.warmup), "--decode-ms", str(args.decode_ms),
+               "--embed-ms", str(args.embed_ms)] + (["--local"] if args.local else [])
+        print(f"Running {name} ...", flush=True)
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0 or "@@RESULT@@" not in proc.stdout:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            report["pipelines"][name] = {"error": f"worker exited with {proc.returncode}"}
+            continue
+        worker = json.loads(proc.stdout.rsplit("@@RESULT@@", 1)[1])
+        report["pipelines"][name] = summarize(worker)
+
+        stages = report["pipelines"][name]["stages"]
+        print("  " + ", ".join(f"{s} p50={v['p50_ms']}ms" for s, v in stages.items())
+              + f", peak RSS {report['pipelines'][name]['peak_rss_mb']} MB")
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
@@ -0,0 +1,124 @@
+"""
+Prefill time saved by the KV prefix cache, and parity with the uncached path.
+
+Imports the chain modules (which register their constant prompt heads), loads
+the chat model through the registry and, for every registered head and a few
+request-specific texts, runs
+    prefill_ms         generate(max_new_tokens=1), full prompt vs. cached head
+    identical          greedy generate(max_new_tokens=N) gives the same tokens
+Exits with status 1 when any cached generation differs from the uncached one.
+
+Needs the real model (no stubs):
+    python benchmarks/bench_prefix_cache.py --out prefix_cache.json
+    python benchmarks/bench_prefix_cache.py --model /path/to/checkpoint --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SAMPLES = [
+    "ALS is a progressive disease of the motor neurons. Early symptoms include twitching and cramps.",
+    "Riluzole and edaravone are approved treatments that can modestly slow the progression of ALS.",
+    "My father was just diagnosed and I don't know how to help him.",
+]
+
+
+def _load_registrations():
+    """Import the chain modules so their register_prefix calls run."""
+    for path in ("RAG", "RAG_LCEL"):
+        sys.path.insert(0, str(ROOT / path))
+    sys.path.insert(0, str(ROOT))
+    import langgraph_chatbot  # noqa: F401  (RAG answer + empathy)
+    import langgraph_chatbot_lcel  # noqa: F401  (intent classifier)
+    import RAG_LEL.rag_chain  # noqa: F401  (rag / support headers)
+
+
+def _generate(model, encoded, max_new_tokens, pad_token_id, cache=None):
+    import torch
+    kwargs = {"past_key_values": cache} if cache is not None else {}
+    with torch.inference_mode():
+        output = model.generate(**encoded, max_new_tokens=max_new_tokens, do_sample=False,
+                                pad_token_id=pad_token_id, **kwargs)
+    return output[0, encoded["input_ids"].shape[1]:].tolist()
+
+
+def run(repeat: int, max_new_tokens: int) -> dict:
+    from als_core import config
+    from als_core.model_registry import registry
+    from als_core.prefix_cache import _REGISTERED
+
+    _load_registrations()
+    pipe = registry.hf_pipeline()
+    model, tokenizer = pipe.model, pipe.tokenizer
+    prefix_cache = registry.prefix_cache()
+    started = time.perf_counter()
+    prefix_cache.warm()
+    warm_s = time.perf_counter() - started
+    pad_token_id = tokenizer.eos_token_id
+
+    results = {}
+    for name, prefix in _REGISTERED.get(config.CHAT_MODEL_ID, {}).items():
+        rows = []
+        for sample in SAMPLES:
+            prompt = prefix + sample if isinstance(prefix, str) else prefix(sample)
+            encoded = tokenizer(prompt, return_tensors="pt").to(model.device)
+
+            def timed(use_cache: bool):
+                times, reused = [], 0
+                for _ in range(repeat):
+                    begin = time.perf_counter()
+                    cache, reused = prefix_cache.lookup(encoded["input_ids"]) if use_cache else (None, 0)
+                    _generate(model, encoded, 1, pad_token_id, cache)
+                    times.append(time.perf_counter() - begin)
+                return statistics.median(times) * 1000, reused
+
+            full_ms, _ = timed(False)
+            cached_ms, reused = timed(True)
+            cache, _ = prefix_cache.lookup(encoded["input_ids"])
+            identical = (_generate(model, encoded, max_new_tokens, pad_token_id)
+                         == _generate(model, encoded, max_new_tokens, pad_token_id, cache))
+            rows.append({"prompt_tokens": encoded["input_ids"].shape[1], "reused_tokens": reused,
+                         "prefill_ms": round(full_ms, 2), "cached_prefill_ms": round(cached_ms, 2),
+                         "identical": identical})
+
+        results[name] = {
+            "prompt_tokens": statistics.mean(r["prompt_tokens"] for r in rows),
+            "reused_tokens": statistics.mean(r["reused_tokens"] for r in rows),
+            "prefill_ms": statistics.mean(r["prefill_ms"] for r in rows),
+            "cached_prefill_ms": statistics.mean(r["cached_prefill_ms"] for r in rows),
+            "identical": all(r["identical"] for r in rows),
+        }
+        saved = 1 - results[name]["cached_prefill_ms"] / results[name]["prefill_ms"]
+        results[name]["saved"] = round(saved, 3)
+        print(f"{name:<12} " + ", ".join(f"{k}={round(v, 2) if isinstance(v, float) else v}"
+                                        for k, v in results[name].items()))
+    return {"model": config.CHAT_MODEL_ID, "warm_s": round(warm_s, 3), "prefixes": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the KV prefix cache against full prefill.")
+    parser.add_argument("--model", help="chat model (default: ALS_CHAT_MODEL_ID)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-new-tokens", type=int, default=32, help="tokens compared for parity")
+    parser.add_argument("--out", type=Path, default=Path("bench_prefix_cache.json"))
+    args = parser.parse_args()
+
+    if args.model:
+        os.environ["ALS_CHAT_MODEL_ID"] = args.model   # before als_core.config is imported
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from bench_pipelines import _git_commit
+
+    report = run(args.repeat, args.max_new_tokens)
+    report["meta"] = {"commit": _git_commit(), "model": report.pop("model"),
+                      "repeat": args.repeat, "max_new_tokens": args.max_new_tokens}
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
+    if not all(p["identical"] for p in report["prefixes"].values()):
+        print("Cached generations differ from the uncached path", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Cold-start benchmark of the API workers and chain modules.
+
+Each target is started in a fresh subprocess, which measures:
+    import_s         importing the module (should do no model work)
+    loaded           registry components built during import (should be empty)
+    startup_s        FastAPI lifespan, i.e. registry.warm_up() (API targets only)
+    first_request_s  the first request after startup (API targets only)
+    peak_rss_mb
+
+Stub models by default, so the numbers isolate import and framework cost;
+`--local` loads the real models, which is what decides autoscaling latency.
+
+    python benchmarks/bench_startup.py --out startup.json
+    python benchmarks/bench_startup.py --local --targets rag_main lel
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_pipelines import ROOT, _git_commit, _install_stubs, _peak_rss_mb  # noqa: E402
+
+# name -> (sys.path entry, module, app attribute, request path, request body)
+TARGETS = {
+    "rag_main": ("RAG", "main", "api", "/ask", {"question": "What are early symptoms of ALS?"}),
+    "rag_api": ("RAG", "api_main", "api", "/ask", {"question": "What are early symptoms of ALS?"}),
+    "lcel": ("RAG_LCEL", "api_main_lcel", "app", "/ask", {"question": "What are early symptoms of ALS?",
+                                                          "session_id": "bench-startup"}),
+    "lel": ("", "RAG_LEL.api_main", "app", "/chat", {"question": "What are early symptoms of ALS?"}),
+    "rag_chain": ("RAG", "rag_chain", None, None, None),
+    "chatbot_with_memory": ("RAG", "chatbot_with_memory", None, None, None),
+}
+
+
+def run_worker(name: str):
+    import importlib
+    from als_core.model_registry import registry
+
+    path, module_name, app_attr, route, body = TARGETS[name]
+    sys.path.insert(0, str(ROOT / path))
+
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    result = {"import_s": time.perf_counter() - started, "loaded": [str(k) for k in registry.loaded()]}
+
+    if app_attr:
+        from fastapi.testclient import TestClient
+        started = time.perf_counter()
+        with TestClient(getattr(module, app_attr)) as client:
+            result["startup_s"] = time.perf_counter() - started
+            started = time.perf_counter()
+            response = client.post(route, json=body)
+            result["first_request_s"] = time.perf_counter() - started
+            result["status"] = response.status_code
+        if name == "lcel":
+            from chatbot_with_memory_lcel import clear_memory
+            clear_memory(body["session_id"])
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the API workers.")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--local", action="store_true", help="load the real local models")
+    parser.add_argument("--out", type=Path, default=Path("bench_startup.json"))
+    parser.add_argument("--worker", choices=list(TARGETS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _install_stubs(decode_ms=1.0, embed_ms=2.0, use_local=args.local)
+        print("\n@@RESULT@@" + json.dumps(run_worker(args.worker)))
+        sys.exit(0)
+
+    report = {"meta": {"commit": _git_commit(), "mode": "local" if args.local else "stub"}, "targets": {}}
+    for name in args.targets:
+        cmd = [sys.executable, __file__, "--worker", name] + (["--local"] if args.local else [])
+        started = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0 or "@@RESULT@@" not in proc.stdout:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            report["targets"][name] = {"error": f"worker exited with {proc.returncode}"}
+            continue
+        result = json.loads(proc.stdout.rsplit("@@RESULT@@", 1)[1])
+        result["process_s"] = wall   # interpreter start + everything above
+        report["targets"][name] = {
+            k: round(v, 3) if isinstance(v, float) else v for k, v in sorted(result.items())
+        }
+        print(f"{name:<20} " + ", ".join(f"{k}={v}" for k, v in report["targets"][name].items()))
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
@@ -0,0 +1,134 @@
+"""
+Cold start and query latency: Chroma vs. the memory-mapped vector snapshot.
+
+Each backend runs in a fresh subprocess (as a new API worker would) and reports
+    open_ms            opening the store (Chroma client + collection / mapping the snapshot)
+    first_query_ms     the first top-k query (Chroma loads its HNSW index here)
+    query_p50_ms       median over the remaining queries
+    rss_mb, pss_mb     resident memory; PSS splits shared pages between processes
+and, against Chroma's (approximate HNSW) results,
+    overlap_at_k       mean fraction of Chroma's top-k IDs the exact snapshot search returns
+
+Queries are stored chunk vectors plus noise, so no embedding model is loaded.
+The snapshot is exported from the collection first when it doesn't exist yet.
+
+    python benchmarks/bench_vector_snapshot.py --out vector_snapshot.json
+    python benchmarks/bench_vector_snapshot.py --persist-dir RAG/chroma_db --queries 200 --k 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_pipelines import ROOT, _git_commit, _peak_rss_mb  # noqa: E402
+
+sys.path.insert(0, str(ROOT))
+from als_core import config  # noqa: E402
+
+BACKENDS = ("chroma", "snapshot")
+
+
+def _pss_mb() -> float:
+    try:
+        with open("/proc/self/smaps_rollup", encoding="utf-8") as rollup:
+            for line in rollup:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def run_worker(backend: str, persist_dir: Path, collection_name: str, queries_path: Path, k: int) -> dict:
+    import numpy as np
+    from als_core.model_registry import registry
+    from als_core.vector_snapshot import VectorSnapshot, snapshot_dir
+    queries = np.load(queries_path)
+
+    started = time.perf_counter()      # imports excluded: both backends pay for them
+    if backend == "chroma":
+        collection = registry.collection(collection_name, persist_dir)
+
+        def search(vector):
+            return collection.query(query_embeddings=[vector.tolist()], n_results=k, include=["distances"])["ids"][0]
+    else:
+        snapshot = VectorSnapshot.load(snapshot_dir(collection_name, persist_dir))
+
+        def search(vector):
+            return [doc.id for doc, _ in snapshot.search(vector, k)]
+    open_ms = (time.perf_counter() - started) * 1000
+
+    ids, times = [], []
+    for vector in queries:
+        begin = time.perf_counter()
+        ids.append(search(vector))
+        times.append((time.perf_counter() - begin) * 1000)
+    return {"open_ms": open_ms, "first_query_ms": times[0], "query_p50_ms": statistics.median(times[1:] or times),
+            "rss_mb": _peak_rss_mb(), "pss_mb": _pss_mb(), "ids": ids}
+
+
+def _queries(persist_dir: Path, collection_name: str, n: int, path: Path):
+    """Noisy copies of random stored vectors (exports the snapshot if needed)."""
+    import numpy as np
+    from als_core.model_registry import registry
+    from als_core.vector_snapshot import MANIFEST, VectorSnapshot, export_snapshot, snapshot_dir
+
+    directory = snapshot_dir(collection_name, persist_dir)
+    if not (directory / MANIFEST).exists():
+        export_snapshot(registry.collection(collection_name, persist_dir), directory)
+    embeddings = VectorSnapshot.load(directory)._version.embeddings
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(embeddings), size=n)
+    noise = rng.standard_normal((n, embeddings.shape[1])).astype(np.float32) * 0.05
+    np.save(path, np.asarray(embeddings[rows]) + noise)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Chroma and the memory-mapped vector snapshot.")
+    parser.add_argument("--persist-dir", type=Path, default=config.CHROMA_DIR)
+    parser.add_argument("--collection", default=config.COLLECTION_NAME)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--out", type=Path, default=Path("bench_vector_snapshot.json"))
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.persist_dir, args.collection, args.queries_file, args.k)
+        print("\n@@RESULT@@" + json.dumps(result))
+        sys.exit(0)
+
+    queries_file = Path(tempfile.mkdtemp(prefix="als-bench-")) / "queries.npy"
+    _queries(args.persist_dir, args.collection, args.queries, queries_file)
+
+    report = {"meta": {"commit": _git_commit(), "collection": args.collection, "queries": args.queries,
+                       "k": args.k}, "backends": {}}
+    results = {}
+    for backend in args.backends:
+        cmd = [sys.executable, __file__, "--worker", backend, "--persist-dir", str(args.persist_dir),
+               "--collection", args.collection, "--queries-file", str(queries_file), "--k", str(args.k)]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0 or "@@RESULT@@" not in proc.stdout:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            report["backends"][backend] = {"error": f"worker exited with {proc.returncode}"}
+            continue
+        results[backend] = json.loads(proc.stdout.rsplit("@@RESULT@@", 1)[1])
+
+    if "chroma" in results and "snapshot" in results:
+        overlaps = [len(set(ours) & set(ref)) / max(len(ref), 1)
+                    for ours, ref in zip(results["snapshot"]["ids"], results["chroma"]["ids"])]
+        results["snapshot"]["overlap_at_k"] = statistics.mean(overlaps)
+    for backend, result in results.items():
+        result.pop("ids")
+        report["backends"][backend] = {k: round(v, 3) for k, v in sorted(result.items())}
+        print(f"{backend:<8} " + ", ".join(f"{k}={v}" for k, v in report["backends"][backend].items()))
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
@@ -1,8 +1,31 @@
+import json
+import time
+
 import streamlit as st
 import requests
 
 # --- Backend API URL ---
 API_URL = "http://127.0.0.1:8000/ask"
+STREAM_URL = API_URL + "/stream"
+
+
+# --- Read Server-Sent Events from /ask/stream and yield answer tokens ---
+def stream_answer(question: str):
+    started = time.perf_counter()
+    with requests.post(STREAM_URL, json={"question": question}, stream=True, timeout=(5, 300)) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):].strip())
+                if event == "token":
+                    if "ttft" not in st.session_state:
+                        st.session_state.ttft = time.perf_counter() - started
+                    yield data["text"]
+                elif event == "error":
+                    raise RuntimeError(data.get("detail", "stream failed"))
 
 # --- Streamlit UI ---
 st.set_page_config(page_title="ALS Support Chatbot", page_icon="💬", layout="centered")
@@ -25,15 +48,14 @@ if prompt := st.chat_input("Ask about ALS symptoms, treatment, or emotional supp
     st.chat_message("user").markdown(prompt)
     st.session_state.messages.append({"role": "user", "content": prompt})
 
-    # --- Send request to FastAPI ---
-    try:
-        response = requests.post(API_URL, json={"question": prompt})
-        response.raise_for_status()
-        answer = response.json().get("answer", "Sorry, I couldn't process that.")
-    except Exception as e:
-        answer = f"⚠️ Error: {e}"
-
-    # Display bot response
+    # --- Stream the response from FastAPI, rendering tokens as they arrive ---
+    st.session_state.pop("ttft", None)
     with st.chat_message("assistant"):
-        st.markdown(answer)
+        try:
+            answer = st.write_stream(stream_answer(prompt)) or "Sorry, I couldn't process that."
+        except Exception as e:
+            answer = f"⚠️ Error: {e}"
+            st.markdown(answer)
+        if "ttft" in st.session_state:
+            st.caption(f"First token after {st.session_state.ttft:.1f}s")
     st.session_state.messages.append({"role": "assistant", "content": answer})
\ No newline at end of file
@@ -1,12 +1,12 @@
-import json
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from collections import Counter
 
-with open('webscrapped-data/als_articles_expanded.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from als_core.chunking import load_articles, split_articles
 
-all_text = " ".join([d["content"] for d in data])
-
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-chunks = splitter.split_text(all_text)
+# Split each article on its own so chunks never cross document boundaries
+# and keep their source metadata (url, domain, topic, chunk ordinal)
+articles = load_articles('webscrapped-data/als_articles_expanded.json')
+chunks = split_articles(articles, chunk_size=1000, chunk_overlap=100)
 
 print("Number of chunks:", len(chunks))
+for domain, count in Counter(c.metadata["domain"] for c in chunks).most_common():
+    print(f"  {domain}: {count}")
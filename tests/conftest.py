@@ -0,0 +1,37 @@
+"""Shared fixtures: a tiny random Llama with a word-level tokenizer (no downloads)."""
+import pytest
+
+# Vocabulary of the tiny model; other words map to <unk>
+TINY_VOCAB_TEXT = (
+    "you are a careful medical assistant answer using only the context below and keep it short context : "
+    "you are a warm support companion reply with five short lines of encouragement for the person question : "
+    "als affects the motor neurons what is ? i am scared comes next prompt without any registered head at all "
+    "how does progress over time can help me breathing swallowing muscles weakness"
+)
+
+
+@pytest.fixture(scope="session")
+def tiny_lm():
+    """(model, tokenizer): greedy decoding is deterministic, fp32 on CPU."""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    tokenizers = pytest.importorskip("tokenizers")
+
+    words = sorted(set(TINY_VOCAB_TEXT.split()))
+    vocab = {"<pad>": 0, "<s>": 1, "</s>": 2, "<unk>": 3, **{w: i + 4 for i, w in enumerate(words)}}
+    backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.WhitespaceSplit()
+    backend.post_processor = tokenizers.processors.TemplateProcessing(single="<s> $A", special_tokens=[("<s>", 1)])
+    backend.decoder = tokenizers.decoders.WordPiece()
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend, bos_token="<s>", eos_token="</s>", unk_token="<unk>", pad_token="<pad>",
+    )
+
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=len(vocab), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=256,
+        bos_token_id=1, eos_token_id=2, pad_token_id=0,
+    )
+    model = transformers.LlamaForCausalLM(config).eval()
+    return model, tokenizer
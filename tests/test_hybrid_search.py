@@ -0,0 +1,65 @@
+"""BM25 index built from Chroma rows (chunks without metadata) and kept in step with the vector snapshot."""
+from als_core.hybrid_search import BM25Index
+
+
+class _Collection:
+    def __init__(self, ids, documents, metadatas):
+        self.rows = {"ids": ids, "documents": documents, "metadatas": metadatas}
+
+    def count(self):
+        return len(self.rows["ids"])
+
+    def get(self, include, limit, offset):
+        return {key: values[offset:offset + limit] for key, values in self.rows.items()}
+
+
+def test_from_collection_accepts_missing_metadata(tmp_path):
+    collection = _Collection(
+        ["c1", "c2"],
+        ["ALS weakens the muscles used for breathing.", "Riluzole may slow ALS progression."],
+        [None, {"source": "cdc"}],
+    )
+    index = BM25Index.from_collection(collection, tmp_path / "bm25.json", batch_size=1)
+    assert len(index) == 2
+
+    hits = index.search("breathing muscles")
+    assert [doc.id for doc, _ in hits] == ["c1"]
+    assert hits[0][0].metadata == {}
+
+    index.update_metadata(["c2"], [None])
+    assert index.search("riluzole")[0][0].metadata == {}
+
+
+class _EmbeddedCollection(_Collection):
+    def __init__(self, ids, documents, metadatas):
+        super().__init__(ids, documents, metadatas)
+        self.rows["embeddings"] = [[1.0, float(i)] for i in range(len(ids))]
+
+
+def test_snapshot_workers_rebuild_the_index_and_keep_it(tmp_path, monkeypatch):
+    from als_core import config
+    from als_core.model_registry import ModelRegistry
+    from als_core.vector_snapshot import export_snapshot, snapshot_dir
+
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "snapshot")
+    directory = snapshot_dir("als_chunks", tmp_path)
+    stale = BM25Index(tmp_path / "bm25_als_chunks.json")
+    stale.add(["c1"], ["ALS weakens the muscles used for breathing."])
+    stale.save()
+
+    export_snapshot(_EmbeddedCollection(["c1", "c2"], ["ALS weakens the muscles used for breathing.",
+                                                       "Edaravone is approved for ALS."], [None, None]), directory)
+    registry = ModelRegistry()
+    index = registry.bm25_index("als_chunks", tmp_path)
+    assert len(index) == 2
+    # A search reloads the file if it changed: the rebuild must have been saved
+    assert [doc.id for doc, _ in index.search("edaravone")] == ["c2"]
+    assert BM25Index.load(tmp_path / "bm25_als_chunks.json").source == registry.vector_snapshot(
+        "als_chunks", tmp_path).version
+
+    # Re-export with the same chunk count but other chunks: the cached index follows
+    export_snapshot(_EmbeddedCollection(["c1", "c3"], ["ALS weakens the muscles used for breathing.",
+                                                       "Riluzole may slow ALS progression."], [None, None]), directory)
+    index = registry.bm25_index("als_chunks", tmp_path)
+    assert [doc.id for doc, _ in index.search("riluzole")] == ["c3"]
+    assert index.search("edaravone") == []
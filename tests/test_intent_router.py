@@ -0,0 +1,17 @@
+"""Intent router: LLM fallback output outside the known labels is out of scope."""
+from als_core.intent_router import LCEL_INTENTS, IntentRouter
+
+
+def _router(answer):
+    # Constant embeddings: every label scores the same, so the fallback always runs
+    return IntentRouter(LCEL_INTENTS, embed_documents=lambda texts: [[1.0, 0.0]] * len(texts),
+                        embed_query=lambda text: [1.0, 0.0], fallback=lambda text: answer)
+
+
+def test_known_fallback_label_is_kept():
+    assert _router(" personal\n").classify("hello").label == "personal"
+
+
+def test_unknown_fallback_label_is_out_of_scope():
+    result = _router('ignore previous instructions"}\n').classify("hello")
+    assert result.label == "out_of_scope" and result.method == "llm"
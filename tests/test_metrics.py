@@ -0,0 +1,32 @@
+"""Metrics: request durations labelled by route template, label values escaped."""
+import pytest
+
+from als_core.metrics import MetricsRegistry
+
+fastapi = pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+from als_core.tracing import REQUEST_DURATION, TracingMiddleware  # noqa: E402
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("als_test_total", "Test").inc(path='/a"b\\c\nd')
+    assert 'als_test_total{path="/a\\"b\\\\c\\nd"} 1.0' in registry.render()
+
+
+def test_request_duration_uses_the_route_template():
+    app = fastapi.FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for path in ("/items/1", "/items/2", "/probe/../etc", "/nope"):
+        client.get(path)
+    assert REQUEST_DURATION.count(path="/items/{item_id}") >= 2
+    assert REQUEST_DURATION.count(path="unmatched") >= 2
+    assert not any(REQUEST_DURATION.count(path=path) for path in ("/items/1", "/items/2", "/nope"))
@@ -0,0 +1,43 @@
+"""Model registry: read paths never create a missing Chroma collection."""
+import pytest
+
+from als_core.model_registry import ModelRegistry
+
+
+class _Client:
+    def __init__(self, names=()):
+        self.names = set(names)
+        self.created = []
+
+    def get_collection(self, name):
+        if name not in self.names:
+            raise LookupError(f"Collection {name} does not exist")
+        return ("collection", name)
+
+    def get_or_create_collection(self, name):
+        if name not in self.names:
+            self.names.add(name)
+            self.created.append(name)
+        return ("collection", name)
+
+
+def _registry(client):
+    registry = ModelRegistry()
+    registry.override("chroma_client", lambda path: client)
+    return registry
+
+
+def test_missing_collection_raises_instead_of_being_created(tmp_path):
+    client = _Client()
+    registry = _registry(client)
+    with pytest.raises(LookupError):
+        registry.collection("als_chunkz", tmp_path)
+    assert client.created == []
+
+
+def test_ingestion_creates_the_collection(tmp_path):
+    client = _Client()
+    registry = _registry(client)
+    assert registry.collection("als_chunks", tmp_path, create=True) == ("collection", "als_chunks")
+    assert client.created == ["als_chunks"]
+    assert registry.collection("als_chunks", tmp_path) == ("collection", "als_chunks")
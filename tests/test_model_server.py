@@ -0,0 +1,50 @@
+"""Model server: workers send their prompt heads before generating, each head once."""
+import sys
+import threading
+
+import pytest
+
+from als_core.model_registry import registry
+from als_core.model_server import SERVER_REQUESTS, ModelClient, ModelServer, RemoteBatcher
+from als_core.prefix_cache import register_prefix
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix socket")
+
+MODEL_ID = "test-model-server"
+AUTHKEY = b"test-secret"
+
+
+class _Batcher:
+    def generate(self, prompt, **gen_kwargs):
+        return prompt.upper()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setitem(registry._overrides, "batcher", lambda model_id: _Batcher())
+    server = ModelServer(str(tmp_path / "models.sock"), AUTHKEY)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.close()
+    registry._instances.pop(("batcher", MODEL_ID), None)
+
+
+def test_prompt_heads_are_sent_before_the_first_generation(server):
+    register_prefix("head", "you are a test assistant", model_id=MODEL_ID)
+    client = ModelClient(server.address, AUTHKEY)
+    client.wait_ready(timeout_s=10)
+    batcher = RemoteBatcher(client, MODEL_ID)
+    sent = SERVER_REQUESTS.value(op="register_prefixes")
+    try:
+        assert batcher.generate("hello") == "HELLO"
+        assert batcher.submit("again").result(timeout=10) == "AGAIN"
+        assert SERVER_REQUESTS.value(op="register_prefixes") == sent + 1    # once per head
+
+        register_prefix("late", lambda slot: "a chain imported later " + slot, model_id=MODEL_ID)
+        batcher.generate("hello")
+        assert SERVER_REQUESTS.value(op="register_prefixes") == sent + 2
+        assert client.call("ping")["prefixes"][MODEL_ID] == ["head", "late"]
+    finally:
+        batcher.close()
+        client.close()
@@ -0,0 +1,86 @@
+"""Prefix KV cache: greedy output identical to the uncached path, stored heads never modified."""
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from als_core.batching import MicroBatcher  # noqa: E402
+from als_core.prefix_cache import PrefixCache, register_prefix  # noqa: E402
+
+MODEL_ID = "test-prefix-cache"
+MEDICAL = "you are a careful medical assistant answer using only the context below and keep it short context :"
+SUPPORT = "you are a warm support companion reply with five short lines of encouragement for the person question :"
+PROMPTS = [
+    MEDICAL + " als affects the motor neurons question : what is als ?",
+    SUPPORT + " i am scared of what comes next",
+    "a prompt without any registered head at all",
+]
+GREEDY = {"max_new_tokens": 12, "do_sample": False}
+
+
+@pytest.fixture(scope="module")
+def prefix_cache(tiny_lm):
+    register_prefix("medical", MEDICAL, model_id=MODEL_ID)
+    register_prefix("support", lambda slot: SUPPORT + " " + slot, model_id=MODEL_ID)
+    cache = PrefixCache(*tiny_lm, model_id=MODEL_ID, min_tokens=4)
+    assert cache.warm() == 2
+    return cache
+
+
+def _greedy(model, tokenizer, prompt, past_key_values=None):
+    encoded = tokenizer(prompt, return_tensors="pt")
+    with torch.inference_mode():
+        output = model.generate(**encoded, past_key_values=past_key_values,
+                                pad_token_id=tokenizer.pad_token_id, **GREEDY)
+    return output[0, encoded["input_ids"].shape[1]:].tolist()
+
+
+def _stored(prefix_cache):
+    return {name: [(keys.clone(), values.clone()) for keys, values, _ in entry.cache]
+            for name, entry in prefix_cache._entries.items()}
+
+
+def test_lookup_generates_the_uncached_tokens(tiny_lm, prefix_cache):
+    model, tokenizer = tiny_lm
+    for prompt in PROMPTS[:2]:
+        cache, reused = prefix_cache.lookup(tokenizer(prompt, return_tensors="pt")["input_ids"])
+        assert reused > 0
+        assert _greedy(model, tokenizer, prompt, cache) == _greedy(model, tokenizer, prompt)
+
+
+def test_requests_do_not_modify_the_stored_heads(tiny_lm, prefix_cache):
+    model, tokenizer = tiny_lm
+    before = _stored(prefix_cache)
+    # Diverges inside the medical head: the copy is cropped to the shared tokens
+    prompt = MEDICAL.replace("keep it short", "be brief") + " what is als ?"
+    input_ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+    cache, reused = prefix_cache.lookup(input_ids)
+    assert cache.get_seq_length() == reused < len(tokenizer(MEDICAL)["input_ids"])
+    assert _greedy(model, tokenizer, prompt, cache) == _greedy(model, tokenizer, prompt)
+    assert cache.get_seq_length() > reused   # generation grew the copy ...
+
+    after = _stored(prefix_cache)              # ... and left the stored heads alone
+    for name, layers in before.items():
+        for (keys, values), (new_keys, new_values) in zip(layers, after[name]):
+            assert torch.equal(keys, new_keys) and torch.equal(values, new_values)
+
+
+def test_batched_rows_start_from_their_own_heads(tiny_lm, prefix_cache):
+    model, tokenizer = tiny_lm
+    rows = tokenizer(PROMPTS)["input_ids"]
+    batch = prefix_cache.lookup_batch(rows, tokenizer.pad_token_id)
+    assert batch.reused[0] > 0 and batch.reused[1] > 0 and batch.reused[2] == 0
+    assert batch.cache.get_seq_length() == max(batch.reused)
+
+    before = _stored(prefix_cache)
+    batcher = MicroBatcher(model, tokenizer, max_batch_size=len(PROMPTS), max_wait_ms=200,
+                           prefix_cache=prefix_cache)
+    try:
+        futures = [batcher.submit(prompt, **GREEDY) for prompt in PROMPTS]
+        texts = [future.result(timeout=60) for future in futures]
+    finally:
+        batcher.close()
+    expected = [tokenizer.decode(_greedy(model, tokenizer, prompt), skip_special_tokens=True) for prompt in PROMPTS]
+    assert texts == expected and all(texts)
+    after = _stored(prefix_cache)
+    assert all(torch.equal(a[0], b[0]) for name in before for a, b in zip(before[name], after[name]))
@@ -0,0 +1,34 @@
+"""Reranker: slow scoring never queues work behind jobs that already timed out."""
+import threading
+
+from langchain_core.documents import Document
+
+from als_core.reranker import RERANK_REQUESTS, Reranker
+
+DOCS = [Document(page_content=f"chunk {i}") for i in range(4)]
+
+
+def test_busy_pool_keeps_retrieval_order_without_queueing():
+    release = threading.Event()
+    calls = []
+
+    def slow_score(pairs):
+        calls.append(len(pairs))
+        release.wait(timeout=10)
+        return [float(i) for i in range(len(pairs))]
+
+    reranker = Reranker(slow_score, top_n=2, budget_ms=20, workers=2)
+    try:
+        busy = RERANK_REQUESTS.value(result="busy")
+        for _ in range(5):
+            assert reranker.rerank("q", DOCS) == DOCS[:2]
+        assert len(calls) == 2                                   # one job per worker, none queued
+        assert RERANK_REQUESTS.value(result="busy") == busy + 3
+
+        release.set()                                            # late jobs finish, slots come back
+        reranker._pool.submit(lambda: None).result(timeout=10)
+        reranker.budget_s = 10
+        assert reranker.rerank("q", DOCS) == [DOCS[3], DOCS[2]]
+    finally:
+        release.set()
+        reranker.close()
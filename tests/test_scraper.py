@@ -0,0 +1,96 @@
+"""Scraper against a local HTTP fixture server: dedupe, 304 reuse, resume."""
+import asyncio
+import importlib.util
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+_spec = importlib.util.spec_from_file_location("scrape_als_articles",
+                                               ROOT / "webscrapped-data" / "scrape_als_articles.py")
+scraper = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scraper)
+
+PAGES = {"/a": "Alpha page text.", "/b": "Beta page text."}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}           # path -> status codes served
+    failing = set()     # paths answering 500
+
+    def do_GET(self):
+        if self.path in self.failing or self.path not in PAGES:
+            status, body = 500, b""
+        else:
+            etag = f'"{self.path[1:]}-v1"'
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+            else:
+                status, body = 200, f"<html><body><p>{PAGES[self.path]}</p></body></html>".encode()
+        self.hits.setdefault(self.path, []).append(status)
+        self.send_response(status)
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.hits, _Handler.failing = {}, set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _scrape(base, tmp_path, paths, resume=False):
+    return asyncio.run(scraper.scrape(
+        [base + p for p in paths], log_path=tmp_path / "log.jsonl", output_path=tmp_path / "out.json",
+        per_host_delay=0.0, timeout=5.0, resume=resume,
+    ))
+
+
+def test_duplicates_fetched_once_and_304_reuses_content(server, tmp_path):
+    first = _scrape(server, tmp_path, ["/a", "/a", "/b"])
+    assert [d["url"] for d in first] == [server + "/a", server + "/b"]
+    assert _Handler.hits == {"/a": [200], "/b": [200]}
+
+    second = _scrape(server, tmp_path, ["/a", "/b"])
+    assert _Handler.hits == {"/a": [200, 304], "/b": [200, 304]}
+    assert second == first
+    assert json.loads((tmp_path / "out.json").read_text()) == first
+
+
+def test_resume_retries_failed_urls_only(server, tmp_path):
+    log = tmp_path / "log.jsonl"
+    records = [  # interrupted run: /a done, /b failed, no run_complete marker
+        {"run_id": "r1", "url": server + "/a", "status": "ok", "content": "Alpha page text.",
+         "etag": '"a-v1"', "last_modified": None, "seconds": 0.0, "bytes": 1},
+        {"run_id": "r1", "url": server + "/b", "status": "error", "content": "Error fetching URL: boom",
+         "seconds": 0.0, "bytes": 0},
+    ]
+    log.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    data = _scrape(server, tmp_path, ["/a", "/b"], resume=True)
+    assert _Handler.hits == {"/b": [200]}
+    assert data == [{"url": server + "/a", "content": "Alpha page text."},
+                    {"url": server + "/b", "content": "Beta page text."}]
+
+
+def test_failed_fetch_exports_previous_good_copy(server, tmp_path):
+    first = _scrape(server, tmp_path, ["/a", "/b"])
+    _Handler.failing.add("/b")
+    second = _scrape(server, tmp_path, ["/a", "/b"])
+    assert _Handler.hits["/b"] == [200, 500]
+    assert second == first
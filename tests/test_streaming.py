@@ -0,0 +1,66 @@
+"""Streaming: pieces come from the shared micro-batcher and open streams are bounded."""
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from als_core import streaming  # noqa: E402
+from als_core.batching import MicroBatcher  # noqa: E402
+from als_core.inference_executor import InferenceOverloaded  # noqa: E402
+from als_core.model_registry import ModelRegistry  # noqa: E402
+
+PROMPTS = [
+    "how does als progress over time ?",
+    "what is als ?",
+    "can breathing help muscles weakness ?",
+]
+GREEDY = {"max_new_tokens": 12, "do_sample": False}
+
+
+@pytest.fixture
+def batcher(tiny_lm, monkeypatch):
+    batcher = MicroBatcher(*tiny_lm, max_batch_size=len(PROMPTS), max_wait_ms=50)
+    registry = ModelRegistry()
+    registry.override("batcher", lambda model_id: batcher)
+    monkeypatch.setattr(streaming, "registry", registry)
+    yield batcher
+    batcher.close()
+
+
+def test_streamed_answer_matches_the_batched_one(batcher):
+    expected = batcher.generate(PROMPTS[0], **GREEDY)
+    assert expected
+    assert "".join(streaming.stream_generate(PROMPTS[0], **GREEDY)) == expected
+
+
+def test_concurrent_streams_and_generations_share_the_batcher(batcher):
+    expected = [batcher.generate(prompt, **GREEDY) for prompt in PROMPTS]
+    streamed, generated = {}, {}
+
+    def stream(i):
+        streamed[i] = "".join(streaming.stream_generate(PROMPTS[i], **GREEDY))
+
+    threads = [threading.Thread(target=stream, args=(i,)) for i in range(len(PROMPTS))]
+    for thread in threads:
+        thread.start()
+    futures = {i: batcher.submit(prompt, **GREEDY) for i, prompt in enumerate(PROMPTS)}
+    for thread in threads:
+        thread.join(timeout=60)
+    generated = {i: future.result(timeout=60) for i, future in futures.items()}
+    assert [streamed[i] for i in range(len(PROMPTS))] == expected
+    assert [generated[i] for i in range(len(PROMPTS))] == expected
+
+
+def test_stream_slots_are_bounded_and_released(monkeypatch):
+    monkeypatch.setattr(streaming, "_STREAM_SLOTS", threading.BoundedSemaphore(1))
+    slot = streaming.StreamSlot()
+    with pytest.raises(InferenceOverloaded):
+        streaming.StreamSlot()
+    assert list(slot.guard(iter(["a", "b"]))) == ["a", "b"]   # exhausted: slot released
+
+    pieces = streaming.StreamSlot().guard(iter(["a", "b"]))
+    assert next(pieces) == "a"
+    pieces.close()                                             # client went away
+    streaming.StreamSlot().release()
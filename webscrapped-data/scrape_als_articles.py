@@ -1,8 +1,35 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Concurrent ALS article scraper.
+
+- fetches all URLs concurrently over one pooled httpx.AsyncClient
+- deduplicates URLs and rate-limits requests per host
+- sends conditional requests (ETag / Last-Modified) so unchanged pages are
+  not downloaded again (304 -> previous content is reused)
+- appends every result to a JSONL log as soon as it arrives, so a crashed
+  run can be resumed with --resume, then exports als_articles_expanded.json
+- prints a timing report at the end
+
+Every URL, path and limit is a parameter, so the crawler can be pointed at a
+local HTTP fixture server.
+
+Usage:
+    python scrape_als_articles.py
+    python scrape_als_articles.py --resume --concurrency 4 --per-host-delay 1.0
+"""
+import argparse
+import asyncio
 import json
-import os
-import time  # For delays between requests
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+HERE = Path(__file__).resolve().parent
 
 urls = [
     "https://www.ninds.nih.gov/health-information/disorders/amyotrophic-lateral-sclerosis-als",
@@ -38,78 +65,258 @@ urls = [
     "https://www.mayoclinic.org/diseases-conditions/amyotrophic-lateral-sclerosis"
 ]
 
-data = []
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Referer': 'https://www.google.com/',  # Pretend referral from google search
+}
 
-for url in urls:
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Referer': 'https://www.google.com/',  # Pretend referral from google search
-        }
-        r = requests.get(url, headers=headers, timeout=100)  # Increased timeout to 100 seconds
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, 'html.parser')
-
-        # Apollo API
-        # Expanded content selectors for more comprehensive scraping
-        content_selectors = [
-        'p',  # Standard paragraphs
-        '.content p', '.article-body p', '.main-content p', '.entry-content p', '.post-content p',  # Class-based content
-        'main p', 'article p', 'section p', 'div p', 'span p',  # Semantic and div-based
-        '[data-testid*="content"] p', '[id*="content"] p',  # Dynamic/ID-based
-        'body p',  # Fallback for entire body (use cautiously)
-        ]
-        
-        # If no paragraphs, try other elements for more data (lists, definitions, etc.)
-        fallback_selectors = [
-        'li',  # List items (bullets/numbers, e.g., symptoms lists)
-        'ul li', 'ol li',  # Unordered/ordered list items
-        'dt', 'dd',  # Definition terms/descriptions (dictionaries/glossaries)
-        'dl dt', 'dl dd',  # Full definition lists
-        'details summary', 'details p',  # Accordions/expandable sections (dropboxes-like)
-        'select option',  # Dropdown options (if text-based)
-        'a',  # Links (pointers to related info, e.g., "Learn more" links)
-        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',  # Headings (for structure)
-        'strong', 'em', 'b', 'i',  # Emphasized text
-        'blockquote',  # Quotes
-        'table td', 'table th',  # Table cells (for data tables)
-        ]
-        
-        paragraphs = []
-        for selector in content_selectors:
+# Expanded content selectors for more comprehensive scraping
+content_selectors = [
+    'p',  # Standard paragraphs
+    '.content p', '.article-body p', '.main-content p', '.entry-content p', '.post-content p',  # Class-based content
+    'main p', 'article p', 'section p', 'div p', 'span p',  # Semantic and div-based
+    '[data-testid*="content"] p', '[id*="content"] p',  # Dynamic/ID-based
+    'body p',  # Fallback for entire body (use cautiously)
+]
+
+# If no paragraphs, try other elements for more data (lists, definitions, etc.)
+fallback_selectors = [
+    'li',  # List items (bullets/numbers, e.g., symptoms lists)
+    'ul li', 'ol li',  # Unordered/ordered list items
+    'dt', 'dd',  # Definition terms/descriptions (dictionaries/glossaries)
+    'dl dt', 'dl dd',  # Full definition lists
+    'details summary', 'details p',  # Accordions/expandable sections (dropboxes-like)
+    'select option',  # Dropdown options (if text-based)
+    'a',  # Links (pointers to related info, e.g., "Learn more" links)
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',  # Headings (for structure)
+    'strong', 'em', 'b', 'i',  # Emphasized text
+    'blockquote',  # Quotes
+    'table td', 'table th',  # Table cells (for data tables)
+]
+
+
+def extract_content(html: str) -> str:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    paragraphs = []
+    for selector in content_selectors:
+        elements = soup.select(selector)
+        if elements:
+            paragraphs.extend([elem.get_text(strip=True) for elem in elements])
+            break  # Use the first matching selector
+
+    # If no paragraphs, try other elements like lists and headings for more data
+    if not paragraphs:
+        for selector in fallback_selectors:
             elements = soup.select(selector)
             if elements:
                 paragraphs.extend([elem.get_text(strip=True) for elem in elements])
-                break  # Use the first matching selector
-        
-        # If no paragraphs, try other elements like lists and headings for more data
-        if not paragraphs:
-            for selector in fallback_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    paragraphs.extend([elem.get_text(strip=True) for elem in elements])
-                    break
-        
-        content = ' '.join(paragraphs) if paragraphs else "No content extracted"
-        char_count = len(content)
-        print(f"Scraped {char_count} characters from {url}")
-        if char_count < 500:
-            print(f"Warning: Low content ({char_count} chars) - page may be minimal or blocked.")
-        
-    except requests.exceptions.RequestException as e:
-        content = f"Error fetching URL: {str(e)}"
+                break
+
+    return ' '.join(paragraphs) if paragraphs else "No content extracted"
+
+
+def dedupe(items: Iterable[str]) -> List[str]:
+    """Drop repeated URLs while keeping their first-seen order."""
+    return list(dict.fromkeys(items))
+
+
+# --- Per-host rate limiting ---
+class HostRateLimiter:
+    """At most `max_per_host` requests in flight and `delay` seconds between starts, per host."""
+
+    def __init__(self, delay: float, max_per_host: int):
+        self.delay = delay
+        self.max_per_host = max_per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_start: Dict[str, float] = {}
+
+    def _host(self, url: str) -> str:
+        return urlparse(url).netloc
+
+    async def acquire(self, url: str):
+        host = self._host(url)
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        await semaphore.acquire()
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            wait = self._last_start.get(host, 0.0) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = time.monotonic()
+
+    def release(self, url: str):
+        self._semaphores[self._host(url)].release()
+
+
+# --- JSONL log (incremental output + conditional request state) ---
+def load_log(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # line cut short by a crashed run
+    return records
+
+
+@dataclass
+class RunState:
+    run_id: str
+    previous: Dict[str, Dict] = field(default_factory=dict)   # url -> latest usable record
+    done: set = field(default_factory=set)                     # urls fetched successfully in this run
+
+
+def prepare_run(log_path: Path, resume: bool) -> RunState:
+    records = load_log(log_path)
+    previous = {}
+    for record in records:
+        if record.get("status") in ("ok", "not_modified"):
+            previous[record["url"]] = record
+
+    # Resume the last run only if it never wrote its "run_complete" marker
+    run_ids = [r["run_id"] for r in records if "run_id" in r]
+    last_run = run_ids[-1] if run_ids else None
+    finished = {r["run_id"] for r in records if r.get("status") == "run_complete"}
+    if resume and last_run and last_run not in finished:
+        # Failed URLs are not done: the resumed run retries them
+        done = {r["url"] for r in records
+                if r.get("run_id") == last_run and r.get("status") in ("ok", "not_modified")}
+        return RunState(last_run, previous, done)
+    return RunState(uuid.uuid4().hex[:12], previous)
+
+
+async def fetch_one(client: httpx.AsyncClient, limiter: HostRateLimiter, url: str,
+                    previous: Optional[Dict], run_id: str) -> Dict:
+    conditional = {}
+    if previous:
+        if previous.get("etag"):
+            conditional["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            conditional["If-Modified-Since"] = previous["last_modified"]
+
+    await limiter.acquire(url)
+    started = time.perf_counter()
+    try:
+        r = await client.get(url, headers=conditional)
+        elapsed = time.perf_counter() - started
+        record = {"run_id": run_id, "url": url, "http_status": r.status_code,
+                  "seconds": round(elapsed, 3), "bytes": len(r.content)}
+        if r.status_code == 304 and previous:
+            record.update(status="not_modified", content=previous["content"],
+                          etag=previous.get("etag"), last_modified=previous.get("last_modified"))
+            return record
+        r.raise_for_status()
+        content = extract_content(r.text)
+        record.update(status="ok", content=content,
+                      etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"))
+        if len(content) < 500:
+            print(f"Warning: Low content ({len(content)} chars) from {url} - page may be minimal or blocked.")
+        return record
+    except httpx.HTTPError as e:
         print(f"Error for {url}: {e}")
-    
-    data.append({"url": url, "content": content})
-    time.sleep(1)  # 1-second delay between requests to avoid rate limits
+        return {"run_id": run_id, "url": url, "status": "error",
+                "content": f"Error fetching URL: {str(e)}",
+                "seconds": round(time.perf_counter() - started, 3), "bytes": 0}
+    finally:
+        limiter.release(url)
+
+
+async def scrape(
+    url_list: Iterable[str] = urls,
+    log_path: Path = HERE / 'als_articles.jsonl',
+    output_path: Path = HERE / 'als_articles_expanded.json',
+    concurrency: int = 8,
+    per_host_delay: float = 1.0,
+    max_per_host: int = 2,
+    timeout: float = 30.0,
+    resume: bool = False,
+) -> List[Dict]:
+    requested = list(url_list)
+    targets = dedupe(requested)
+    state = prepare_run(log_path, resume)
+    pending = [u for u in targets if u not in state.done]
+    limiter = HostRateLimiter(per_host_delay, max_per_host)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    started = time.perf_counter()
+    results: List[Dict] = []
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout,
+                                 follow_redirects=True) as client:
+        if log_path.exists() and log_path.stat().st_size:
+            with open(log_path, 'rb') as f:
+                f.seek(-1, 2)
+                needs_newline = f.read(1) != b'\n'
+        else:
+            needs_newline = False
+        with open(log_path, 'a', encoding='utf-8') as log:
+            if needs_newline:
+                log.write('\n')  # never glue a record onto a half-written line
+            tasks = [fetch_one(client, limiter, u, state.previous.get(u), state.run_id) for u in pending]
+            for task in asyncio.as_completed(tasks):
+                record = await task
+                results.append(record)
+                # One line per finished URL, flushed immediately: a crash loses nothing
+                log.write(json.dumps(record, ensure_ascii=False) + '\n')
+                log.flush()
+                print(f"[{record['status']}] {len(record['content'])} chars in {record['seconds']}s from {record['url']}")
+            log.write(json.dumps({"run_id": state.run_id, "status": "run_complete"}) + '\n')
+
+    # Export in the original format, in the original URL order
+    latest = {r["url"]: r for r in load_log(log_path) if r.get("run_id") == state.run_id and "url" in r}
+    for url, record in latest.items():
+        if record["status"] == "error" and url in state.previous:
+            latest[url] = state.previous[url]   # keep the last good copy rather than the error
+    data = [{"url": u, "content": latest[u]["content"]} for u in targets if u in latest]
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+
+    report(results, time.perf_counter() - started,
+           skipped=len(targets) - len(pending), duplicates=len(requested) - len(targets))
+    return data
+
+
+def report(results: List[Dict], wall: float, skipped: int = 0, duplicates: int = 0):
+    by_status: Dict[str, int] = {}
+    for r in results:
+        by_status[r["status"]] = by_status.get(r["status"], 0) + 1
+    fetch_time = sum(r["seconds"] for r in results)
+    downloaded = sum(r["bytes"] for r in results)
+
+    print("\n--- Scrape timing report ---")
+    print(f"URLs fetched:        {len(results)} ({by_status})")
+    print(f"Resumed (skipped):   {skipped}")
+    print(f"Duplicate URLs:      {duplicates}")
+    print(f"Bytes downloaded:    {downloaded}")
+    print(f"Wall time:           {wall:.2f}s")
+    print(f"Sum of fetch times:  {fetch_time:.2f}s (speed-up x{fetch_time / wall if wall else 0:.1f})")
+    for r in sorted(results, key=lambda r: -r["seconds"])[:5]:
+        print(f"  slowest: {r['seconds']:.2f}s {r['url']}")
+
 
-# Save data
-with open('als_articles_expanded.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=4)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape ALS articles concurrently.")
+    parser.add_argument('--log', type=Path, default=HERE / 'als_articles.jsonl')
+    parser.add_argument('--output', type=Path, default=HERE / 'als_articles_expanded.json')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--per-host-delay', type=float, default=1.0)
+    parser.add_argument('--max-per-host', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted run")
+    args = parser.parse_args()
 
-print("Scraping complete. Check 'als_articles_expanded.json' for results.")
+    asyncio.run(scrape(
+        urls, log_path=args.log, output_path=args.output, concurrency=args.concurrency,
+        per_host_delay=args.per_host_delay, max_per_host=args.max_per_host,
+        timeout=args.timeout, resume=args.resume,
+    ))
+    print(f"Scraping complete. Check '{args.output.name}' for results.")